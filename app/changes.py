@@ -0,0 +1,99 @@
+"""
+Отчёт об изменениях цен и остатков по истории обходов (``python -m app.main --history DIR``).
+
+    python -m app.changes --history positiv_history --since 2025-01-01
+    python -m app.changes --history positiv_history --since 2025-01-01 --kinds price \
+        --category "Инструмент > Электроинструмент" --output changes.csv
+"""
+import argparse
+import csv
+import logging
+import sys
+import time
+from datetime import datetime
+
+from app.logging_config import setup_logging
+from app.parsers.positiv.history import KINDS, PriceHistory
+
+logger = logging.getLogger(__name__)
+
+FIELDS = [
+    "run", "at", "public_id", "name", "category", "kinds",
+    "price_old", "price_new", "diff", "diff_pct", "count_old", "count_new", "available",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Изменения цен и остатков между обходами")
+    parser.add_argument("--history", metavar="DIR", required=True, help="каталог истории (--history у app.main)")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="с даты (ISO), по умолчанию вся история")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="до даты (ISO), не включая")
+    parser.add_argument("--category", help='путь категории с подкатегориями: "Инструмент > Дрели"')
+    parser.add_argument("--kinds", nargs="+", choices=list(KINDS), default=list(KINDS), help="виды изменений")
+    parser.add_argument("--top", type=int, default=20, help="сколько товаров с наибольшим изменением цены вывести")
+    parser.add_argument("--output", metavar="PATH", help="CSV со всеми изменениями (по умолчанию только сводка)")
+    return parser.parse_args()
+
+
+def change_to_row(change) -> dict:
+    diff = (
+        change.price_new - change.price_old
+        if change.price_new is not None and change.price_old is not None else None
+    )
+    return {
+        "run": change.run,
+        "at": change.at.isoformat(),
+        "public_id": change.public_id,
+        "name": change.name,
+        "category": change.category,
+        "kinds": ",".join(change.kind_names),
+        "price_old": change.price_old / 100 if change.price_old is not None else None,
+        "price_new": change.price_new / 100 if change.price_new is not None else None,
+        "diff": diff / 100 if diff is not None else None,
+        "diff_pct": round(diff / change.price_old * 100, 2) if diff is not None and change.price_old else None,
+        "count_old": change.count_old,
+        "count_new": change.count_new,
+        "available": change.available,
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    history = PriceHistory(args.history)
+    started = time.perf_counter()
+    kinds = sum(KINDS[name] for name in args.kinds)
+    changes = history.changes(since=args.since, until=args.until, category=args.category, kinds=kinds)
+
+    counts = dict.fromkeys(KINDS, 0)
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output else None
+    try:
+        writer = csv.DictWriter(output, fieldnames=FIELDS) if output else None
+        if writer:
+            writer.writeheader()
+        for change in changes:
+            for name in change.kind_names:
+                counts[name] += 1
+            if writer:
+                writer.writerow(change_to_row(change))
+    finally:
+        if output:
+            output.close()
+    logger.info(
+        "Изменения%s%s: %s",
+        f" с {args.since:%Y-%m-%d}" if args.since else "",
+        f" в категории '{args.category}'" if args.category else "",
+        ", ".join(f"{name}: {n}" for name, n in counts.items() if name in args.kinds),
+    )
+
+    if args.top and "price" in args.kinds:
+        movers = history.top_movers(
+            since=args.since, until=args.until, category=args.category, limit=args.top
+        )
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(movers[0]) if movers else ["public_id"])
+        writer.writeheader()
+        writer.writerows(movers)
+    logger.info("Отчёт построен за %.2f с", time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main(parse_args())
@@ -0,0 +1,74 @@
+"""
+Сравнение цен: товары магазинов из app.search против каталога positive.ooo.
+
+    python -m app.main --no-excel --jsonl positiv.jsonl.gz
+    python -m app.search --keywords-file words.txt --output prices.jsonl
+    python -m app.compare --catalog positiv.jsonl.gz --results prices.jsonl --output comparison.csv
+
+Индекс строится по снимку каталога один раз и лежит рядом с ним (``--index``); пока
+выгрузка каталога не изменилась, он загружается с диска.
+"""
+import argparse
+import csv
+import json
+import logging
+import sys
+from pathlib import Path
+
+from app.logging_config import setup_logging
+from app.matching import ProductMatcher, compare_prices, iter_catalog
+
+logger = logging.getLogger(__name__)
+
+FIELDS = [
+    "public_id", "name", "vendorCode", "code", "price",
+    "shop_name", "shop_product", "shop_price", "diff", "diff_pct",
+    "url", "keyword", "score", "matched_by",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Сравнение цен магазинов с каталогом positive.ooo")
+    parser.add_argument("--catalog", metavar="PATH", required=True, help="выгрузка каталога в JSON Lines (--jsonl)")
+    parser.add_argument("--index", metavar="PATH", help="файл индекса (по умолчанию <catalog>.index)")
+    parser.add_argument("--rebuild", action="store_true", help="построить индекс заново")
+    parser.add_argument("--results", metavar="PATH", required=True, help="JSON Lines из app.search")
+    parser.add_argument("--min-score", type=float, default=0.5, help="минимальная похожесть названий, 0..1")
+    parser.add_argument("--output", metavar="PATH", help="CSV со строками сравнения (по умолчанию stdout)")
+    return parser.parse_args()
+
+
+def load_matcher(catalog: Path, index: Path, rebuild: bool = False) -> ProductMatcher:
+    if not rebuild and index.exists() and index.stat().st_mtime >= catalog.stat().st_mtime:
+        logger.info("Индекс загружен из %s", index)
+        return ProductMatcher.load(index)
+    matcher = ProductMatcher.build(iter_catalog(catalog))
+    matcher.save(index)
+    logger.info("Индекс сохранён в %s", index)
+    return matcher
+
+
+def main(args: argparse.Namespace) -> None:
+    catalog = Path(args.catalog)
+    matcher = load_matcher(catalog, Path(args.index or f"{catalog}.index"), args.rebuild)
+    with open(args.results, encoding="utf-8") as f:
+        products = [json.loads(line) for line in f if line.strip()]
+    rows = compare_prices(matcher, products, min_score=args.min_score)
+    logger.info(
+        "Сопоставлено %s из %s товаров магазинов с %s товарами каталога",
+        len(rows), len(products), len({row["public_id"] for row in rows})
+    )
+
+    output = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(output, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main(parse_args())
@@ -1,11 +1,161 @@
+"""
+Логирование через очередь: вызов логгера в event loop только кладёт запись в очередь,
+форматирование и запись в консоль и errors.log идут в отдельном потоке (QueueListener).
+
+Повторы одного шаблона предупреждения или ошибки ограничиваются ``RateLimitFilter``
+ещё до очереди: не больше ``burst`` записей за ``period`` секунд, число подавленных дописывается
+к первой записи следующего окна и выводится при остановке.
+"""
+import atexit
+import json
 import logging
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-def setup_logging(log_file: str = "errors.log"):
+from queue import SimpleQueue
+
+from app.metrics import metrics
+
+FORMAT = "[%(asctime)s.%(msecs)03d] %(module)10s:%(lineno)-3d %(levelname)-7s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener: QueueListener | None = None
+_queue_handler: "LoopQueueHandler | None" = None
+_rate_limit: "RateLimitFilter | None" = None
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        if suppressed := getattr(record, "suppressed", 0):
+            text += f" (ещё {suppressed} таких сообщений подавлено)"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из ``extra`` попадают в неё как есть"""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self.RESERVED:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Не больше ``burst`` записей с одним шаблоном (логгер, уровень, msg) за ``period`` секунд.
+
+    Шаблон — строка до подстановки аргументов, поэтому сообщения о каждом товаре или
+    запросе ("Ошибка валидации %s: %s") считаются повторами одного сообщения.
+    Записи ниже ``min_level`` не ограничиваются: итоги по категориям и пачкам на INFO
+    идут с одним шаблоном, но каждая из них нужна.
+    """
+
+    def __init__(
+            self,
+            burst: int = 20,
+            period: float = 10.0,
+            max_keys: int = 10_000,
+            min_level: int = logging.WARNING,
+    ) -> None:
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.max_keys = max_keys
+        self.min_level = min_level
+        # ключ -> [начало окна, пропущено, подавлено]
+        self._windows: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level:
+            return True
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else repr(record.msg))
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or record.created - window[0] >= self.period:
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                elif len(self._windows) >= self.max_keys:
+                    self._prune(record.created)
+                self._windows[key] = [record.created, 1, 0]
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+        metrics.inc("log_suppressed_total", level=record.levelname)
+        return False
+
+    def _prune(self, now: float) -> None:
+        self._windows = {
+            key: window for key, window in self._windows.items()
+            if window[2] or now - window[0] < self.period
+        }
+
+    def flush(self) -> None:
+        """Вывести число подавленных записей по окнам, которые так и не закрылись"""
+        with self._lock:
+            pending = [(key, window[2]) for key, window in self._windows.items() if window[2]]
+            self._windows.clear()
+        for (name, level, msg), suppressed in pending:
+            logging.getLogger(name).log(level, "Подавлено %s повторов сообщения: %s", suppressed, msg)
+
+
+class LoopQueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в потоке вызова.
+
+    Стандартный ``prepare`` форматирует сообщение перед постановкой в очередь, чтобы
+    запись можно было передать в другой процесс; здесь очередь внутри процесса, и всё
+    форматирование остаётся потоку QueueListener. Время в потоке вызова (фильтры и
+    постановка в очередь) копится в метрике log_handler_seconds_total.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        started = time.perf_counter()
+        try:
+            return super().handle(record)
+        finally:
+            metrics.inc("log_handler_seconds_total", time.perf_counter() - started)
+            metrics.inc("log_records_total", level=record.levelname)
+
+
+def setup_logging(
+        log_file: str = "errors.log",
+        json_format: bool = False,
+        burst: int = 20,
+        period: float = 10.0,
+        level: int = logging.INFO,
+) -> QueueListener:
+    """
+    Консоль (INFO и выше) и ``log_file`` (WARNING и выше) за очередью.
+
+    ``json_format`` — писать JSON Lines вместо текстовых строк, ``burst``/``period`` —
+    ограничение повторов одного предупреждения или ошибки (``burst=0`` отключает ограничение).
+    Повторный вызов заменяет прежнюю настройку.
+    """
+    global _listener, _queue_handler, _rate_limit
+    stop_logging()
     BASE_DIR = Path(__file__).parent.parent.parent
-    formatter = logging.Formatter(
-        "[%(asctime)s.%(msecs)03d] %(module)10s:%(lineno)-3d %(levelname)-7s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    formatter = JsonFormatter() if json_format else TextFormatter(FORMAT, datefmt=DATE_FORMAT)
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
@@ -15,5 +165,33 @@ def setup_logging(log_file: str = "errors.log"):
     file_handler.setLevel(logging.WARNING)
     file_handler.setFormatter(formatter)
 
-    logging.basicConfig(level=logging.INFO, handlers=[console_handler, file_handler])
+    _queue_handler = LoopQueueHandler(SimpleQueue())
+    if burst:
+        _rate_limit = RateLimitFilter(burst=burst, period=period)
+        _queue_handler.addFilter(_rate_limit)
+
+    _listener = QueueListener(_queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    logging.basicConfig(level=level, handlers=[_queue_handler], force=True)
+    # строка INFO на каждый запрос httpx; счётчики запросов есть в метриках
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return _listener
+
+
+def stop_logging() -> None:
+    """Дописать подавленные повторы и дождаться, пока поток запишет очередь"""
+    global _listener, _queue_handler, _rate_limit
+    if _rate_limit is not None:
+        _rate_limit.flush()
+        _rate_limit = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
 
+atexit.register(stop_logging)
@@ -0,0 +1,184 @@
+"""
+Локальный справочный сервис цен по последнему снимку обхода.
+
+    python -m app.main --jsonl positiv_products.jsonl.gz --no-excel
+    python -m app.lookup --snapshot positiv_products.jsonl.gz --port 8765
+
+Запросы (ответ — JSON-массив товаров):
+
+    GET /products/{public_id}
+    GET /products?code=00012345
+    GET /products?vendorCode=ABC-123
+    GET /products?category=Инструмент > Электроинструмент&limit=100
+    GET /products?prefix=дрель уд&limit=20
+    GET /status
+    POST /reload
+
+Новый снимок загружается в фоне и подменяет индекс одним присваиванием: начатые
+запросы дочитывают прежний индекс, следующие видят новый. Перезагрузка — по
+``POST /reload`` (``python -m app.main --notify-reload URL`` вызывает его после обхода)
+или по изменению файла с ``--watch``.
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from app.logging_config import setup_logging
+from app.metrics import metrics
+from app.price_index import PriceIndex
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 1000
+
+
+class LookupService:
+    """Текущий индекс снимка и его перезагрузка"""
+
+    def __init__(self, snapshot: str | Path):
+        self.snapshot = Path(snapshot)
+        self.index = PriceIndex.load(self.snapshot)
+        self._reload_lock = threading.Lock()
+
+    def reload(self) -> bool:
+        """Загрузить снимок заново; при ошибке остаётся прежний индекс"""
+        with self._reload_lock:
+            try:
+                index = PriceIndex.load(self.snapshot)
+            except (OSError, ValueError) as e:
+                logger.warning("Снимок не перезагружен, работает прежний: %s", e)
+                metrics.inc("lookup_reloads_total", status="failed")
+                return False
+            self.index = index
+            metrics.inc("lookup_reloads_total", status="ok")
+            return True
+
+    def watch(self, interval: float, settle: float) -> None:
+        """
+        Перезагрузка при изменении файла. Файл должен не меняться ``settle`` секунд:
+        выгрузка JSON Lines дописывается по ходу обхода.
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                mtime = self.snapshot.stat().st_mtime
+            except OSError:
+                continue
+            if mtime != self.index.info.mtime and time.time() - mtime >= settle:
+                self.reload()
+
+    def query(self, path: str, params: dict[str, list[str]]) -> tuple[int, bytes]:
+        """Статус и тело ответа на GET"""
+        # один индекс на весь запрос, даже если посередине произойдёт подмена
+        index = self.index
+        if path == "/status":
+            info = index.info
+            return 200, json.dumps({
+                "snapshot": info.path,
+                "products": info.products,
+                "mtime": info.mtime,
+                "loaded_at": info.loaded_at.isoformat(timespec="seconds"),
+                "load_seconds": info.load_seconds,
+            }, ensure_ascii=False).encode()
+        if path.startswith("/products/"):
+            body = index.by_public_id(unquote(path.removeprefix("/products/")))
+            return (200, body) if body is not None else (404, b'{"error":"not found"}')
+        if path != "/products":
+            return 404, b'{"error":"not found"}'
+
+        try:
+            limit = min(int(params.get("limit", ["20"])[0]), MAX_LIMIT)
+        except ValueError:
+            return 400, b'{"error":"limit must be an integer"}'
+        if limit < 1:
+            return 400, b'{"error":"limit must be at least 1"}'
+        if "code" in params:
+            items = index.by_code(params["code"][0], limit)
+        elif "vendorCode" in params:
+            items = index.by_vendor_code(params["vendorCode"][0], limit)
+        elif "category" in params:
+            items = index.by_category(params["category"][0], limit)
+        elif "prefix" in params:
+            items = index.search(params["prefix"][0], limit)
+        else:
+            return 400, b'{"error":"expected code, vendorCode, category or prefix"}'
+        return 200, b"[" + b",".join(items) + b"]"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive: клиент не открывает соединение на запрос
+            # заголовки и тело уходят отдельными записями: без TCP_NODELAY ответ ждёт
+            # отложенного ACK клиента (~40 мс)
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                started = time.perf_counter()
+                url = urlsplit(self.path)
+                status, body = service.query(url.path, parse_qs(url.query))
+                self._send(status, body)
+                metrics.observe("lookup_seconds", time.perf_counter() - started)
+
+            def do_POST(self):
+                if urlsplit(self.path).path != "/reload":
+                    self._send(404, b'{"error":"not found"}')
+                    return
+                reloaded = service.reload()
+                self._send(200 if reloaded else 409, json.dumps({"reloaded": reloaded}).encode())
+
+            def _send(self, status: int, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        logger.info("Справочный сервис цен на http://%s:%s/products", host, server.server_address[1])
+        return server
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Справочный сервис цен по снимку обхода")
+    parser.add_argument("--snapshot", required=True, help="выгрузка JSON Lines (--jsonl), в том числе .gz")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--watch", type=float, default=0, metavar="SECONDS",
+        help="проверять изменение снимка каждые N секунд и перезагружать его"
+    )
+    parser.add_argument(
+        "--settle", type=float, default=60,
+        help="перезагружать, только если файл не менялся столько секунд"
+    )
+    return parser.parse_args()
+
+
+def main(args: argparse.Namespace) -> None:
+    service = LookupService(args.snapshot)
+    if args.watch:
+        threading.Thread(
+            target=service.watch, args=(args.watch, args.settle), name="lookup-watch", daemon=True
+        ).start()
+    server = service.serve(args.port, args.host)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main(parse_args())
@@ -1,16 +1,332 @@
+import argparse
 import asyncio
+import logging
 
-import httpx
+from httpx import AsyncClient, HTTPError
 
 from app.logging_config import setup_logging
-from app.parsers.positiv.excel_writer import save_products_to_excel
+from app.metrics import metrics
+from app.parsers.positiv.checkpoint import CrawlJournal
+from app.parsers.positiv.excel_writer import BASE_DIR, save_products_to_excel, stream_products_to_excel
+from app.parsers.positiv.http_cache import HttpCache
+from app.parsers.positiv.http_client import COMPRESSION_MODULES, DEFAULT_COMPRESSION, create_client
+from app.parsers.positiv.images import ImageStore
 from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.product_store import ProductStore
+from app.parsers.positiv.scheduler import SIGNALS, CrawlScheduler, parse_deadline, parse_weights
+from app.parsers.positiv.sharding import ShardQueue, merge_shards, plan, run_local_workers
+from app.parsers.positiv.sinks import (
+    CsvSink, ExcelSink, HistorySink, JsonLinesSink, ParquetSink, export_products
+)
 
-setup_logging()
+logger = logging.getLogger(__name__)
 
-async def main():
-    async with httpx.AsyncClient() as client:
-        parser = PositiveParserAPI(client=client, max_concurrent=100)
-        await save_products_to_excel(parser, filename="positiv_products.xlsx")
 
-asyncio.run(main())
\ No newline at end of file
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--csv", metavar="PATH", help="дополнительно писать товары в CSV")
+    parser.add_argument(
+        "--jsonl", metavar="PATH",
+        help="дополнительно писать товары в JSON Lines (с суффиксом .gz — сжатый gzip)"
+    )
+    parser.add_argument(
+        "--parquet", metavar="DIR",
+        help="дополнительно писать товары в Parquet-датасет (нужен pyarrow)"
+    )
+    parser.add_argument(
+        "--history", metavar="DIR",
+        help="дописывать изменения цен и остатков относительно прошлого запуска в историю"
+    )
+    parser.add_argument("--no-excel", action="store_true", help="не создавать Excel-файл")
+
+
+def add_http_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--http2", action="store_true",
+        help="HTTP/2 с мультиплексированием запросов (нужен пакет h2: pip install price-parser[http2])"
+    )
+    parser.add_argument(
+        "--compression", nargs="+", choices=list(COMPRESSION_MODULES), default=list(DEFAULT_COMPRESSION),
+        help="допустимое сжатие ответов (Accept-Encoding); identity — без сжатия"
+    )
+    parser.add_argument(
+        "--stream-listings", action="store_true",
+        help="разбирать листинги категорий по мере загрузки и сразу запрашивать карточки"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Парсер товаров positive.ooo")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="потоковая запись Excel в отдельном потоке (ограниченная память); с --csv, --jsonl, "
+             "--parquet, --history и --no-excel не нужен: выгрузка в них всегда потоковая"
+    )
+    parser.add_argument(
+        "--store", metavar="PATH",
+        help="SQLite-хранилище товаров: запрашивать только новые и изменившиеся товары"
+    )
+    parser.add_argument(
+        "--refresh-fraction", type=float, default=0.05,
+        help="доля товаров из хранилища, которая всё равно обновляется за запуск"
+    )
+    parser.add_argument(
+        "--cache-dir", metavar="DIR",
+        help="дисковый кэш HTTP-ответов API с TTL по эндпоинтам"
+    )
+    parser.add_argument(
+        "--cache-size-mb", type=int, default=1024,
+        help="предельный размер HTTP-кэша, МБ"
+    )
+    parser.add_argument(
+        "--max-concurrent", type=int, default=100,
+        help="максимум одновременных запросов к API"
+    )
+    parser.add_argument(
+        "--adaptive", action="store_true",
+        help="подбирать число одновременных запросов (AIMD) в пределах --max-concurrent"
+    )
+    parser.add_argument(
+        "--fast-validation", action="store_true",
+        help="валидировать товары из байтов ответа в облегчённую схему"
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="держать товары в памяти как компактные ProductRecord"
+    )
+    add_http_arguments(parser)
+    add_output_arguments(parser)
+    parser.add_argument(
+        "--images", metavar="DIR",
+        help="загружать изображения товаров в локальное зеркало (файлы по хешу содержимого)"
+    )
+    parser.add_argument(
+        "--image-workers", type=int, default=8,
+        help="одновременных загрузок изображений (в пределах --max-concurrent)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="шардированный обход в N процессах с объединением результатов "
+             "(журнал не ведётся; несовместим с --store, --cache-dir, --compact, --resume, --images)"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="продолжить прерванный обход по журналу, не запрашивая уже полученное"
+    )
+    parser.add_argument(
+        "--journal", metavar="PATH", default="positiv_crawl.journal",
+        help="файл журнала прогресса обхода"
+    )
+    parser.add_argument("--no-checkpoint", action="store_true", help="не вести журнал прогресса")
+    parser.add_argument(
+        "--metrics-file", metavar="PATH",
+        help="периодически записывать метрики в файл в формате Prometheus"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int,
+        help="отдавать метрики Prometheus по HTTP на 127.0.0.1:PORT/metrics"
+    )
+    parser.add_argument("--metrics-json", metavar="PATH", help="сводка метрик запуска в JSON")
+    parser.add_argument(
+        "--profile", metavar="STAGE", action="append", default=[],
+        help="профилировать этап cProfile (crawl, excel_save, merge); можно указать несколько раз, "
+             "но этап внутри профилируемого (excel_save и merge внутри crawl) входит в его профиль"
+    )
+    parser.add_argument(
+        "--tracemalloc", action="store_true",
+        help="вместе с --profile снимать статистику выделений памяти tracemalloc"
+    )
+    parser.add_argument(
+        "--deadline", metavar="HH:MM|ISO",
+        help="срок окончания обхода: сначала самые важные категории, к сроку новые запросы не начинаются"
+    )
+    parser.add_argument(
+        "--deadline-reserve", type=float, default=120,
+        help="за сколько секунд до срока прекратить запросы (время на запись выгрузки)"
+    )
+    parser.add_argument(
+        "--priority", metavar="SIGNAL=WEIGHT", action="append", default=[],
+        help="вес сигнала в порядке обхода: priority, staleness, volatility (по умолчанию все 1)"
+    )
+    parser.add_argument(
+        "--notify-reload", metavar="URL",
+        help="после обхода вызвать POST URL (например, http://127.0.0.1:8765/reload у app.lookup)"
+    )
+    parser.add_argument("--skipped-report", metavar="PATH", help="JSON-отчёт о пропущенном к сроку")
+    parser.add_argument("--log-json", action="store_true", help="писать лог строками JSON")
+    parser.add_argument(
+        "--log-burst", type=int, default=20,
+        help="не больше N повторов одного предупреждения или ошибки за 10 с (0 — без ограничения)"
+    )
+    return parser.parse_args()
+
+
+def build_sinks(args: argparse.Namespace) -> list:
+    sinks = []
+    if not args.no_excel:
+        sinks.append(ExcelSink(BASE_DIR / "positiv_products.xlsx"))
+    if args.csv:
+        sinks.append(CsvSink(args.csv))
+    if args.jsonl:
+        sinks.append(JsonLinesSink(args.jsonl))
+    if args.parquet:
+        sinks.append(ParquetSink(args.parquet))
+    if args.history:
+        sinks.append(HistorySink(args.history))
+    return sinks
+
+
+async def run_sharded(args: argparse.Namespace, parser: PositiveParserAPI) -> None:
+    """Обход в args.workers процессах: план шардов, воркеры, объединение выгрузок"""
+    queue = ShardQueue(BASE_DIR / "positiv_shards.sqlite")
+    await plan(parser, queue, n_shards=args.workers * 4)
+    await asyncio.to_thread(
+        run_local_workers,
+        queue,
+        args.workers,
+        max_concurrent=max(1, args.max_concurrent // args.workers),
+        adaptive=args.adaptive,
+        fast_validation=args.fast_validation,
+        http2=args.http2,
+        compression=args.compression,
+        stream_listings=args.stream_listings,
+    )
+    with metrics.stage("merge"):
+        await asyncio.to_thread(merge_shards, queue, build_sinks(args), args.fast_validation)
+
+
+def build_scheduler(args: argparse.Namespace, store: ProductStore | None) -> CrawlScheduler | None:
+    if not (args.deadline or args.priority):
+        return None
+    if args.workers:
+        raise SystemExit("--deadline и --priority не поддерживаются вместе с --workers")
+    try:
+        weights = parse_weights(args.priority) if args.priority else dict.fromkeys(SIGNALS, 1.0)
+        deadline = parse_deadline(args.deadline) if args.deadline else None
+    except ValueError as e:
+        raise SystemExit(f"Некорректные --deadline или --priority: {e}")
+    if not store:
+        logger.warning("Без --store давность и изменчивость категорий неизвестны, порядок только по priority")
+    return CrawlScheduler(
+        weights=weights,
+        deadline=deadline,
+        reserve=args.deadline_reserve,
+        stats=store.category_stats() if store else {},
+    )
+
+
+async def notify_reload(client: AsyncClient, url: str) -> None:
+    """Сообщить справочному сервису, что снимок обновлён; ошибка не роняет запуск"""
+    try:
+        response = await client.post(url)
+        response.raise_for_status()
+        logger.info("Справочный сервис перезагрузил снимок: %s", url)
+    except HTTPError as e:
+        logger.warning("Не удалось перезагрузить снимок через %s: %s", url, e)
+
+
+async def write_metrics_periodically(path: str, interval: float = 15.0) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(metrics.write_prometheus, path)
+
+
+async def main(args: argparse.Namespace):
+    metrics.profile_stages.update(args.profile)
+    metrics.trace_memory = args.tracemalloc
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    metrics_writer = (
+        asyncio.create_task(write_metrics_periodically(args.metrics_file)) if args.metrics_file else None
+    )
+    if args.workers:
+        # процессы-воркеры обходят шарды сами: общие SQLite-файлы и журнал они не используют
+        unsupported = [
+            flag for flag, value in (
+                ("--store", args.store), ("--cache-dir", args.cache_dir), ("--compact", args.compact),
+                ("--resume", args.resume), ("--images", args.images),
+            ) if value
+        ]
+        if unsupported:
+            verb = "не поддерживается" if len(unsupported) == 1 else "не поддерживаются"
+            raise SystemExit(f"{', '.join(unsupported)} {verb} вместе с --workers")
+    store = ProductStore(args.store, refresh_fraction=args.refresh_fraction) if args.store else None
+    cache = HttpCache(args.cache_dir, max_bytes=args.cache_size_mb * 2 ** 20) if args.cache_dir else None
+    journal = (
+        None if args.no_checkpoint or args.workers else CrawlJournal(BASE_DIR / args.journal, resume=args.resume)
+    )
+    scheduler = build_scheduler(args, store)
+    images = ImageStore(args.images, resume=args.resume) if args.images else None
+    finished = False
+    try:
+        async with create_client(args.max_concurrent, http2=args.http2, compression=args.compression) as client:
+            parser = PositiveParserAPI(
+                client=client,
+                max_concurrent=args.max_concurrent,
+                adaptive=args.adaptive,
+                fast_validation=args.fast_validation,
+                compact_records=args.compact,
+                journal=journal,
+                store=store,
+                cache=cache,
+                scheduler=scheduler,
+                images=images,
+                image_workers=args.image_workers,
+                stream_listings=args.stream_listings,
+            )
+            try:
+                with metrics.stage("crawl"):
+                    if args.workers:
+                        await run_sharded(args, parser)
+                    elif args.csv or args.jsonl or args.parquet or args.history or args.no_excel:
+                        await export_products(parser, build_sinks(args))
+                    elif args.stream:
+                        await stream_products_to_excel(parser, filename="positiv_products.xlsx")
+                    else:
+                        await save_products_to_excel(parser, filename="positiv_products.xlsx")
+                finished = True
+            finally:
+                if parser.images:
+                    # после обхода дозагружаем очередь; при сбое запуск остаётся незавершённым
+                    with metrics.stage("images"):
+                        await parser.images.close(drain=finished)
+            if args.notify_reload:
+                await notify_reload(client, args.notify_reload)
+        logger.info("Итоговый лимит параллельных запросов: %s", parser.limiter.stats())
+    finally:
+        if scheduler and args.skipped_report:
+            scheduler.write_report(args.skipped_report)
+        elif scheduler:
+            scheduler.report()
+        if journal:
+            journal.close(finished=finished)
+        if store:
+            store.close()
+        if cache:
+            cache.close()
+        if images:
+            images.close()
+        if metrics_writer:
+            metrics_writer.cancel()
+            metrics.write_prometheus(args.metrics_file)
+        if args.metrics_json:
+            metrics.write_summary(args.metrics_json)
+        summary = metrics.summary()
+        logger.info(
+            "Запросов в секунду: %s, пиковый RSS: %s МБ",
+            summary["requests_per_second"],
+            round(summary["peak_rss_bytes"] / 2 ** 20, 1) if summary["peak_rss_bytes"] else None,
+        )
+        log_seconds = summary["counters"].get("log_handler_seconds_total", {}).get("total", 0)
+        logger.info(
+            "Логирование в потоке обхода: %.3f с (%.2f%% времени), подавлено повторов: %s",
+            log_seconds,
+            log_seconds / summary["elapsed_seconds"] * 100 if summary["elapsed_seconds"] else 0,
+            int(sum(summary["counters"].get("log_suppressed_total", {}).values())),
+        )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(json_format=args.log_json, burst=args.log_burst)
+    asyncio.run(main(args))
+
@@ -0,0 +1,301 @@
+"""
+Сопоставление товаров магазинов с каталогом positive.ooo.
+
+Индекс строится один раз на снимок каталога: инвертированный индекс по словам и
+символьным триграммам нормализованного названия с весами IDF плюс точный поиск
+по vendorCode и code. Запрос касается только списков товаров с общими признаками,
+поэтому время не растёт линейно с каталогом, как при сравнении всех пар.
+"""
+import gzip
+import json
+import logging
+import math
+import pickle
+import re
+import time
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from app.prices import parse_price, to_minor_units
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-zа-я0-9]+")
+_CODE_RE = re.compile(r"[^A-ZА-Я0-9]")
+# "3х2,5" с кириллической "х", "3×2.5" и "3*2.5" пишутся по-разному в разных магазинах
+_TIMES_RE = re.compile(r"(?<=\d)\s*[хx×*]\s*(?=\d)")
+INDEX_VERSION = 1
+# артикул в названии может быть разбит на слова ("GSB-13-RE" -> gsb, 13, re)
+MAX_CODE_TOKENS = 3
+# точное совпадение артикула: буквы и цифры, не короче MIN_CODE_LENGTH
+MIN_CODE_LENGTH = 4
+# совпадение кода из одних цифр ("220", "1500") — чаще характеристика, чем артикул:
+# оно только добавляется к оценке по названию
+NUMERIC_CODE_BOOST = 0.1
+
+
+def normalize_name(text: str) -> list[str]:
+    """Слова названия в нижнем регистре, ё -> е, размеры через латинскую x, без знаков препинания"""
+    return _TOKEN_RE.findall(_TIMES_RE.sub("x", text.lower().replace("ё", "е")))
+
+
+def normalize_code(code: str | None) -> str:
+    return _CODE_RE.sub("", code.upper()) if code else ""
+
+
+def code_candidates(tokens: list[str]) -> set[str]:
+    """Возможные артикулы в названии: до MAX_CODE_TOKENS соседних слов, склеенных и нормализованных, с цифрой"""
+    # слова normalize_name уже состоят только из [a-zа-я0-9]: normalize_code сводится к upper
+    words = [token.upper() for token in tokens]
+    digits = [not token.isalpha() for token in tokens]
+    candidates = set()
+    for start in range(len(words)):
+        for end in range(start + 1, min(start + MAX_CODE_TOKENS, len(words)) + 1):
+            if any(digits[start:end]):
+                candidates.add("".join(words[start:end]))
+    return candidates
+
+
+def name_features(tokens: list[str]) -> set[str]:
+    """Признаки названия: слова целиком и триграммы слов с границами (^дре, рел, ель$)"""
+    features = set()
+    for token in tokens:
+        features.add(token)
+        padded = f"^{token}$"
+        features.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogItem:
+    public_id: str
+    name: str
+    vendorCode: str | None
+    code: str | None
+    price_minor: int | None
+
+
+@dataclass(frozen=True, slots=True)
+class Match:
+    item: CatalogItem
+    score: float
+    # "code" — совпал артикул или код, "name" — похожее название
+    by: str
+
+
+class ProductMatcher:
+    """
+    Индекс каталога для поиска top-k кандидатов по названию и артикулу.
+
+    Кандидаты набираются по самым редким признакам запроса, пока суммарная длина их
+    списков не превысит ``postings_budget``; признаки, встречающиеся больше чем в
+    ``max_df`` доле товаров, в списки не попадают вовсе. Затем ``candidates`` лучших
+    по числу общих признаков оцениваются точно — косинусом IDF-векторов всех признаков.
+    Совпадение vendorCode/code из букв и цифр даёт оценку 1, совпадение кода из одних
+    цифр только добавляет ``NUMERIC_CODE_BOOST`` к оценке по названию.
+    """
+
+    def __init__(
+            self,
+            items: list[CatalogItem],
+            max_df: float = 0.05,
+            postings_budget: int = 1024,
+            candidates: int = 32
+    ) -> None:
+        self.items = items
+        self.max_df = max_df
+        self.postings_budget = postings_budget
+        self.candidates = candidates
+        self.built_at = time.time()
+        self._feature_ids: dict[str, int] = {}
+        self._idf = array("d")
+        # списки товаров по номеру признака, None — слишком частый признак
+        self._postings: list[array | None] = []
+        self._item_features: list[array] = []
+        self._norms = array("d")
+        self._codes: dict[str, array] = {}
+
+    @classmethod
+    def build(cls, items: Iterable[CatalogItem], **kwargs) -> "ProductMatcher":
+        started = time.perf_counter()
+        matcher = cls(list(items), **kwargs)
+        n = len(matcher.items)
+        feature_ids = matcher._feature_ids
+        postings: list[array] = []
+        codes: defaultdict[str, array] = defaultdict(lambda: array("I"))
+        for i, item in enumerate(matcher.items):
+            ids = array("I")
+            for feature in name_features(normalize_name(item.name)):
+                fid = feature_ids.setdefault(feature, len(feature_ids))
+                if fid == len(postings):
+                    postings.append(array("I"))
+                postings[fid].append(i)
+                ids.append(fid)
+            matcher._item_features.append(ids)
+            for code in {normalize_code(item.vendorCode), normalize_code(item.code)}:
+                if len(code) >= 3:
+                    codes[code].append(i)
+
+        max_postings = max(1, int(n * matcher.max_df))
+        matcher._idf = array("d", (math.log(1 + n / len(ids)) for ids in postings))
+        matcher._postings = [ids if len(ids) <= max_postings else None for ids in postings]
+        idf = matcher._idf
+        matcher._norms = array("d", (
+            math.sqrt(sum(idf[fid] ** 2 for fid in ids)) or 1.0 for ids in matcher._item_features
+        ))
+        matcher._codes = dict(codes)
+        logger.info(
+            "Индекс сопоставления: %s товаров, %s признаков (%s слишком частых), %.1f с",
+            n, len(postings), matcher._postings.count(None), time.perf_counter() - started
+        )
+        return matcher
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        state = {
+            "version": INDEX_VERSION,
+            "built_at": self.built_at,
+            "settings": {
+                "max_df": self.max_df,
+                "postings_budget": self.postings_budget,
+                "candidates": self.candidates,
+            },
+            "items": [(i.public_id, i.name, i.vendorCode, i.code, i.price_minor) for i in self.items],
+            "feature_ids": self._feature_ids,
+            "idf": self._idf,
+            "postings": self._postings,
+            "item_features": self._item_features,
+            "norms": self._norms,
+            "codes": self._codes,
+        }
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ProductMatcher":
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != INDEX_VERSION:
+            raise ValueError(f"Индекс {path} построен другой версией, постройте его заново")
+        matcher = cls([CatalogItem(*fields) for fields in state["items"]], **state["settings"])
+        matcher.built_at = state["built_at"]
+        matcher._feature_ids = state["feature_ids"]
+        matcher._idf = state["idf"]
+        matcher._postings = state["postings"]
+        matcher._item_features = state["item_features"]
+        matcher._norms = state["norms"]
+        matcher._codes = state["codes"]
+        return matcher
+
+    def query(self, name: str, k: int = 5, min_score: float = 0.3) -> list[Match]:
+        """Лучшие ``k`` товаров каталога для названия из магазина"""
+        tokens = normalize_name(name)
+        matches: dict[int, Match] = {}
+        numeric: set[int] = set()
+        # артикул в названии магазина: слова подряд, совпадающие с vendorCode/code
+        for code in code_candidates(tokens):
+            ids = self._codes.get(code)
+            if not ids:
+                continue
+            if code.isdigit():
+                numeric.update(ids)
+            elif len(code) >= MIN_CODE_LENGTH:
+                for i in ids:
+                    matches[i] = Match(self.items[i], 1.0, "code")
+
+        weights = {}
+        for feature in name_features(tokens):
+            fid = self._feature_ids.get(feature)
+            if fid is not None:
+                weights[fid] = self._idf[fid] ** 2
+        if not weights:
+            return list(matches.values())[:k]
+        query_norm = math.sqrt(sum(weights.values()))
+
+        counts: Counter[int] = Counter()
+        touched = 0
+        postings = [ids for fid in weights if (ids := self._postings[fid]) is not None]
+        for ids in sorted(postings, key=len):
+            if touched and touched + len(ids) > self.postings_budget:
+                break
+            counts.update(ids)
+            touched += len(ids)
+
+        weight = weights.get
+        candidates = dict.fromkeys(i for i, _ in counts.most_common(self.candidates))
+        candidates.update(dict.fromkeys(numeric))
+        for i in candidates:
+            if i in matches:
+                continue
+            score = sum(map(weight, self._item_features[i], repeat(0.0))) / (query_norm * self._norms[i])
+            if i in numeric:
+                score = min(score + NUMERIC_CODE_BOOST, 0.99)
+            if score >= min_score:
+                matches[i] = Match(self.items[i], round(score, 4), "name")
+        return sorted(matches.values(), key=lambda m: m.score, reverse=True)[:k]
+
+    def best(self, name: str, min_score: float = 0.5) -> Match | None:
+        found = self.query(name, k=1, min_score=min_score)
+        return found[0] if found else None
+
+
+def iter_catalog(path: str | Path) -> Iterator[CatalogItem]:
+    """Товары из выгрузки JSON Lines (``--jsonl``, в том числе .gz)"""
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            price_minor = record.get("price_minor")
+            if price_minor is None:
+                price_minor = to_minor_units(parse_price(record.get("price")))
+            yield CatalogItem(
+                public_id=record["public_id"],
+                name=record["name"],
+                vendorCode=record.get("vendorCode"),
+                code=record.get("code"),
+                price_minor=price_minor,
+            )
+
+
+def compare_prices(
+        matcher: ProductMatcher,
+        shop_products: Iterable[dict[str, Any]],
+        min_score: float = 0.5
+) -> list[dict[str, Any]]:
+    """
+    Строки сравнения цен: по лучшему совпадению каждого товара магазина,
+    сгруппированные по товару каталога и отсортированные по нему и магазину.
+    """
+    rows = []
+    for product in shop_products:
+        match = matcher.best(product.get("name") or "", min_score=min_score)
+        if match is None:
+            continue
+        shop_price = to_minor_units(parse_price(product.get("price")))
+        our_price = match.item.price_minor
+        diff = shop_price - our_price if shop_price is not None and our_price is not None else None
+        rows.append({
+            "public_id": match.item.public_id,
+            "name": match.item.name,
+            "vendorCode": match.item.vendorCode,
+            "code": match.item.code,
+            "price": our_price / 100 if our_price is not None else None,
+            "shop_name": product.get("shop_name"),
+            "shop_product": product.get("name"),
+            "shop_price": shop_price / 100 if shop_price is not None else None,
+            "diff": diff / 100 if diff is not None else None,
+            "diff_pct": round(diff / our_price * 100, 2) if diff is not None and our_price else None,
+            "url": product.get("url"),
+            "keyword": product.get("keyword"),
+            "score": match.score,
+            "matched_by": match.by,
+        })
+    rows.sort(key=lambda row: (row["public_id"], row["shop_name"] or "", row["shop_price"] or 0))
+    return rows
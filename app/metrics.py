@@ -0,0 +1,275 @@
+import bisect
+import cProfile
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _labels_key(labels: dict[str, str]) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict[str, str] | None = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Оценка квантиля по верхним границам корзин"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    Счётчики, значения и гистограммы обхода.
+
+    Выводятся в текстовом формате Prometheus (файл или HTTP-эндпоинт) и сводкой
+    JSON в конце запуска. Обновления защищены блокировкой: метрики пишут и event
+    loop, и поток записи выгрузок.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.profile_stages: set[str] = set()
+        self.profile_dir = Path("profiles")
+        self.trace_memory = False
+        self._profiled_stage: str | None = None
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._gauges: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._help: dict[str, str] = {}
+
+    def describe(self, name: str, text: str) -> None:
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Этап запуска: длительность пишется в ``stage_seconds``; если этап указан в
+        ``profile_stages``, на время этапа включаются cProfile и (при ``trace_memory``)
+        tracemalloc.
+
+        Одновременно работает только один cProfile: этап внутри профилируемого этапа
+        (например, excel_save внутри crawl) отдельно не профилируется — он уже входит
+        в профиль внешнего. tracemalloc останавливает тот этап, который его запустил.
+        """
+        profiler = self._start_profile(name) if name in self.profile_stages else None
+        started_tracing = False
+        if profiler is not None and self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.set("stage_seconds", time.perf_counter() - started, stage=name)
+            if profiler is not None:
+                profiler.disable()
+                self._profiled_stage = None
+                self._dump_profile(name, profiler, started_tracing)
+
+    def _start_profile(self, name: str) -> cProfile.Profile | None:
+        if self._profiled_stage is not None:
+            logger.warning(
+                "Этап %s входит в профилируемый этап %s и отдельно не профилируется", name, self._profiled_stage
+            )
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # профилировщик уже включён вне metrics.stage
+            logger.warning("Профилирование этапа %s пропущено: %s", name, e)
+            return None
+        self._profiled_stage = name
+        return profiler
+
+    def _dump_profile(self, name: str, profiler: cProfile.Profile, started_tracing: bool) -> None:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"{name}.prof"
+        profiler.dump_stats(path)
+        logger.info("Профиль этапа %s сохранён в %s", name, path)
+        if self.trace_memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            top = snapshot.statistics("lineno")[:15]
+            with open(self.profile_dir / f"{name}.tracemalloc.txt", "w", encoding="utf-8") as f:
+                f.write(f"peak: {peak / 2 ** 20:.1f} MiB\n")
+                f.writelines(f"{stat}\n" for stat in top)
+
+    @staticmethod
+    def peak_rss_bytes() -> int | None:
+        if resource is None:
+            return None
+        # ru_maxrss в килобайтах на Linux и в байтах на macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+    def to_prometheus(self) -> str:
+        peak_rss = self.peak_rss_bytes()
+        if peak_rss is not None:
+            self.set("process_peak_rss_bytes", peak_rss)
+        self.set("run_elapsed_seconds", time.time() - self.started)
+
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(metrics.items()):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    lines.extend(f"{name}{_format_labels(key)} {value}" for key, value in series.items())
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else str(bound)
+                        lines.append(f"{name}_bucket{_format_labels(key, {'le': le})} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path) -> None:
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp.replace(path)  # атомарная замена: сборщик не увидит полузаписанный файл
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """HTTP-эндпоинт /metrics в фоновом потоке"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info("Метрики доступны на http://%s:%s/metrics", host, port)
+        return server
+
+    def summary(self) -> dict:
+        """Сводка запуска для JSON-отчёта"""
+        elapsed = time.time() - self.started
+        with self._lock:
+            counters = {
+                name: {_format_labels(key) or "total": value for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+            gauges = {
+                name: {_format_labels(key) or "value": value for key, value in series.items()}
+                for name, series in self._gauges.items()
+            }
+            histograms = {
+                name: {
+                    _format_labels(key) or "all": {
+                        "count": h.count,
+                        "mean": h.sum / h.count if h.count else None,
+                        "p50": h.quantile(0.5),
+                        "p99": h.quantile(0.99),
+                    }
+                    for key, h in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+        requests = sum(self._counters.get("http_requests_total", {}).values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(requests / elapsed, 2) if elapsed else None,
+            "peak_rss_bytes": self.peak_rss_bytes(),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+    def write_summary(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.summary(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+metrics = MetricsRegistry()
+metrics.describe("http_request_seconds", "Длительность запроса к API по эндпоинтам")
+metrics.describe("http_requests_total", "Запросы к API по эндпоинтам и статусам")
+metrics.describe("http_retries_total", "Повторы запросов")
+metrics.describe("http_errors_total", "Ошибки запросов по типам")
+metrics.describe("limiter_wait_seconds", "Ожидание слота ограничителя параллельности")
+metrics.describe("validation_seconds", "Время валидации по схемам")
+metrics.describe("sink_rows_total", "Записанные строки по приёмникам")
+metrics.describe("sink_write_seconds", "Время записи блоков по приёмникам")
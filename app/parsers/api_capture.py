@@ -0,0 +1,62 @@
+"""Разбор JSON-ответов поисковых API магазинов, перехваченных со страницы"""
+from typing import Any
+
+NAME_KEYS = ("name", "title", "productName", "fullName")
+PRICE_KEYS = ("price", "priceValue", "currentPrice", "finalPrice", "cost")
+URL_KEYS = ("url", "link", "href", "productUrl")
+# значение цены внутри вложенного объекта: {"price": {"value": 123}}
+PRICE_VALUE_KEYS = ("value", "amount", "current", "price")
+
+
+def _first(item: dict, keys: tuple[str, ...]) -> Any:
+    for key in keys:
+        if item.get(key) not in (None, ""):
+            return item[key]
+    return None
+
+
+def _price_text(value: Any) -> str | None:
+    """Цена строкой, как её отдал бы DOM: дальше она идёт через Parser._clear_price"""
+    if isinstance(value, dict):
+        value = _first(value, PRICE_VALUE_KEYS)
+    if isinstance(value, list) and value:
+        return _price_text(value[0])
+    if isinstance(value, bool) or value is None:
+        return None
+    return str(value)
+
+
+def _is_product(item: Any) -> bool:
+    return isinstance(item, dict) and _first(item, NAME_KEYS) is not None and _first(item, PRICE_KEYS) is not None
+
+
+def find_api_products(payload: Any, max_depth: int = 12) -> list[dict[str, str | None]]:
+    """
+    Первый (ближайший к корню) список товаров в ответе API.
+
+    Товаром считается объект с названием и ценой (``NAME_KEYS``/``PRICE_KEYS``), список —
+    товарным, если такие объекты в нём преобладают. Возвращает сырые поля name/price/href
+    в том же виде, что и ``EXTRACT_SCRIPT``, или пустой список.
+    """
+    level = [payload]
+    for _ in range(max_depth):
+        next_level = []
+        for node in level:
+            if isinstance(node, dict):
+                next_level.extend(node.values())
+            elif isinstance(node, list):
+                products = [item for item in node if _is_product(item)]
+                if products and len(products) * 2 >= len(node):
+                    return [
+                        {
+                            "name": str(_first(item, NAME_KEYS)),
+                            "price": _price_text(_first(item, PRICE_KEYS)),
+                            "href": href if isinstance(href := _first(item, URL_KEYS), str) else None,
+                        }
+                        for item in products
+                    ]
+                next_level.extend(node)
+        if not next_level:
+            break
+        level = next_level
+    return []
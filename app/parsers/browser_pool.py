@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+
+from app.parsers.parser import CONTEXT_OPTIONS, LAUNCH_ARGS, STEALTH_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    """
+    Пул страниц одного headless Chromium, открытых заранее и переиспользуемых между поисками.
+
+    Страницы распределены по ``contexts`` контекстам браузера и выдаются через
+    ``page()``. Страница, на которой поиск упал, или отработавшая ``max_page_uses``
+    поисков закрывается и заменяется новой в том же контексте — так не копятся
+    обработчики, память вкладки и состояние после ошибок.
+
+        async with BrowserPool(size=12) as pool:
+            products = await OzonParser(pool, "перфоратор").search_products()
+    """
+
+    def __init__(
+            self,
+            size: int = 8,
+            contexts: int = 2,
+            headless: bool = True,
+            max_page_uses: int = 50,
+    ) -> None:
+        self.size = size
+        self.contexts_count = max(1, min(contexts, size))
+        self.headless = headless
+        self.max_page_uses = max_page_uses
+        self.recycled = 0
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+        self._contexts: list[BrowserContext] = []
+        self._idle: asyncio.Queue[Page] = asyncio.Queue()
+        self._uses: Counter[Page] = Counter()
+        self._page_context: dict[Page, BrowserContext] = {}
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        for _ in range(self.contexts_count):
+            context = await self._browser.new_context(**CONTEXT_OPTIONS)
+            await context.add_init_script(STEALTH_SCRIPT)
+            self._contexts.append(context)
+        pages = await asyncio.gather(
+            *(self._new_page(self._contexts[i % self.contexts_count]) for i in range(self.size))
+        )
+        for page in pages:
+            self._idle.put_nowait(page)
+        logger.info(
+            "Пул браузера запущен: %s страниц в %s контекстах (headless=%s)",
+            self.size, self.contexts_count, self.headless
+        )
+
+    async def close(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("Пул браузера закрыт, заменено страниц: %s", self.recycled)
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """Взять свободную страницу; ждёт, пока не освободится одна из ``size``"""
+        page = await self._idle.get()
+        healthy = False
+        try:
+            yield page
+            healthy = True
+        finally:
+            self._uses[page] += 1
+            if healthy and not page.is_closed() and self._uses[page] < self.max_page_uses:
+                self._idle.put_nowait(page)
+            else:
+                await self._replace(page)
+
+    async def _new_page(self, context: BrowserContext) -> Page:
+        page = await context.new_page()
+        self._page_context[page] = context
+        return page
+
+    async def _replace(self, page: Page) -> None:
+        context = self._page_context.pop(page)
+        self._uses.pop(page, None)
+        self.recycled += 1
+        try:
+            await page.close()
+        except Exception as e:
+            logger.debug("Не удалось закрыть страницу: %s", e)
+        try:
+            new_page = await self._new_page(context)
+        except Exception:
+            # без замены пул уменьшится на одну страницу, но поиски продолжатся
+            logger.exception("Не удалось открыть страницу взамен закрытой")
+            return
+        self._idle.put_nowait(new_page)
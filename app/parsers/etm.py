@@ -1,6 +1,8 @@
 import asyncio
+from decimal import Decimal
+from urllib.parse import urljoin
 
-from playwright.async_api import expect, Locator, Page, Browser
+from playwright.async_api import expect, Page
 
 from app.parsers.parser import Parser
 
@@ -8,37 +10,36 @@ from app.parsers.parser import Parser
 class EtmParser(Parser):
     BASE_URL = r"https://www.etm.ru"
     SHOP_NAME = "ЭТМ"
-
-    def __init__(self, browser: Browser, word: str, delay: float = 0.5):
-        super().__init__(word=word, delay=delay)
-        self._browser = browser
-
-    async def search_products(self):
-        page = await self.get_page(browser=self._browser, url=self.BASE_URL)
+    FIRST_PARTY_HOSTS = ("etm.ru",)
+    SEARCH_API_PATTERNS = (r"etm\.ru/api/.*(search|goods)",)
+    TILE_SELECTOR = 'tr[data-testid^="cart-row_wrapper-"]'
+    FIELD_SELECTORS = {
+        "name": ('[data-testid="link-good-name"]', "textContent"),
+        "href": ('[data-testid="link-good-name"]', "@href"),
+        "price": ('td[data-testid="cart-row-7"] p', "textContent"),
+    }
+
+    async def _search(self, page: Page):
+        # из API берём только выдачу после выбора сортировки
+        self._capture_armed = False
 
         # Вводим данные в поисковую строку и нажимаем "Enter"
         await self._perform_search(page)
         # Устанавливаем горизонтальное отображение товаров и включаем сортировку "По наличию"
         await page.get_by_test_id("FormatListBulletedIcon").click()
         await self._select_sort_option(page, option_text='По наличию')
+        self._capture_armed = True
 
         # дожидаемся загрузки страницы
         await page.locator('#nprogress').wait_for(state='hidden')
 
-        # Пролистываем вниз страницы
-        await self._scroll_step_by_step(page=page)
-
-        await page.wait_for_load_state("networkidle")
+        # Пролистываем вниз страницы, пока подгружаются строки
+        await self._scroll_until_stable(page=page)
 
-        rows = page.locator('tr[data-testid^="cart-row_wrapper-"]')
+        rows = page.locator(self.TILE_SELECTOR)
         await expect(rows.first).to_be_visible()
 
-        count = await rows.count()
-        products = []
-        for i in range(count):
-            product = rows.nth(i)
-            products.append(await self._parse_product(product))
-        return products
+        return await self._extract_products(page)
 
 
     async def _perform_search(self, page: Page) -> None:
@@ -48,21 +49,13 @@ class EtmParser(Parser):
         await input_field.type(self.word, delay=20)
         await input_field.press("Enter")
 
-    async def _parse_product(self, product: Locator) -> dict[str, str | float | None]:
-        name_locator = product.get_by_test_id("link-good-name")
-        name = await name_locator.text_content() if await name_locator.count() > 0 else None
-
-        price_locator = product.locator('td[data-testid="cart-row-7"] p')
-        raw_price = await price_locator.text_content() if await price_locator.count() > 0 else None
-        price = self._clear_price(raw_price)
-
-        href = await name_locator.get_attribute("href") if await name_locator.count() > 0 else None
-
+    def _parse_product(self, raw: dict[str, str | None]) -> dict[str, str | Decimal | None]:
         return {
             "shop_name": self.SHOP_NAME,
-            "name": name,
-            "price": price,
-            "url": self.BASE_URL + href if href else None
+            "name": raw["name"],
+            "price": self._clear_price(raw["price"]),
+            # из API адрес может прийти уже абсолютным
+            "url": urljoin(self.BASE_URL, raw["href"]) if raw["href"] else None
         }
 
     @staticmethod
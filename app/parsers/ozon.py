@@ -1,7 +1,9 @@
 import asyncio
+import json
 from pprint import pprint
+from urllib.parse import urljoin
 
-from playwright.async_api import Page, expect, Locator, Browser
+from playwright.async_api import Page, expect
 
 from app.parsers.parser import Parser
 
@@ -9,10 +11,16 @@ from app.parsers.parser import Parser
 class OzonParser(Parser):
     BASE_URL = r"https://www.ozon.ru"
     SHOP_NAME = "Озон"
-
-    def __init__(self, browser: Browser, word: str, delay: float = 0.5):
-        super().__init__(word=word, delay=delay)
-        self._browser = browser
+    FIRST_PARTY_HOSTS = ("ozon.ru", "ozone.ru", "ozonusercontent.com")
+    # выдачу отдаёт entrypoint/composer API: виджеты с товарами лежат JSON-строками в widgetStates
+    SEARCH_API_PATTERNS = (r"/api/(entrypoint|composer)-api\.bx/page/json/v2\?url=(/|%2F)search",)
+    RESULT_WIDGETS = ("searchResultsV2", "tileGridDesktop")
+    TILE_SELECTOR = "div.tile-root"
+    FIELD_SELECTORS = {
+        "name": ("span.tsBody500Medium", "textContent"),
+        "price": ("span.tsHeadline500Medium", "textContent"),
+        "href": ("a[href*='/product/']", "@href"),
+    }
 
     async def _perform_search(self, page: Page) -> None:
         search_input = page.locator('input[placeholder="Искать на Ozon"]')
@@ -20,38 +28,51 @@ class OzonParser(Parser):
         await search_input.fill(self.word)
         await search_input.press("Enter")
 
-    async def _parse_product(self, product: Locator):
-        name_locator = product.locator("span.tsBody500Medium")
-        name = await name_locator.text_content() if await name_locator.count() > 0 else None
-
-        price_locator = product.locator("span.tsHeadline500Medium")
-        price_raw = await price_locator.text_content() if await price_locator.count() > 0 else "0"
-
-        href_locator = product.locator("a[href*='/product/']")
-        href = await href_locator.first.get_attribute("href") if await href_locator.count() > 0 else None
-
-        price = float(self._clear_price(price_raw))
+    def _parse_product(self, raw: dict[str, str | None]):
+        # без цены на плитке — 0, как и раньше
+        price = self._clear_price(raw["price"] if raw["price"] is not None else "0")
+        href = raw["href"]
 
         return {
             "shop_name": self.SHOP_NAME,
-            "name": name,
+            "name": raw["name"],
             "price": price,
-            "url": self.BASE_URL + href if href else None,
+            "url": urljoin(self.BASE_URL, href) if href else None,
         }
 
-    async def search_products(self):
-        page = await self.get_page(browser=self._browser, url=self.BASE_URL)
+    def _products_from_payload(self, payload):
+        states = payload.get("widgetStates") if isinstance(payload, dict) else None
+        if not states:
+            return super()._products_from_payload(payload)
+        products = []
+        for key, state in states.items():
+            if not key.startswith(self.RESULT_WIDGETS):
+                continue
+            state = json.loads(state) if isinstance(state, str) else state
+            for item in state.get("items", []):
+                raw = self._raw_from_tile(item)
+                if raw["name"]:
+                    products.append(self._parse_product(raw))
+        return products
+
+    @staticmethod
+    def _raw_from_tile(item: dict) -> dict[str, str | None]:
+        # плитка — набор «атомов»: название в textAtom с id=name, цена в priceV2 со стилем PRICE
+        name = price = None
+        for atom in item.get("mainState", []):
+            if atom.get("type") == "textAtom" and atom.get("id") == "name" and name is None:
+                name = atom.get("textAtom", {}).get("text")
+            elif atom.get("type") == "priceV2" and price is None:
+                price = next(
+                    (p.get("text") for p in atom.get("priceV2", {}).get("price", []) if p.get("textStyle") == "PRICE"),
+                    None
+                )
+        return {"name": name, "price": price, "href": (item.get("action") or {}).get("link")}
+
+    async def _search(self, page: Page):
         await self._perform_search(page=page)
 
-        await page.wait_for_selector("div.tile-root")
-        await self._scroll_step_by_step(page, max_scrolls=4)
-
-        products = page.locator("div.tile-root")
-        count = await products.count()
-        results = []
-
-        for i in range(count):
-            product = products.nth(i)
-            results.append(await self._parse_product(product))
+        await page.wait_for_selector(self.TILE_SELECTOR)
+        await self._scroll_until_stable(page, max_scrolls=4)
 
-        return results
+        return await self._extract_products(page)
@@ -1,80 +1,271 @@
 import asyncio
+import logging
 import re
+from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
+from decimal import Decimal
+from urllib.parse import urlsplit
 
-from playwright.async_api import async_playwright, Page, Browser
+from typing import TYPE_CHECKING, AsyncIterator
 
+from playwright.async_api import (
+    async_playwright, Page, Browser, BrowserContext, Request, Response, Route, TimeoutError as PlaywrightTimeoutError
+)
+
+from app.metrics import metrics
+from app.parsers.api_capture import find_api_products
+from app.prices import parse_price
+
+if TYPE_CHECKING:
+    from app.parsers.browser_pool import BrowserPool
+
+logger = logging.getLogger(__name__)
+
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--start-maximized"
+]
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1366, "height": 768},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/115.0.0.0 Safari/537.36",
+}
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
+    Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});
+"""
+
+# Извлечение полей всех плиток одним вызовом в браузере. Поле описывается парой
+# (CSS-селектор внутри плитки, свойство): "textContent", "innerText" или "@атрибут".
+# Если элемент не найден, значение — null.
+EXTRACT_SCRIPT = """
+(tiles, fields) => tiles.map(tile => {
+    const row = {};
+    for (const [name, [selector, prop]] of Object.entries(fields)) {
+        const el = tile.querySelector(selector);
+        if (!el) {
+            row[name] = null;
+        } else if (prop.startsWith("@")) {
+            row[name] = el.getAttribute(prop.slice(1));
+        } else {
+            row[name] = el[prop];
+        }
+    }
+    return row;
+})
+"""
+
+# счётчики и реклама: блокируются всегда, даже если магазин не задал FIRST_PARTY_HOSTS
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "mc.yandex.ru", "an.yandex.ru", "yandex.ru/ads", "top-fwz1.mail.ru", "vk.com/rtrg",
+    "facebook.net", "criteo.com", "mytarget.ru", "adriver.ru", "tiktok.com",
+)
+TILES_GREW_SCRIPT = "([selector, count]) => document.querySelectorAll(selector).length > count"
+
+
+class Parser(ABC):
+    BASE_URL: str
+    SHOP_NAME: str
+    # плитка товара в результатах поиска и её поля для EXTRACT_SCRIPT
+    TILE_SELECTOR: str
+    FIELD_SELECTORS: dict[str, tuple[str, str]]
+    # политика загрузки: эти типы ресурсов не запрашиваются вовсе, а при заданных
+    # FIRST_PARTY_HOSTS — и всё, что грузится с других доменов
+    BLOCKED_RESOURCE_TYPES: frozenset[str] = frozenset({"image", "media", "font"})
+    FIRST_PARTY_HOSTS: tuple[str, ...] = ()
+    # регулярные выражения URL поисковых API, чьи JSON-ответы заполняют выдачу
+    SEARCH_API_PATTERNS: tuple[str, ...] = ()
+    # перехват включён по умолчанию, только когда шаблоны и формат ответа проверены на живом магазине
+    CAPTURE_API_BY_DEFAULT: bool = False
 
-class Parser:
     def __init__(
             self,
+            browser: "Browser | BrowserContext | BrowserPool",
             word: str,
             delay: float = 0.5,
+            block_resources: bool = True,
+            capture_api: bool | None = None,
     ):
         self.word = word
         self._delay = delay
+        # браузер/контекст (страница на каждый поиск) или пул заранее открытых страниц
+        self._browser = browser
+        self.block_resources = block_resources
+        # брать товары из перехваченного JSON поискового API, а DOM разбирать только без него;
+        # None — как задано для магазина (CAPTURE_API_BY_DEFAULT)
+        if capture_api is None:
+            capture_api = self.CAPTURE_API_BY_DEFAULT
+        self.capture_api = capture_api and bool(self.SEARCH_API_PATTERNS)
+        # ответы API до этого момента (например, до выбора сортировки) не принимаются
+        self._capture_armed = True
 
     @classmethod
     @asynccontextmanager
-    async def get_browser(cls):
+    async def get_browser(cls, headless: bool = False):
         async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=False,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--start-maximized"
-                ]
-            )
-            context = await browser.new_context(
-                viewport={"width": 1366, "height": 768},
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                           "AppleWebKit/537.36 (KHTML, like Gecko) "
-                           "Chrome/115.0.0.0 Safari/537.36"
-            )
+            browser = await p.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+            context = await browser.new_context(**CONTEXT_OPTIONS)
             try:
                 yield context
             finally:
                 await browser.close()
 
     @classmethod
-    async def get_page(cls, browser: Browser, url: str, timeout: int = 30000) -> Page:
+    async def get_page(cls, browser: Browser | BrowserContext, url: str, timeout: int = 30000) -> Page:
         page: Page = await browser.new_page()
-        await page.add_init_script(
-            """
-            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-            Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
-            Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});
-            """
-        )
+        await page.add_init_script(STEALTH_SCRIPT)
         await page.goto(url, timeout=timeout)
         return page
 
+    @asynccontextmanager
+    async def open_page(self, timeout: int = 30000) -> AsyncIterator[Page]:
+        """Страница магазина: из пула (возвращается в пул) или новая (закрывается после поиска)"""
+        from app.parsers.browser_pool import BrowserPool
 
-    @staticmethod
-    async def _scroll_step_by_step(page, step: int = 500, delay: float = 0.3, max_scrolls: int = 5) -> None:
+        if isinstance(self._browser, BrowserPool):
+            async with self._browser.page() as page, self._routing(page):
+                await page.goto(self.BASE_URL, timeout=timeout)
+                yield page
+            return
+        page = await self._browser.new_page()
+        try:
+            await page.add_init_script(STEALTH_SCRIPT)
+            async with self._routing(page):
+                await page.goto(self.BASE_URL, timeout=timeout)
+                yield page
+        finally:
+            await page.close()
+
+    @asynccontextmanager
+    async def _routing(self, page: Page) -> AsyncIterator[None]:
+        """Политика блокировки на время поиска; снимается, чтобы страницу из пула мог взять другой магазин"""
+        if not self.block_resources:
+            yield
+            return
+        handler = self._route
+        await page.route("**/*", handler)
+        try:
+            yield
+        finally:
+            if not page.is_closed():
+                await page.unroute("**/*", handler)
+
+    async def _route(self, route: Route) -> None:
+        request = route.request
+        if self._is_blocked(request):
+            metrics.inc("shop_blocked_requests_total", shop=type(self).__name__, type=request.resource_type)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @classmethod
+    def _is_blocked(cls, request: Request) -> bool:
+        resource_type = request.resource_type
+        url = request.url
+        if any(tracker in url for tracker in TRACKER_HOSTS):
+            return True
+        if resource_type in cls.BLOCKED_RESOURCE_TYPES:
+            return True
+        host = urlsplit(url).hostname
+        if not cls.FIRST_PARTY_HOSTS or not host:
+            return False
+        if resource_type == "document" and request.frame.parent_frame is None:
+            return False  # переход основной страницы не трогаем
+        return not any(host == allowed or host.endswith("." + allowed) for allowed in cls.FIRST_PARTY_HOSTS)
+
+    async def search_products(self) -> list[dict[str, str | Decimal | None]]:
+        async with self.open_page() as page:
+            if not self.capture_api:
+                return await self._search(page)
+            return await self._search_with_capture(page)
+
+    async def _search_with_capture(self, page: Page) -> list[dict[str, str | Decimal | None]]:
+        """
+        Поиск с перехватом ответа API: разбор DOM идёт параллельно и отменяется,
+        как только пришёл ответ с товарами; если подходящего ответа нет — результат DOM.
+        """
+        captured: asyncio.Future[list[dict]] = asyncio.get_running_loop().create_future()
+        patterns = [re.compile(pattern) for pattern in self.SEARCH_API_PATTERNS]
+
+        async def on_response(response: Response) -> None:
+            if captured.done() or not self._capture_armed or not response.ok:
+                return
+            if not any(pattern.search(response.url) for pattern in patterns):
+                return
+            try:
+                products = self._products_from_payload(await response.json())
+            except Exception as e:
+                logger.debug("%s: не удалось разобрать ответ %s: %s", self.SHOP_NAME, response.url, e)
+                return
+            if products and not captured.done():
+                captured.set_result(products)
+
+        page.on("response", on_response)
+        dom_search = asyncio.create_task(self._search(page))
+        try:
+            await asyncio.wait({captured, dom_search}, return_when=asyncio.FIRST_COMPLETED)
+            if captured.done():
+                metrics.inc("shop_results_source_total", shop=type(self).__name__, source="api")
+                return captured.result()
+            metrics.inc("shop_results_source_total", shop=type(self).__name__, source="dom")
+            return dom_search.result()
+        finally:
+            page.remove_listener("response", on_response)
+            if not dom_search.done():
+                dom_search.cancel()
+                await asyncio.gather(dom_search, return_exceptions=True)
+            captured.cancel()
+
+    def _products_from_payload(self, payload) -> list[dict[str, str | Decimal | None]]:
+        """Товары из JSON поискового API в том же формате, что и из DOM"""
+        return [self._parse_product(raw) for raw in find_api_products(payload)]
+
+    @abstractmethod
+    async def _search(self, page: Page) -> list[dict[str, str | Decimal | None]]:
+        """Поиск ``self.word`` на открытой главной странице магазина"""
+
+    async def _extract_products(self, page: Page) -> list[dict[str, str | Decimal | None]]:
+        """Все товары страницы за один запрос к браузеру вместо нескольких на каждую плитку"""
+        with metrics.timer("shop_extract_seconds", shop=type(self).__name__):
+            raw_products = await page.locator(self.TILE_SELECTOR).evaluate_all(EXTRACT_SCRIPT, self.FIELD_SELECTORS)
+        return [self._parse_product(raw) for raw in raw_products]
+
+    @abstractmethod
+    def _parse_product(self, raw: dict[str, str | None]) -> dict[str, str | Decimal | None]:
+        """Товар из сырых значений FIELD_SELECTORS"""
+
+    async def _scroll_until_stable(self, page: Page, max_scrolls: int = 5, settle_timeout: float = 1.5) -> int:
         """
-        Прокручивает страницу вниз по шагам (например, 500px за раз).
+        Прокручивает страницу вниз, пока подгружаются новые плитки товаров.
+
+        После каждой прокрутки ждёт роста числа плиток ``TILE_SELECTOR`` не дольше
+        ``settle_timeout`` секунд: ожидание заканчивается сразу, как только плитки
+        появились, а если за это время ничего не добавилось — список считается полным.
 
         :param page: Playwright page объект
-        :param step: количество пикселей за один скролл
-        :param delay: задержка между скроллами (сек)
-        :param max_scrolls: максимальное количество шагов
+        :param max_scrolls: максимальное количество прокруток
+        :param settle_timeout: сколько ждать новых плиток после прокрутки (сек)
+        :return: число плиток на странице
         """
+        count = await page.locator(self.TILE_SELECTOR).count()
         for _ in range(max_scrolls):
-            await page.evaluate(f"window.scrollBy(0, {step});")
-            await asyncio.sleep(delay)
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+            try:
+                await page.wait_for_function(
+                    TILES_GREW_SCRIPT, arg=[self.TILE_SELECTOR, count], timeout=settle_timeout * 1000
+                )
+            except PlaywrightTimeoutError:
+                break
+            count = await page.locator(self.TILE_SELECTOR).count()
+        return count
 
     @staticmethod
-    def _clear_price(price: str) -> float | None:
+    def _clear_price(price: str | None) -> Decimal | None:
         """
-        Очищает строку с ценой и возвращает float.
-        Например: "797.26 ₽/шт" -> 797.26
+        Очищает строку с ценой и возвращает Decimal.
+        Например: "797.26 ₽/шт" -> 797.26, "1 234,56 ₽" -> 1234.56
         """
-        if not price:
-            return None
-        # Оставляем только цифры и точку
-        cleaned = re.sub(r"[^\d.,]", "", price)
-        try:
-            return float(cleaned)
-        except ValueError:
-            return None
\ No newline at end of file
+        return parse_price(price)
\ No newline at end of file
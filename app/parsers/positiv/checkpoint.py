@@ -0,0 +1,151 @@
+import json
+import logging
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlJournal:
+    """
+    Журнал прогресса обхода для продолжения после сбоя (``--resume``).
+
+    Каждая полученная карточка товара сразу сохраняется на диск (сжатый JSON),
+    а завершённая конечная категория — списком своих товаров в порядке листинга.
+    При продолжении завершённые категории отдаются из журнала без запросов, а в
+    незавершённых повторно запрашиваются только отсутствующие карточки. Запись, которую
+    не удаётся прочитать текущей схемой (повреждена или сохранена с другим
+    ``--fast-validation``), считается отсутствующей и запрашивается заново.
+
+    Запись идёт в SQLite в режиме WAL без fsync на каждую вставку, коммиты
+    группируются по ``commit_every`` записей или ``commit_interval`` секунд —
+    при сбое теряется не больше последней пачки.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS products (
+            public_id TEXT PRIMARY KEY,
+            payload BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS leaves (
+            public_id TEXT PRIMARY KEY,
+            product_ids TEXT NOT NULL,
+            completed_at REAL NOT NULL
+        );
+    """
+
+    def __init__(
+            self,
+            path: str | Path,
+            resume: bool = False,
+            commit_every: int = 1000,
+            commit_interval: float = 5.0,
+    ) -> None:
+        self.path = Path(path)
+        if not resume:
+            self._remove_files()
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.resumed_leaves = 0
+        self.resumed_products = 0
+        self.invalid_products = 0
+        self._pending_writes = 0
+        self._last_commit = time.monotonic()
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        if resume:
+            leaves, products = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM leaves), (SELECT COUNT(*) FROM products)"
+            ).fetchone()
+            logger.info(
+                "Продолжение обхода по журналу %s: завершено категорий %s, сохранено товаров %s",
+                self.path, leaves, products
+            )
+
+    def load_product(self, public_id: str, schema: type[BaseModel]) -> BaseModel | None:
+        row = self._conn.execute(
+            "SELECT payload FROM products WHERE public_id = ?", (public_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            product = schema.model_validate_json(zlib.decompress(row[0]))
+        except (zlib.error, ValueError) as e:
+            if not self.invalid_products:
+                logger.warning("Запись товара %s в журнале %s не читается схемой %s: %s",
+                               public_id, self.path, schema.__name__, e)
+            self.invalid_products += 1
+            # запись всё равно бесполезна; без неё повторная проверка той же категории не посчитает её снова
+            self._conn.execute("DELETE FROM products WHERE public_id = ?", (public_id,))
+            self._written()
+            return None
+        self.resumed_products += 1
+        return product
+
+    def save_product(self, product: BaseModel) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO products (public_id, payload) VALUES (?, ?)",
+            (product.public_id, zlib.compress(product.model_dump_json(by_alias=True).encode(), 1))
+        )
+        self._written()
+
+    def load_leaf(self, public_id: str, schema: type[BaseModel]) -> list[BaseModel] | None:
+        """Товары завершённой категории или None, если категория не завершена"""
+        row = self._conn.execute(
+            "SELECT product_ids FROM leaves WHERE public_id = ?", (public_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        products = []
+        for product_id in json.loads(row[0]):
+            product = self.load_product(product_id, schema)
+            if product is None:
+                # журнал неполон (сбой между коммитами) — категорию обработаем заново
+                return None
+            products.append(product)
+        self.resumed_leaves += 1
+        return products
+
+    def complete_leaf(self, public_id: str, products: list[BaseModel]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO leaves (public_id, product_ids, completed_at) VALUES (?, ?, ?)",
+            (public_id, json.dumps([p.public_id for p in products]), time.time())
+        )
+        self._written()
+
+    def _written(self) -> None:
+        self._pending_writes += 1
+        if (
+                self._pending_writes >= self.commit_every
+                or time.monotonic() - self._last_commit >= self.commit_interval
+        ):
+            self.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending_writes = 0
+        self._last_commit = time.monotonic()
+
+    def close(self, finished: bool = False) -> None:
+        """Закрыть журнал; после успешной выгрузки (``finished``) он больше не нужен и удаляется"""
+        self.commit()
+        self._conn.close()
+        if self.resumed_leaves or self.resumed_products:
+            logger.info(
+                "Из журнала взято категорий %s, товаров %s",
+                self.resumed_leaves, self.resumed_products
+            )
+        if self.invalid_products:
+            logger.warning("Записей журнала запрошено заново из-за ошибки чтения: %s", self.invalid_products)
+        if finished:
+            self._remove_files()
+
+    def _remove_files(self) -> None:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
@@ -6,7 +6,10 @@ import httpx
 from openpyxl import Workbook
 from openpyxl.styles import Font
 
+from app.metrics import metrics
 from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.rows import HEADERS, product_to_row
+from app.parsers.positiv.sinks import ExcelSink, export_products
 
 logger = logging.getLogger(__name__)
 BASE_DIR = Path(__file__).parent.parent.parent.parent
@@ -16,20 +19,13 @@ async def save_products_to_excel(parser: PositiveParserAPI, filename: str):
     wb = Workbook()
     wb.remove(wb.active)  # удаляем стандартный пустой лист
 
-    headers = [
-        "Категория", "public_id", "Имя", "Ссылка на картинку", "Код",
-        "Описание", "Остатки", "Ед.Измерения",
-        "Доступность", "Цена", "Валюта",
-        "Ссылка 1С", "Дата публикации", "Дата снятия публикации", "Дата создания"
-    ]
-
     categories = await parser.get_categories()
     categories_with_children = parser.make_categories_with_children(categories)
     main_categories = (c for c in categories_with_children.values() if c.parent_id is None)
 
     async def process_category(main_category):
         ws = wb.create_sheet(title=main_category.name[:31])  # имя листа не длиннее 31 символа
-        ws.append(headers)
+        ws.append(HEADERS)
 
         async for depth, category_name, products in parser.walk_categories(main_category):
             indent = "    " * depth
@@ -37,25 +33,10 @@ async def save_products_to_excel(parser: PositiveParserAPI, filename: str):
             ws.cell(row=ws.max_row, column=1).font = Font(bold=True)
 
             if products:
-                for product in products:
-                    row = [
-                        category_name,
-                        product.public_id,
-                        product.name,
-                        str(product.imageUrl) if product.imageUrl else "",
-                        product.code,
-                        product.description,
-                        product.count,
-                        product.unitOfMeasurement,
-                        product.isAvailable,
-                        product.price,
-                        product.currency,
-                        product.links1c,
-                        product.publishedDate.strftime("%d-%m-%Y") if product.publishedDate else "",
-                        product.unpublishedDate.strftime("%d-%m-%Y") if product.unpublishedDate else "",
-                        product.createdAt.strftime("%d-%m-%Y") if product.createdAt else "",
-                    ]
-                    ws.append(row)
+                with metrics.timer("sink_write_seconds", sink="Workbook"):
+                    for product in products:
+                        ws.append(product_to_row(category_name, product))
+                metrics.inc("sink_rows_total", len(products), sink="Workbook")
 
                 logger.info(
                     f"Записаны %d товаров категории %s на листе %s",
@@ -66,8 +47,17 @@ async def save_products_to_excel(parser: PositiveParserAPI, filename: str):
 
     await asyncio.gather(*(process_category(c) for c in main_categories))
 
-    wb.save(BASE_DIR / filename)
+    with metrics.stage("excel_save"):
+        wb.save(BASE_DIR / filename)
     wb.close()
-    logger.info(f"Excel сохранён в %s", filename)
+    logger.info("Excel сохранён в %s", filename)
 
 
+async def stream_products_to_excel(
+        parser: PositiveParserAPI,
+        filename: str,
+        queue_size: int = 4
+):
+    """Потоковый вариант save_products_to_excel с тем же форматом листов"""
+    await export_products(parser, [ExcelSink(BASE_DIR / filename)], queue_size=queue_size)
+    logger.info("Excel сохранён в %s", filename)
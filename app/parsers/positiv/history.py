@@ -0,0 +1,390 @@
+"""
+История цен и остатков: что изменилось между запусками.
+
+Каталог истории — файлы сегментов, по одному на запуск (``run-000001.seg``), плюс
+``state.seg`` с последними известными значениями товаров. В сегмент запуска попадают
+только товары, у которых что-то изменилось: цена, остаток, доступность, появление,
+снятие с публикации. Сегменты не переписываются, старые запуски не трогаются.
+
+Сегмент хранит данные по столбцам, каждый столбец сжат zlib отдельно; строки
+(public_id, категории) — словарём. Запрос читает заголовки сегментов, отбрасывает
+запуски вне интервала и распаковывает только нужные столбцы, поэтому отчёт за год
+ежедневных запусков строится за секунды.
+"""
+import json
+import logging
+import os
+import struct
+import zlib
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from app.parsers.positiv.rows import CATEGORY_PATH_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PHS1"
+_NULL = -1  # нет цены / доступности
+
+# флаги изменения
+PRICE = 1
+STOCK = 2
+AVAILABILITY = 4
+NEW = 8
+UNPUBLISHED = 16
+REPUBLISHED = 32
+KINDS = {
+    "price": PRICE,
+    "stock": STOCK,
+    "availability": AVAILABILITY,
+    "new": NEW,
+    "unpublished": UNPUBLISHED,
+    "republished": REPUBLISHED,
+}
+
+
+def _encode_strings(values: Iterable[str]) -> bytes:
+    return "\x00".join(values).encode()
+
+
+def _decode_strings(data: bytes) -> list[str]:
+    return data.decode().split("\x00") if data else []
+
+
+def _int_column(values: Iterable[int], typecode: str = "q") -> bytes:
+    return array(typecode, values).tobytes()
+
+
+class Segment:
+    """Файл сегмента: заголовок JSON и столбцы, каждый сжат отдельно"""
+
+    def __init__(self, path: Path, header: dict[str, Any], data_offset: int):
+        self.path = path
+        self.header = header
+        self._data_offset = data_offset
+
+    @classmethod
+    def write(cls, path: Path, meta: dict[str, Any], columns: dict[str, tuple[str, bytes]]) -> None:
+        """columns: имя -> (typecode array или "str", сырые байты); запись атомарная"""
+        blobs = []
+        layout = {}
+        offset = 0
+        for name, (kind, raw) in columns.items():
+            blob = zlib.compress(raw, 6)
+            layout[name] = [kind, offset, len(blob)]
+            blobs.append(blob)
+            offset += len(blob)
+        header = json.dumps({**meta, "columns": layout}, ensure_ascii=False).encode()
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC + struct.pack("<I", len(header)) + header)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: Path) -> "Segment":
+        with open(path, "rb") as f:
+            prefix = f.read(8)
+            if prefix[:4] != _MAGIC:
+                raise ValueError(f"{path} — не сегмент истории")
+            (length,) = struct.unpack("<I", prefix[4:])
+            header = json.loads(f.read(length))
+        return cls(path, header, 8 + length)
+
+    def column(self, name: str) -> list[str] | array:
+        kind, offset, length = self.header["columns"][name]
+        with open(self.path, "rb") as f:
+            f.seek(self._data_offset + offset)
+            raw = zlib.decompress(f.read(length))
+        if kind == "str":
+            return _decode_strings(raw)
+        values = array(kind)
+        values.frombytes(raw)
+        return values
+
+    @property
+    def rows(self) -> int:
+        return self.header["rows"]
+
+
+class Observation(NamedTuple):
+    """Значения товара в одном запуске"""
+    name: str
+    category: str
+    price_minor: int | None
+    count: int
+    available: bool | None
+    published: bool = True
+
+
+class Change(NamedTuple):
+    run: int
+    at: datetime
+    public_id: str
+    name: str
+    category: str
+    kinds: int
+    price_old: int | None
+    price_new: int | None
+    count_old: int | None
+    count_new: int | None
+    available: bool | None
+
+    @property
+    def kind_names(self) -> list[str]:
+        return [name for name, flag in KINDS.items() if self.kinds & flag]
+
+
+@dataclass
+class RunSummary:
+    run: int
+    at: datetime
+    observed: int
+    changes: dict[str, int]
+    bytes: int
+
+
+def _nullable(value: int | None) -> int:
+    return _NULL if value is None else value
+
+
+def _from_nullable(value: int) -> int | None:
+    return None if value == _NULL else value
+
+
+def _available(value: bool | None) -> int:
+    return _NULL if value is None else int(value)
+
+
+def category_matches(category: str, prefix: str) -> bool:
+    """Категория совпадает с путём prefix или вложена в него"""
+    return category == prefix or category.startswith(prefix + CATEGORY_PATH_SEPARATOR)
+
+
+class PriceHistory:
+    """
+    Каталог истории. ``record_run`` сравнивает наблюдения запуска с ``state.seg``
+    и дописывает сегмент изменений; ``changes`` и ``top_movers`` читают сегменты.
+    ``state.seg`` — производный файл (свёртка всех сегментов), он перезаписывается.
+
+    Товар считается снятым с публикации, если у него ``isPublished=False`` или его нет
+    в запуске, а в его последней известной категории в этом запуске были товары:
+    категории, пропущенные к сроку или с ошибкой листинга, не превращают свои товары
+    в снятые.
+    """
+
+    STATE = "state.seg"
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def segments(self) -> list[Segment]:
+        return [Segment.open(path) for path in sorted(self.directory.glob("run-*.seg"))]
+
+    def load_state(self) -> dict[str, tuple[str, str, int, int, int, int]]:
+        """public_id -> (name, category, price, count, available, published)"""
+        path = self.directory / self.STATE
+        if not path.exists():
+            return {}
+        segment = Segment.open(path)
+        return dict(zip(
+            segment.column("public_id"),
+            zip(
+                segment.column("name"), segment.column("category"), segment.column("price"),
+                segment.column("count"), segment.column("available"), segment.column("published"),
+            )
+        ))
+
+    def record_run(self, observed: dict[str, Observation], at: datetime | None = None) -> RunSummary:
+        """Записать запуск: сегмент изменений и новое состояние"""
+        at = at or datetime.now()
+        segments = sorted(self.directory.glob("run-*.seg"))
+        run = int(segments[-1].stem.removeprefix("run-")) + 1 if segments else 1
+        state = self.load_state()
+        active_categories = {o.category for o in observed.values()}
+
+        rows = []  # (public_id, category, kinds, price_old, price_new, count_old, count_new, available)
+        for public_id, o in observed.items():
+            price, available = _nullable(o.price_minor), _available(o.available)
+            previous = state.get(public_id)
+            if previous is None:
+                kinds, old_price, old_count = (NEW if o.published else 0), _NULL, _NULL
+            else:
+                _, _, old_price, old_count, old_available, published = previous
+                if not o.published:
+                    kinds = UNPUBLISHED if published else 0
+                else:
+                    kinds = REPUBLISHED if not published else 0
+                    kinds |= PRICE if old_price != price else 0
+                    kinds |= STOCK if old_count != o.count else 0
+                    kinds |= AVAILABILITY if old_available != available else 0
+            if kinds:
+                rows.append((public_id, o.category, kinds, old_price, price, old_count, o.count, available))
+            state[public_id] = (o.name.replace("\x00", " "), o.category, price, o.count, available, int(o.published))
+        for public_id, (name, category, price, count, available, published) in state.items():
+            if published and public_id not in observed and category in active_categories:
+                rows.append((public_id, category, UNPUBLISHED, price, price, count, count, available))
+                state[public_id] = (name, category, price, count, available, 0)
+
+        categories = sorted({row[1] for row in rows})
+        category_index = {category: i for i, category in enumerate(categories)}
+        path = self.directory / f"run-{run:06d}.seg"
+        Segment.write(path, {"run": run, "at": at.isoformat(timespec="seconds"), "rows": len(rows)}, {
+            "public_id": ("str", _encode_strings(row[0] for row in rows)),
+            "categories": ("str", _encode_strings(categories)),
+            "category": ("I", _int_column((category_index[row[1]] for row in rows), "I")),
+            "kinds": ("B", _int_column((row[2] for row in rows), "B")),
+            "price_old": ("q", _int_column(row[3] for row in rows)),
+            "price_new": ("q", _int_column(row[4] for row in rows)),
+            "count_old": ("q", _int_column(row[5] for row in rows)),
+            "count_new": ("q", _int_column(row[6] for row in rows)),
+            "available": ("b", _int_column((row[7] for row in rows), "b")),
+        })
+        self._write_state(state, run, at)
+
+        summary = RunSummary(
+            run=run,
+            at=at,
+            observed=len(observed),
+            changes={name: sum(1 for row in rows if row[2] & flag) for name, flag in KINDS.items()},
+            bytes=path.stat().st_size,
+        )
+        logger.info(
+            "История: запуск №%s, товаров %s, изменений %s (%s), сегмент %s КБ",
+            run, len(observed), len(rows),
+            ", ".join(f"{name}: {n}" for name, n in summary.changes.items() if n), summary.bytes // 1024
+        )
+        return summary
+
+    def _write_state(self, state: dict, run: int, at: datetime) -> None:
+        values = list(state.values())
+        meta = {"run": run, "at": at.isoformat(timespec="seconds"), "rows": len(values)}
+        Segment.write(self.directory / self.STATE, meta, {
+            "public_id": ("str", _encode_strings(state)),
+            "name": ("str", _encode_strings(v[0] for v in values)),
+            "category": ("str", _encode_strings(v[1] for v in values)),
+            "price": ("q", _int_column(v[2] for v in values)),
+            "count": ("q", _int_column(v[3] for v in values)),
+            "available": ("b", _int_column((v[4] for v in values), "b")),
+            "published": ("B", _int_column((v[5] for v in values), "B")),
+        })
+
+    def _scan(
+            self,
+            since: datetime | None,
+            until: datetime | None,
+            category: str | None,
+            kinds: int,
+    ) -> Iterator[tuple[Segment, datetime, list[int]]]:
+        """Сегменты запусков [since, until) и номера подходящих строк в них"""
+        for segment in self.segments():
+            at = datetime.fromisoformat(segment.header["at"])
+            if (since and at < since) or (until and at >= until) or not segment.rows:
+                continue
+            wanted = {
+                i for i, path in enumerate(segment.column("categories"))
+                if category is None or category_matches(path, category)
+            }
+            if not wanted:
+                continue
+            segment_kinds = segment.column("kinds")
+            category_column = segment.column("category")
+            rows = [
+                i for i in range(segment.rows)
+                if segment_kinds[i] & kinds and category_column[i] in wanted
+            ]
+            if rows:
+                yield segment, at, rows
+
+    def changes(
+            self,
+            since: datetime | None = None,
+            until: datetime | None = None,
+            category: str | None = None,
+            kinds: int = sum(KINDS.values()),
+    ) -> Iterator[Change]:
+        """Изменения в запусках [since, until), по умолчанию все; category — путь с подкатегориями"""
+        names = None
+        for segment, at, rows in self._scan(since, until, category, kinds):
+            if names is None:
+                names = self._names()
+            categories = segment.column("categories")
+            segment_kinds, category_column = segment.column("kinds"), segment.column("category")
+            public_ids = segment.column("public_id")
+            price_old, price_new = segment.column("price_old"), segment.column("price_new")
+            count_old, count_new = segment.column("count_old"), segment.column("count_new")
+            available = segment.column("available")
+            for i in rows:
+                yield Change(
+                    run=segment.header["run"],
+                    at=at,
+                    public_id=public_ids[i],
+                    name=names.get(public_ids[i], ""),
+                    category=categories[category_column[i]],
+                    kinds=segment_kinds[i],
+                    price_old=_from_nullable(price_old[i]),
+                    price_new=_from_nullable(price_new[i]),
+                    count_old=_from_nullable(count_old[i]),
+                    count_new=_from_nullable(count_new[i]),
+                    available=None if available[i] == _NULL else bool(available[i]),
+                )
+
+    def _names(self) -> dict[str, str]:
+        path = self.directory / self.STATE
+        if not path.exists():
+            return {}
+        segment = Segment.open(path)
+        return dict(zip(segment.column("public_id"), segment.column("name")))
+
+    def top_movers(
+            self,
+            since: datetime | None = None,
+            until: datetime | None = None,
+            category: str | None = None,
+            limit: int = 20,
+    ) -> list[dict[str, Any]]:
+        """
+        Товары с наибольшим относительным изменением цены за период: от цены до первого
+        изменения к цене после последнего. Цены в рублях, как у compare_prices.
+        """
+        # читаются только колонки цен: Change и названия — лишь для попавших в топ
+        first: dict[str, int] = {}
+        last: dict[str, tuple[int, str]] = {}
+        counts = Counter()
+        for segment, _, rows in self._scan(since, until, category, PRICE):
+            categories, category_column = segment.column("categories"), segment.column("category")
+            public_ids = segment.column("public_id")
+            price_old, price_new = segment.column("price_old"), segment.column("price_new")
+            for i in rows:
+                public_id = public_ids[i]
+                first.setdefault(public_id, price_old[i])
+                last[public_id] = price_new[i], categories[category_column[i]]
+                counts[public_id] += 1
+        movers = []
+        for public_id, (new, path) in last.items():
+            old, new = _from_nullable(first[public_id]), _from_nullable(new)
+            if not old or new is None or old == new:
+                continue
+            movers.append({
+                "public_id": public_id,
+                "name": "",
+                "category": path,
+                "price_old": old / 100,
+                "price_new": new / 100,
+                "diff": (new - old) / 100,
+                "diff_pct": round((new - old) / old * 100, 2),
+                "changes": counts[public_id],
+            })
+        movers.sort(key=lambda row: abs(row["diff_pct"]), reverse=True)
+        movers = movers[:limit]
+        if movers:
+            names = self._names()
+            for row in movers:
+                row["name"] = names.get(row["public_id"], "")
+        return movers
@@ -0,0 +1,207 @@
+import hashlib
+import itertools
+import logging
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiofiles
+import aiofiles.os
+
+logger = logging.getLogger(__name__)
+
+# TTL в секундах по эндпоинтам API, проверяются по порядку
+DEFAULT_TTLS: list[tuple[str, float]] = [
+    (r"/category$", 6 * 3600),
+    (r"/product/get-by-category/[^/]+$", 3600),
+    (r"/product/[^/]+$", 3 * 3600),
+]
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    path: Path
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+    size: int
+    ttl: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() - self.stored_at < self.ttl
+
+    def validators(self) -> dict[str, str]:
+        """Заголовки условного запроса для перепроверки записи"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    Дисковый кэш ответов API с TTL по эндпоинтам и LRU-вытеснением.
+
+    Тела ответов лежат отдельными файлами, индекс (ETag, Last-Modified, время
+    сохранения и последнего обращения) — в SQLite. Устаревшая запись перепроверяется
+    условным запросом; при 304 тело берётся с диска. Тело пишется во временный файл
+    и подменяется атомарно, время обращения при попаданиях фиксируется раз в
+    ``commit_every`` обновлений и при закрытии.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            stored_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            size INTEGER NOT NULL
+        )
+    """
+
+    def __init__(
+            self,
+            directory: str | Path,
+            max_bytes: int = 1024 ** 3,
+            ttls: list[tuple[str, float]] | None = None,
+            commit_every: int = 500,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or DEFAULT_TTLS)]
+        self.commit_every = commit_every
+        self._pending_writes = 0
+        self._tmp_names = itertools.count()
+        self._conn = sqlite3.connect(self.directory / "index.sqlite")
+        self._conn.execute(self._SCHEMA)
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self._ttls:
+            if pattern.search(url):
+                return ttl
+        return 0
+
+    @staticmethod
+    def make_key(url: str, params: dict | None = None) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def lookup(self, url: str, params: dict | None = None) -> CacheEntry | None:
+        ttl = self.ttl_for(url)
+        if ttl <= 0:
+            return None
+        key = self.make_key(url, params)
+        row = self._conn.execute(
+            "SELECT etag, last_modified, stored_at, size FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, stored_at, size = row
+        return CacheEntry(key, self._body_path(key), etag, last_modified, stored_at, size, ttl)
+
+    async def read(self, entry: CacheEntry, revalidated: bool = False) -> bytes | None:
+        """Прочитать тело записи; при 304 запись заново считается свежей"""
+        try:
+            async with aiofiles.open(entry.path, "rb") as f:
+                body = await f.read()
+        except FileNotFoundError:
+            self._delete(entry.key, entry.size)
+            return None
+
+        now = time.time()
+        if revalidated:
+            self.revalidated += 1
+            self._conn.execute(
+                "UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, entry.key)
+            )
+        else:
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, entry.key))
+        self._written()
+        self.bytes_saved += len(body)
+        return body
+
+    async def store(self, url: str, params: dict | None, body: bytes, headers) -> None:
+        self.misses += 1
+        if self.ttl_for(url) <= 0 or len(body) > self.max_bytes:
+            return
+        key = self.make_key(url, params)
+        previous = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+
+        # частично записанное тело не должно оказаться под именем записи
+        path = self._body_path(key)
+        tmp = path.with_name(f"{path.name}.{next(self._tmp_names)}.tmp")
+        async with aiofiles.open(tmp, "wb") as f:
+            await f.write(body)
+        await aiofiles.os.replace(tmp, path)
+
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(key, url, etag, last_modified, stored_at, accessed_at, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, url, headers.get("etag"), headers.get("last-modified"), now, now, len(body))
+        )
+        self.commit()
+        self._total_bytes += len(body) - (previous[0] if previous else 0)
+        if self._total_bytes > self.max_bytes:
+            await self._evict()
+
+    async def _evict(self) -> None:
+        """Удалить давно не использованные записи, пока кэш не уложится в 90% лимита"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+        evicted = 0
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            try:
+                await aiofiles.os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+            self._delete(key, size)
+            evicted += 1
+        logger.debug("Из HTTP-кэша вытеснено %s записей", evicted)
+
+    def _delete(self, key: str, size: int) -> None:
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._written()
+        self._total_bytes -= size
+
+    def _written(self) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def _body_path(self, key: str) -> Path:
+        return self.directory / f"{key}.body"
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+        logger.info(
+            "HTTP-кэш %s: попаданий %s, перепроверено (304) %s, промахов %s, сэкономлено %.1f MiB",
+            self.directory, self.hits, self.revalidated, self.misses, self.bytes_saved / 2 ** 20
+        )
@@ -0,0 +1,72 @@
+"""
+HTTP-клиент для API positive.ooo.
+
+Пул соединений подбирается под ``max_concurrent``: у клиента httpx по умолчанию держится
+не больше 20 соединений keep-alive, и при 100 одновременных запросах остальные
+соединения закрываются после каждого ответа и открываются заново. HTTP/2 (пакет h2)
+мультиплексирует запросы в одном соединении. JSON разбирается через orjson, если он
+установлен, иначе стандартным json.
+"""
+import json
+from importlib.util import find_spec
+from typing import Any, Callable, Iterable
+
+from httpx import AsyncClient, Limits
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+json_loads: Callable[[bytes | str], Any] = orjson.loads if orjson else json.loads
+JSON_DECODER = "orjson" if orjson else "json"
+
+# кодировка Accept-Encoding -> модуль, без которого httpx её не распакует
+COMPRESSION_MODULES = {
+    "gzip": None,
+    "deflate": None,
+    "br": "brotli",
+    "zstd": "zstandard",
+    "identity": None,
+}
+DEFAULT_COMPRESSION = ("gzip", "deflate")
+
+
+def accept_encoding(compression: Iterable[str]) -> str:
+    """Заголовок Accept-Encoding; ImportError, если для кодировки не установлен распаковщик"""
+    encodings = list(dict.fromkeys(compression)) or ["identity"]
+    for encoding in encodings:
+        if encoding not in COMPRESSION_MODULES:
+            raise ValueError(f"Неизвестное сжатие {encoding!r}, доступны: {', '.join(COMPRESSION_MODULES)}")
+        module = COMPRESSION_MODULES[encoding]
+        if module and find_spec(module) is None:
+            raise ImportError(f"Для сжатия {encoding} нужен пакет {module}: pip install {module}")
+    return ", ".join(encodings)
+
+
+def create_client(
+        max_concurrent: int = 100,
+        http2: bool = False,
+        compression: Iterable[str] = DEFAULT_COMPRESSION,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 15.0,
+        **kwargs,
+) -> AsyncClient:
+    """
+    Клиент с пулом на ``max_concurrent`` соединений, которые все остаются открытыми
+    между запросами (``keepalive_expiry`` секунд простоя).
+
+    С ``http2=True`` (нужен пакет h2: ``pip install price-parser[http2]``) запросы идут потоками
+    одного соединения; если сервер HTTP/2 не поддерживает, клиент работает по HTTP/1.1
+    с тем же пулом. Остальные аргументы передаются в ``AsyncClient``.
+    """
+    if http2 and find_spec("h2") is None:
+        raise ImportError("Для HTTP/2 нужен пакет h2: pip install price-parser[http2]")
+    limits = Limits(
+        max_connections=max_concurrent,
+        max_keepalive_connections=max_concurrent,
+        keepalive_expiry=keepalive_expiry,
+    )
+    headers = {"Accept": "application/json", "Accept-Encoding": accept_encoding(compression)}
+    headers.update(kwargs.pop("headers", None) or {})
+    return AsyncClient(http2=http2, limits=limits, headers=headers, timeout=timeout, **kwargs)
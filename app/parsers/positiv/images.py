@@ -0,0 +1,367 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import mimetypes
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import aiofiles
+import aiofiles.os
+from httpx import HTTPError, TimeoutException
+from tenacity import retry, retry_if_exception, stop_after_attempt
+
+from app.metrics import metrics
+from app.parsers.positiv.retry import THROTTLE_STATUSES, is_retryable, retry_after_from, wait_backoff
+
+if TYPE_CHECKING:
+    from app.parsers.positiv.positiv import PositiveParserAPI
+
+logger = logging.getLogger(__name__)
+
+# итог загрузки одного адреса
+DOWNLOADED = "downloaded"  # новое содержимое, записан файл
+DEDUPLICATED = "deduplicated"  # новое для адреса, но такой файл уже есть
+UNCHANGED = "unchanged"  # сервер ответил 200 с тем же содержимым
+NOT_MODIFIED = "not_modified"  # 304 на условный запрос
+RESUMED = "resumed"  # уже проверен в прерванном запуске
+FAILED = "failed"
+STATUSES = (DOWNLOADED, DEDUPLICATED, UNCHANGED, NOT_MODIFIED, RESUMED, FAILED)
+
+
+def image_urls(product: Any) -> list[str]:
+    """imageUrl и галерея товара; у облегчённой схемы галерея берётся из сырого JSON без валидации"""
+    urls = [product.imageUrl] if getattr(product, "imageUrl", None) else []
+    gallery = getattr(product, "images_raw", None)
+    if gallery is None:
+        gallery = getattr(product, "images", None)
+    if isinstance(gallery, list):
+        urls.extend(gallery)
+    return list(dict.fromkeys(str(url) for url in urls if url))
+
+
+@dataclass
+class ImageEntry:
+    url: str
+    sha256: str
+    etag: str | None
+    last_modified: str | None
+    checked_run: int
+    path: Path
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ImageStore:
+    """
+    Локальное зеркало изображений с адресацией по содержимому.
+
+    Файл называется по SHA-256 содержимого (``objects/ab/abcd….jpg``), поэтому одна и та же
+    картинка под разными адресами хранится один раз. Индекс в SQLite: адрес -> хеш, ETag,
+    Last-Modified и номер запуска, в котором адрес проверялся; по запускам — счётчики,
+    байты и время. Незавершённый запуск можно продолжить: адреса, уже проверенные в нём,
+    повторно не запрашиваются.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS images (
+            url TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            checked_run INTEGER NOT NULL,
+            fetched_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            content_type TEXT
+        );
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            downloaded INTEGER NOT NULL DEFAULT 0,
+            deduplicated INTEGER NOT NULL DEFAULT 0,
+            unchanged INTEGER NOT NULL DEFAULT 0,
+            not_modified INTEGER NOT NULL DEFAULT 0,
+            resumed INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            seconds REAL NOT NULL DEFAULT 0
+        );
+    """
+
+    def __init__(self, directory: str | Path, resume: bool = False, commit_every: int = 500):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self._pending_writes = 0
+        self._tmp_names = itertools.count()
+        self._conn = sqlite3.connect(self.directory / "images.sqlite")
+        self._conn.executescript(self._SCHEMA)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.run_id = self._start_run(resume)
+
+    def _start_run(self, resume: bool) -> int:
+        row = self._conn.execute(
+            "SELECT id FROM runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone() if resume else None
+        if row is not None:
+            logger.info("Продолжение загрузки изображений запуска %s", row[0])
+            return row[0]
+        run_id = self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),)).lastrowid
+        self._conn.commit()
+        return run_id
+
+    def lookup(self, url: str) -> ImageEntry | None:
+        row = self._conn.execute(
+            "SELECT i.sha256, i.etag, i.last_modified, i.checked_run, b.path "
+            "FROM images i JOIN blobs b ON b.sha256 = i.sha256 WHERE i.url = ?",
+            (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        sha256, etag, last_modified, checked_run, path = row
+        return ImageEntry(url, sha256, etag, last_modified, checked_run, self.directory / path)
+
+    def blob_path(self, sha256: str) -> Path | None:
+        """Файл с таким содержимым, если он уже есть на диске"""
+        row = self._conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None or not (self.directory / row[0]).exists():
+            return None
+        return self.directory / row[0]
+
+    async def write_blob(self, sha256: str, body: bytes, content_type: str | None, url: str) -> Path:
+        """Записать файл атомарно: частично записанный файл не может оказаться под именем хеша"""
+        extension = _extension(content_type, url)
+        relative = Path("objects") / sha256[:2] / f"{sha256}{extension}"
+        path = self.directory / relative
+        await aiofiles.os.makedirs(path.parent, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{next(self._tmp_names)}.tmp")
+        async with aiofiles.open(tmp, "wb") as f:
+            await f.write(body)
+        await aiofiles.os.replace(tmp, path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO blobs (sha256, path, size, content_type) VALUES (?, ?, ?, ?)",
+            (sha256, relative.as_posix(), len(body), content_type)
+        )
+        self._written()
+        return path
+
+    def mark(self, url: str, sha256: str | None = None, headers=None) -> None:
+        """Адрес проверен в этом запуске; при новом ответе — запомнить хеш и валидаторы"""
+        if sha256 is None:
+            self._conn.execute(
+                "UPDATE images SET checked_run = ?, fetched_at = ? WHERE url = ?", (self.run_id, time.time(), url)
+            )
+        else:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (url, sha256, etag, last_modified, checked_run, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, sha256, headers.get("etag"), headers.get("last-modified"), self.run_id, time.time())
+            )
+        self._written()
+
+    def path_for(self, url: str) -> Path | None:
+        """Локальный файл изображения по его адресу"""
+        entry = self.lookup(url)
+        return entry.path if entry else None
+
+    def save_run(self, counts: Counter, bytes_downloaded: int, seconds: float, finished: bool) -> None:
+        """Добавить итоги к запуску: продолженный запуск накапливает счётчики всех попыток"""
+        self._conn.execute(
+            "UPDATE runs SET finished_at = ?, requests = requests + ?, downloaded = downloaded + ?, "
+            "deduplicated = deduplicated + ?, unchanged = unchanged + ?, not_modified = not_modified + ?, "
+            "resumed = resumed + ?, failed = failed + ?, bytes = bytes + ?, seconds = seconds + ? WHERE id = ?",
+            (
+                time.time() if finished else None,
+                counts["requests"], counts[DOWNLOADED], counts[DEDUPLICATED], counts[UNCHANGED],
+                counts[NOT_MODIFIED], counts[RESUMED], counts[FAILED], bytes_downloaded, seconds, self.run_id,
+            )
+        )
+        self.commit()
+
+    def _written(self) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+
+def _extension(content_type: str | None, url: str) -> str:
+    if content_type:
+        extension = mimetypes.guess_extension(content_type.split(";")[0].strip())
+        if extension:
+            return ".jpg" if extension == ".jpe" else extension
+    suffix = Path(url.split("?")[0]).suffix
+    return suffix if 1 < len(suffix) <= 5 else ""
+
+
+class ImageFetcher:
+    """
+    Этап загрузки изображений, привязанный к обходу.
+
+    CrawlPipeline передаёт сюда каждый принятый товар (``add``), адреса его изображений
+    ставятся в очередь, которую разбирают ``workers`` задач. Запросы проходят через тот же
+    AdaptiveLimiter, что и запросы к API, поэтому общий бюджет ``max_concurrent`` не
+    превышается, а паузы по Retry-After действуют на оба этапа; на подстройку лимита
+    ответы CDN не влияют. Каждый адрес запрашивается за запуск один раз, известный —
+    условным запросом (If-None-Match / If-Modified-Since).
+    """
+
+    def __init__(self, parser: "PositiveParserAPI", store: ImageStore, workers: int = 8):
+        self.parser = parser
+        self.store = store
+        self.workers = workers
+        self.counts: Counter[str] = Counter()
+        self.bytes_downloaded = 0
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._seen: set[str] = set()
+        self._writing: set[str] = set()  # хеши, файлы которых записываются прямо сейчас
+        self._started: float | None = None
+
+    def add(self, product: Any) -> None:
+        """Поставить изображения товара в очередь (без ожидания, из event loop)"""
+        if self._queue is None:
+            self._start()
+        for url in image_urls(product):
+            if url not in self._seen:
+                self._seen.add(url)
+                self._queue.put_nowait(url)
+
+    def _start(self) -> None:
+        self._started = time.monotonic()
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"image-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def close(self, drain: bool = True) -> dict[str, Any]:
+        """
+        Дождаться загрузки очереди (``drain``) или бросить её, сохранить и вернуть отчёт
+        о запуске. Брошенный запуск остаётся незавершённым, его можно продолжить.
+        """
+        if self._queue is not None and drain:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        report = self.report()
+        self.store.save_run(self.counts, self.bytes_downloaded, report["seconds"], finished=drain)
+        logger.info(
+            "Изображения: адресов %s, запросов %s, новых файлов %s, совпали с имеющимися %s, "
+            "без изменений %s (304: %s), продолжено %s, ошибок %s; %.1f MiB за %.1f с (%.1f адр./с, %.2f MiB/с)",
+            report["urls"], report["requests"], report[DOWNLOADED], report[DEDUPLICATED],
+            report[UNCHANGED] + report[NOT_MODIFIED], report[NOT_MODIFIED], report[RESUMED], report[FAILED],
+            report["bytes"] / 2 ** 20, report["seconds"], report["urls_per_second"], report["mib_per_second"],
+        )
+        return report
+
+    def report(self) -> dict[str, Any]:
+        seconds = time.monotonic() - self._started if self._started else 0.0
+        urls = sum(self.counts[status] for status in STATUSES)
+        return {
+            "run": self.store.run_id,
+            "urls": urls,
+            "requests": self.counts["requests"],
+            **{status: self.counts[status] for status in STATUSES},
+            "bytes": self.bytes_downloaded,
+            "seconds": round(seconds, 3),
+            "urls_per_second": round(urls / seconds, 1) if seconds else 0.0,
+            "mib_per_second": round(self.bytes_downloaded / 2 ** 20 / seconds, 3) if seconds else 0.0,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            url = await self._queue.get()
+            try:
+                status = await self._process(url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status = FAILED
+                logger.warning("Изображение %s не загружено: %s", url, e)
+            finally:
+                self._queue.task_done()
+            self.counts[status] += 1
+            metrics.inc("images_total", status=status)
+
+    async def _process(self, url: str) -> str:
+        entry = self.store.lookup(url)
+        if entry and entry.checked_run == self.store.run_id:
+            return RESUMED
+        # без файла на диске условный запрос бесполезен: 304 не вернёт содержимое
+        headers = entry.validators() if entry and entry.path.exists() else {}
+        status_code, body, response_headers = await self._download(url, headers)
+        if status_code == 304:
+            self.store.mark(url)
+            return NOT_MODIFIED
+
+        sha256 = hashlib.sha256(body).hexdigest()
+        if entry and entry.sha256 == sha256 and entry.path.exists():
+            status = UNCHANGED
+        elif sha256 in self._writing or self.store.blob_path(sha256) is not None:
+            status = DEDUPLICATED
+        else:
+            self._writing.add(sha256)
+            try:
+                await self.store.write_blob(sha256, body, response_headers.get("content-type"), url)
+            finally:
+                self._writing.discard(sha256)
+            status = DOWNLOADED
+        self.store.mark(url, sha256, response_headers)
+        return status
+
+    @retry(
+        stop=stop_after_attempt(3),
+        retry=retry_if_exception(is_retryable),
+        wait=wait_backoff(initial=0.5, maximum=30),
+        reraise=True,
+    )
+    async def _download(self, url: str, headers: dict[str, str]):
+        limiter = self.parser.limiter
+        with metrics.timer("limiter_wait_seconds"):
+            await limiter.acquire()
+        try:
+            self.counts["requests"] += 1
+            r = await self.parser.client.get(url, headers={"Accept": "image/*", **headers}, timeout=30)
+            metrics.inc("http_requests_total", endpoint="image", status=str(r.status_code))
+            if r.status_code == 304:
+                return r.status_code, b"", r.headers
+            if r.status_code in THROTTLE_STATUSES and (retry_after := retry_after_from(r)) is not None:
+                limiter.pause(retry_after, reason=f"HTTP {r.status_code} (изображения)")
+            r.raise_for_status()
+            self.bytes_downloaded += len(r.content)
+            metrics.inc("image_bytes_total", len(r.content))
+            return r.status_code, r.content, r.headers
+        except TimeoutException:
+            metrics.inc("http_errors_total", endpoint="image", kind="timeout")
+            raise
+        except HTTPError as e:
+            metrics.inc("http_errors_total", endpoint="image", kind=type(e).__name__)
+            raise
+        finally:
+            limiter.release(outcome=None)
@@ -0,0 +1,86 @@
+"""
+Инкрементальный разбор JSON-массива верхнего уровня из потока байтов.
+
+Элементы отдаются по мере того, как в буфере появляется их закрывающая скобка, поэтому
+память ограничена размером элемента и куска ответа, а не всего массива. Каждый элемент
+разбирается стандартным ``json.JSONDecoder.raw_decode`` (сканер на C) прямо в буфере;
+если элемент ещё не дочитан, разбор повторяется после следующего куска.
+"""
+import codecs
+import json
+import re
+from typing import Any
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JsonArrayStream:
+    """
+    ``feed(chunk)`` возвращает элементы, дочитанные с этим куском, ``close()`` — остаток
+    и проверяет, что массив закрыт. Ошибки формата — ValueError.
+    """
+
+    def __init__(self, max_item_chars: int = 16 * 2 ** 20):
+        self.max_item_chars = max_item_chars
+        self.items = 0
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = "start"  # start -> value_or_end -> comma_or_end -> value -> ... -> end
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        self._buffer += self._text.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> list[Any]:
+        self._buffer += self._text.decode(b"", final=True)
+        items = self._drain(final=True)
+        if self._state != "end":
+            raise ValueError("JSON-массив оборван")
+        return items
+
+    def _drain(self, final: bool) -> list[Any]:
+        items = []
+        buffer = self._buffer
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError(f"Ожидался JSON-массив, получено {char!r}")
+                self._state = "value_or_end"
+                pos += 1
+            elif self._state == "end":
+                raise ValueError("Данные после конца JSON-массива")
+            elif char == "]" and self._state in ("value_or_end", "comma_or_end"):
+                self._state = "end"
+                pos += 1
+            elif self._state == "comma_or_end":
+                if char != ",":
+                    raise ValueError(f"Ожидалась запятая между элементами, получено {char!r}")
+                self._state = "value"
+                pos += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # элемент ещё не дочитан — ждём следующий кусок
+                    if final:
+                        raise
+                    if len(buffer) - pos > self.max_item_chars:
+                        raise ValueError(f"Элемент JSON-массива длиннее {self.max_item_chars} символов")
+                    break
+                if not final and char not in "{[\"":
+                    # число в конце буфера может продолжиться ("0." + "5"): ждём разделитель
+                    after = _WHITESPACE.match(buffer, end).end()
+                    if after >= len(buffer) or buffer[after] not in ",]":
+                        break
+                items.append(item)
+                self.items += 1
+                self._state = "comma_or_end"
+                pos = end
+        self._buffer = buffer[pos:]
+        return items
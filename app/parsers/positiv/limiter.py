@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter:
+    """
+    Ограничитель числа одновременных запросов по схеме AIMD.
+
+    Пока задержки и доля ошибок в норме, лимит растёт примерно на ``increase``
+    за «окно» из ``limit`` успешных запросов. При троттлинге (429/503), таймаутах,
+    росте доли ошибок или задержки выше ``latency_tolerance`` от лучшей
+    наблюдавшейся лимит умножается на ``decrease``, но не чаще раза в ``cooldown``
+    секунд. ``pause`` приостанавливает выдачу слотов, например на время Retry-After.
+
+    С ``min_limit == max_limit`` ведёт себя как обычный семафор.
+    """
+
+    def __init__(
+            self,
+            initial: int,
+            min_limit: int = 1,
+            max_limit: int | None = None,
+            increase: float = 1.0,
+            decrease: float = 0.5,
+            latency_tolerance: float = 2.5,
+            error_threshold: float = 0.1,
+            cooldown: float = 1.0,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit or initial
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.changes: Counter[str] = Counter()
+        self._waiters: deque[asyncio.Future] = deque()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency: float | None = None
+        self._best_latency: float | None = None
+        self._error_rate = 0.0
+
+    @property
+    def is_adaptive(self) -> bool:
+        return self.min_limit < self.max_limit
+
+    async def acquire(self) -> None:
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # слот уже выдан, но задача отменена — возвращаем его
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def release(self, latency: float | None = None, outcome: str | None = "ok") -> None:
+        """
+        Вернуть слот и сообщить результат запроса:
+        ``ok``, ``throttled`` (429/503), ``timeout`` или ``error``.
+        ``None`` — не учитывать запрос в подстройке лимита (например, запросы не к API).
+        """
+        self.in_flight -= 1
+        if self.is_adaptive and outcome is not None:
+            self._on_result(latency, outcome)
+        self._wake()
+
+    def pause(self, seconds: float, reason: str = "retry-after") -> None:
+        """Не выдавать новые слоты ``seconds`` секунд"""
+        until = time.monotonic() + seconds
+        if until <= self._paused_until:
+            return
+        self._paused_until = until
+        logger.warning("Запросы приостановлены на %.1f с (%s)", seconds, reason)
+        asyncio.get_running_loop().call_later(seconds, self._wake)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "latency_ewma": self._latency,
+            "error_rate": round(self._error_rate, 4),
+            "changes": dict(self.changes),
+        }
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self._paused_until
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _on_result(self, latency: float | None, outcome: str) -> None:
+        failed = outcome != "ok"
+        self._error_rate = 0.95 * self._error_rate + 0.05 * failed
+
+        if outcome in ("throttled", "timeout"):
+            self._decrease(outcome)
+            return
+        if self._error_rate > self.error_threshold:
+            self._decrease("errors")
+            return
+        if failed or latency is None:
+            return
+
+        self._latency = latency if self._latency is None else 0.9 * self._latency + 0.1 * latency
+        if self._best_latency is None or self._latency < self._best_latency:
+            self._best_latency = self._latency
+        if self._latency > self._best_latency * self.latency_tolerance:
+            self._decrease("latency")
+        else:
+            self._set_limit(self.limit + self.increase / self.limit, "healthy")
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._set_limit(self.limit * self.decrease, reason)
+        if reason == "latency":
+            # новая точка отсчёта: иначе после снижения лимит будет падать бесконечно
+            self._best_latency = self._latency
+
+    def _set_limit(self, value: float, reason: str) -> None:
+        old = int(self.limit)
+        self.limit = min(max(value, self.min_limit), self.max_limit)
+        if int(self.limit) != old:
+            self.changes[reason] += 1
+            metrics.set("limiter_limit", int(self.limit))
+            metrics.inc("limiter_changes_total", reason=reason)
+            log = logger.info if reason == "healthy" else logger.warning
+            log("Лимит параллельных запросов %s -> %s (%s)", old, int(self.limit), reason)
@@ -0,0 +1,269 @@
+import asyncio
+import itertools
+import logging
+import math
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncGenerator
+
+from app.schemas.positiv.category import CategorySchema
+from app.schemas.positiv.product import ProductCategorySchema, ProductSchema
+from app.schemas.positiv.record import ProductRecord
+
+if TYPE_CHECKING:
+    from app.parsers.positiv.positiv import PositiveParserAPI
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LeafJob:
+    """Конечная категория: её товары собираются воркерами в слоты по порядку листинга"""
+    category: CategorySchema
+    depth: int
+    future: asyncio.Future
+    priority: float = 0.0
+    results: list[ProductSchema | ProductRecord | None] = field(default_factory=list)
+    remaining: int = 0  # карточки в очереди и в работе
+    listed: bool = False  # листинг получен целиком
+    errors: int = 0
+
+    def finish(self) -> list[ProductSchema | ProductRecord] | None:
+        """Отдать собранные товары обходу; None, если категория уже завершена или отменена"""
+        if self.future.done():
+            return None
+        products = [p for p in self.results if p is not None]
+        logger.info(
+            "В категории '%s' (глубина %s) получено %s товаров (ошибок: %s)",
+            self.category.name, self.depth, len(products), len(self.results) - len(products)
+        )
+        self.future.set_result(products)
+        return products
+
+
+class CrawlPipeline:
+    """
+    Обход дерева категорий через ограниченные очереди и фиксированный пул воркеров.
+
+    Листинги конечных категорий и карточки товаров ставятся в две очереди,
+    которые обслуживают ``listing_workers`` и ``product_workers`` задач. Число задач
+    не зависит от размера категории, а бюджет ``max_concurrent`` используется
+    всеми категориями сразу. Каждый обход (``walk``) заранее ставит в работу до
+    ``prefetch`` следующих листьев, но отдаёт результаты строго в порядке дерева.
+
+    С планировщиком (``parser.scheduler``) в работу сразу ставятся все листья, а очереди
+    выдают листинги и карточки в порядке убывания оценки категории (CrawlScheduler.score).
+    Когда подходит срок, оставшиеся листья пропускаются, а вместо карточек берутся
+    сохранённые в ProductStore. Готовые раньше срока категории держатся в памяти до
+    своей очереди в порядке дерева.
+    """
+
+    def __init__(
+            self,
+            parser: "PositiveParserAPI",
+            product_workers: int = 10,
+            listing_workers: int = 2,
+            prefetch: int = 4,
+            queue_size: int | None = None,
+    ) -> None:
+        self.parser = parser
+        self.product_workers = product_workers
+        self.listing_workers = listing_workers
+        self.prefetch = prefetch
+        self.queue_size = queue_size or product_workers * 2
+        self._listing_queue: asyncio.PriorityQueue[tuple[float, int, LeafJob]] | None = None
+        self._product_queue: asyncio.PriorityQueue[
+            tuple[float, int, LeafJob, int, ProductCategorySchema]
+        ] | None = None
+        self._sequence = itertools.count()  # при равной оценке — порядок постановки
+        self._workers: list[asyncio.Task] = []
+        self._active_walks = 0
+
+    async def walk(
+            self,
+            category: CategorySchema,
+            depth: int = 0
+    ) -> AsyncGenerator[tuple[int, str, list[ProductSchema]]]:
+        """Тот же контракт, что у PositiveParserAPI.walk_categories"""
+        self._acquire()
+        pending: list[tuple[int, str, LeafJob | None]] = []
+        prefetch = self.prefetch if self.parser.scheduler is None else math.inf
+        in_flight = 0
+        try:
+            for node_depth, node in self._iter_tree(category, depth):
+                if node.children:
+                    logger.info(
+                        "Категория '%s' (глубина %s) содержит %s подкатегорий",
+                        node.name, node_depth, len(node.children)
+                    )
+                    pending.append((node_depth, node.name, None))
+                else:
+                    pending.append((node_depth, node.name, self._submit(node, node_depth)))
+                    in_flight += 1
+
+                # отдаём готовое, пока впереди не больше prefetch листьев в работе
+                while pending and (pending[0][2] is None or in_flight > prefetch):
+                    if pending[0][2] is not None:
+                        in_flight -= 1
+                    yield await self._resolve(pending.pop(0))
+
+            while pending:
+                yield await self._resolve(pending.pop(0))
+        finally:
+            for _, _, job in pending:
+                if job is not None:
+                    job.future.cancel()
+            await self._release()
+
+    @staticmethod
+    def _iter_tree(category: CategorySchema, depth: int):
+        stack = [(depth, category)]
+        while stack:
+            node_depth, node = stack.pop()
+            yield node_depth, node
+            stack.extend((node_depth + 1, child) for child in reversed(node.children))
+
+    @staticmethod
+    async def _resolve(item: tuple[int, str, LeafJob | None]) -> tuple[int, str, list[ProductSchema]]:
+        depth, name, job = item
+        if job is None:
+            return depth, name, []
+        return depth, name, await job.future
+
+    def _submit(self, category: CategorySchema, depth: int) -> LeafJob:
+        scheduler = self.parser.scheduler
+        job = LeafJob(
+            category=category,
+            depth=depth,
+            future=asyncio.get_running_loop().create_future(),
+            priority=scheduler.score(category) if scheduler else 0.0,
+        )
+        self._listing_queue.put_nowait((-job.priority, next(self._sequence), job))
+        return job
+
+    def _acquire(self) -> None:
+        self._active_walks += 1
+        if self._workers:
+            return
+        self._listing_queue = asyncio.PriorityQueue()
+        self._product_queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._listing_worker(), name=f"listing-worker-{i}")
+            for i in range(self.listing_workers)
+        ] + [
+            asyncio.create_task(self._product_worker(), name=f"product-worker-{i}")
+            for i in range(self.product_workers)
+        ]
+
+    async def _release(self) -> None:
+        self._active_walks -= 1
+        if self._active_walks or not self._workers:
+            return
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def _compact(self, product: ProductSchema | None) -> ProductSchema | ProductRecord | None:
+        """
+        Товар принят обходом: изображения — в очередь загрузки (до сжатия записи, у
+        ProductRecord нет галереи), в компактном режиме модель заменяется на ProductRecord
+        """
+        if product is not None and self.parser.images:
+            self.parser.images.add(product)
+        if product is None or not self.parser.compact_records:
+            return product
+        return ProductRecord.from_product(product)
+
+    def _stale_product(self, short_info: ProductCategorySchema) -> ProductSchema | None:
+        """После срока: сохранённая карточка с ценой и остатком из свежего листинга"""
+        store = self.parser.store
+        product = store.get(short_info.public_id, self.parser.product_schema) if store else None
+        self.parser.scheduler.skip_product(stale=product is not None)
+        if product is None:
+            return None
+        return product.model_copy(update={"price": short_info.price, "count": short_info.count})
+
+    def _finish(self, job: LeafJob) -> None:
+        products = job.finish()
+        if products is not None and self.parser.journal:
+            self.parser.journal.complete_leaf(job.category.public_id, products)
+
+    async def _listing_worker(self) -> None:
+        while True:
+            _, _, job = await self._listing_queue.get()
+            try:
+                if job.future.done():
+                    continue
+                schema = self.parser.product_schema
+                journal = self.parser.journal
+                scheduler = self.parser.scheduler
+                saved = journal.load_leaf(job.category.public_id, schema) if journal else None
+                if saved is not None:
+                    job.results = [self._compact(p) for p in saved]
+                    job.finish()
+                    continue
+                if scheduler and scheduler.expired:
+                    scheduler.skip_category(job.category)
+                    job.finish()
+                    continue
+
+                store = self.parser.store
+                changed = store.changed if store else 0
+                # со stream_listings товары приходят по мере загрузки листинга, и карточки
+                # запрашиваются сразу; категорию завершает последняя карточка после конца листинга
+                listing = self.parser.iter_products_by_category(job.category.public_id)
+                async with aclosing(listing):
+                    async for short_info in listing:
+                        index = len(job.results)
+                        job.results.append(None)
+                        product = journal.load_product(short_info.public_id, schema) if journal else None
+                        if product is None and store:
+                            product = store.lookup(short_info, schema)
+                            if product is not None and journal:
+                                journal.save_product(product)
+                        if product is not None:
+                            job.results[index] = self._compact(product)
+                            continue
+                        job.remaining += 1
+                        await self._product_queue.put(
+                            (-job.priority, next(self._sequence), job, index, short_info)
+                        )
+                if store:
+                    store.save_category(job.category.public_id, len(job.results), store.changed - changed)
+                job.listed = True
+                if job.remaining == 0:
+                    self._finish(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Ошибка при получении листинга категории '%s'", job.category.name)
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._listing_queue.task_done()
+
+    async def _product_worker(self) -> None:
+        while True:
+            _, _, job, index, short_info = await self._product_queue.get()
+            try:
+                scheduler = self.parser.scheduler
+                if not job.future.done() and scheduler and scheduler.expired:
+                    job.results[index] = self._compact(self._stale_product(short_info))
+                elif not job.future.done():
+                    product = await self.parser.fetch_product_full_info(short_info.public_id)
+                    if product is not None:
+                        if self.parser.store:
+                            self.parser.store.save(short_info, product)
+                        if self.parser.journal:
+                            self.parser.journal.save_product(product)
+                    job.results[index] = self._compact(product)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Ошибка при обработке товара", exc_info=e)
+            finally:
+                job.remaining -= 1
+                if job.remaining == 0 and job.listed:
+                    self._finish(job)
+                self._product_queue.task_done()
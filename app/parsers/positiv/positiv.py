@@ -1,17 +1,32 @@
 import asyncio
 import logging
-from asyncio import create_task, gather
-from typing import Any, AsyncGenerator, cast
+import time
+from asyncio import create_task
+from contextlib import aclosing
+from typing import Any, AsyncGenerator
 
 from httpx import AsyncClient, TimeoutException, HTTPError
-from pydantic import ValidationError
-from tenacity import retry, stop_after_attempt, after_log
+from pydantic import TypeAdapter, ValidationError
+from tenacity import AsyncRetrying, retry, retry_if_exception, stop_after_attempt, after_log
 
+from app.metrics import metrics
+from app.parsers.positiv.checkpoint import CrawlJournal
+from app.parsers.positiv.http_cache import HttpCache
+from app.parsers.positiv.http_client import json_loads
+from app.parsers.positiv.images import ImageFetcher, ImageStore
+from app.parsers.positiv.json_stream import JsonArrayStream
+from app.parsers.positiv.limiter import AdaptiveLimiter
+from app.parsers.positiv.pipeline import CrawlPipeline
+from app.parsers.positiv.product_store import ProductStore
+from app.parsers.positiv.retry import THROTTLE_STATUSES, is_retryable, retry_after_from, wait_backoff
+from app.parsers.positiv.scheduler import CrawlScheduler
 from app.schemas.positiv.category import CategorySchema
-from app.schemas.positiv.product import ProductCategorySchema, ProductSchema
+from app.schemas.positiv.product import ProductCategorySchema, ProductLiteSchema, ProductSchema
 
 logger = logging.getLogger(__name__)
 
+PRODUCT_LIST_ADAPTER = TypeAdapter(list[ProductCategorySchema])
+
 
 class PositiveParserAPI:
     BASE_URL = "https://api.positive.ooo/api/v1"
@@ -19,38 +34,140 @@ class PositiveParserAPI:
     def __init__(
             self,
             client: AsyncClient,
-            max_concurrent: int = 10
+            max_concurrent: int = 10,
+            prefetch_leaves: int = 4,
+            store: ProductStore | None = None,
+            cache: HttpCache | None = None,
+            adaptive: bool = False,
+            min_concurrent: int = 4,
+            fast_validation: bool = False,
+            compact_records: bool = False,
+            journal: CrawlJournal | None = None,
+            scheduler: CrawlScheduler | None = None,
+            images: ImageStore | None = None,
+            image_workers: int = 8,
+            stream_listings: bool = False,
     ) -> None:
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        # без adaptive лимит фиксирован и равен max_concurrent, как у обычного семафора
+        self.limiter = AdaptiveLimiter(
+            initial=max(min_concurrent, max_concurrent // 4) if adaptive else max_concurrent,
+            min_limit=min(min_concurrent, max_concurrent) if adaptive else max_concurrent,
+            max_limit=max_concurrent,
+        )
         self.client = client
+        self.store = store  # при наличии запрашиваются только новые и изменившиеся товары
+        self.cache = cache
+        self.journal = journal  # журнал прогресса для продолжения после сбоя
+        self.scheduler = scheduler  # порядок обхода по оценке категорий и срок окончания
+        # загрузка изображений принятых товаров в локальное зеркало, в общем лимите запросов
+        self.images = ImageFetcher(self, images, workers=image_workers) if images else None
+        # быстрый режим: валидация из байтов в облегчённую схему ProductLiteSchema
+        self.fast_validation = fast_validation
+        self.product_schema = ProductLiteSchema if fast_validation else ProductSchema
+        # компактный режим: walk_categories отдаёт ProductRecord вместо моделей pydantic
+        self.compact_records = compact_records
+        # листинги разбираются по мере загрузки, карточки запрашиваются до конца листинга
+        self.stream_listings = stream_listings
+        self.pipeline = CrawlPipeline(
+            self,
+            product_workers=max_concurrent,
+            listing_workers=max(1, min(prefetch_leaves, max_concurrent // 4)),
+            prefetch=prefetch_leaves,
+        )
 
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(5),
+        retry=retry_if_exception(is_retryable),
+        wait=wait_backoff(initial=0.5, maximum=30),
         reraise=True,
-        after=after_log(logger, logging.WARNING)
+        after=after_log(logger, logging.WARNING),
+        before_sleep=lambda retry_state: metrics.inc("http_retries_total"),
            )
+    async def fetch_raw(
+            self,
+            url: str,
+            params: dict | None = None,
+            delay: float = 0
+    ) -> bytes | None:
+        """Асинхронный запрос с адаптивным ограничением параллельности, дисковым кэшем и логированием"""
+        endpoint = self.endpoint_of(url)
+        entry = self.cache.lookup(url, params) if self.cache else None
+        if entry and entry.is_fresh:
+            body = await self.cache.read(entry)
+            if body is not None:
+                metrics.inc("http_cache_hits_total", endpoint=endpoint)
+                return body
+
+        with metrics.timer("limiter_wait_seconds"):
+            await self.limiter.acquire()
+        started = time.monotonic()
+        latency, outcome = None, "error"
+        try:
+            headers = entry.validators() if entry else None
+            r = await self.client.get(url, params=params, headers=headers, timeout=15)
+            latency = time.monotonic() - started
+            metrics.observe("http_request_seconds", latency, endpoint=endpoint)
+            metrics.inc("http_requests_total", endpoint=endpoint, status=str(r.status_code))
+            if r.status_code == 304 and entry:
+                body = await self.cache.read(entry, revalidated=True)
+                if body is not None:
+                    outcome = "ok"
+                    return body
+                r = await self.client.get(url, params=params, timeout=15)
+                latency = time.monotonic() - started
+                metrics.inc("http_requests_total", endpoint=endpoint, status=str(r.status_code))
+            if r.status_code in THROTTLE_STATUSES:
+                outcome = "throttled"
+                if (retry_after := retry_after_from(r)) is not None:
+                    self.limiter.pause(retry_after, reason=f"HTTP {r.status_code}")
+            r.raise_for_status()
+            outcome = "ok"
+            await asyncio.sleep(delay)
+            if self.cache:
+                await self.cache.store(url, params, r.content, r.headers)
+            return r.content
+        except TimeoutException:
+            outcome = "timeout"
+            metrics.inc("http_errors_total", endpoint=endpoint, kind="timeout")
+            logger.error("Timeout при запросе %s", url)
+            raise
+        except HTTPError as e:
+            metrics.inc("http_errors_total", endpoint=endpoint, kind=type(e).__name__)
+            logger.error("Ошибка HTTP %s при запросе %s", e, url)
+            raise
+        except Exception as e:
+            metrics.inc("http_errors_total", endpoint=endpoint, kind="unexpected")
+            logger.exception("Неожиданная ошибка при запросе %s: %s", url, e)
+        finally:
+            self.limiter.release(latency, outcome)
+
+    @staticmethod
+    def endpoint_of(url: str) -> str:
+        """Метка эндпоинта API для метрик"""
+        if url.endswith("/category"):
+            return "category"
+        if "/product/get-by-category/" in url:
+            return "products_by_category"
+        if "/product/" in url:
+            return "product"
+        return "other"
+
     async def fetch(
             self,
             url: str,
             params: dict | None = None,
             delay: float = 0
     ) -> dict[str, Any] | list[dict[str, Any]] | None:
-        """Асинхронный запрос с ограничением по семафору и логированием"""
-        async with self.semaphore:
-            try:
-                r = await self.client.get(url, params=params, timeout=15)
-                r.raise_for_status()
-                await asyncio.sleep(delay)
-                return r.json()
-            except TimeoutException:
-                logger.error(f"Timeout при запросе {url}")
-                raise
-            except HTTPError as e:
-                logger.error(f"Ошибка HTTP {e} при запросе {url}")
-                raise
-            except Exception as e:
-                logger.exception(f"Неожиданная ошибка при запросе {url}: {e}")
+        """Запрос с разбором JSON"""
+        body = await self.fetch_raw(url, params=params, delay=delay)
+        return self._decode(body, url) if body is not None else None
 
+    @staticmethod
+    def _decode(body: bytes, url: str) -> Any:
+        try:
+            return json_loads(body)
+        except ValueError as e:
+            logger.exception("Некорректный JSON в ответе %s: %s", url, e)
 
     async def get_categories(
             self,
@@ -65,6 +182,8 @@ class PositiveParserAPI:
                 categories_dict[category.public_id] = category
             except ValidationError as e:
                 logger.error("Ошибка валидации категории: %s", e)
+        if self.scheduler:
+            self.scheduler.prepare(categories_dict.values())
         return categories_dict
 
 
@@ -73,16 +192,20 @@ class PositiveParserAPI:
             product_id: str
     ) -> ProductSchema | None:
         """Забрать полные данные по товару"""
-        logger.info("Получение всех данных о товаре c product_id: %s", product_id)
-        product = await self.fetch(f"{self.BASE_URL}/product/{product_id}")
-        if not product:
-            logger.error(
-                "Ошибка данных для product_id=%s: %s",
-                product_id,
-            )
-            return None
+        # по товару — только DEBUG: итог по категории пишет CrawlPipeline
+        logger.debug("Получение всех данных о товаре c product_id: %s", product_id)
+        url = f"{self.BASE_URL}/product/{product_id}"
+        if self.fast_validation:
+            raw = await self.fetch_raw(url)
+            if raw:
+                return self._safe_validate_json(self.product_schema, raw, context=product_id)
+        else:
+            product = await self.fetch(url)
+            if product:
+                return self._safe_validate(ProductSchema, product, context=product_id)
 
-        return self._safe_validate(ProductSchema, product, context=product_id)
+        logger.error("Ошибка данных для product_id=%s", product_id)
+        return None
 
 
 
@@ -94,9 +217,19 @@ class PositiveParserAPI:
             "Получение всех продуктов из категории с public_id: %s",
             public_id
         )
-        products = await self.fetch(
-            f"{self.BASE_URL}/product/get-by-category/{public_id}"
-        )
+        url = f"{self.BASE_URL}/product/get-by-category/{public_id}"
+        if self.fast_validation:
+            raw = await self.fetch_raw(url)
+            products = None
+            if raw:
+                try:
+                    with metrics.timer("validation_seconds", schema="list[ProductCategorySchema]"):
+                        return PRODUCT_LIST_ADAPTER.validate_json(raw)
+                except ValidationError:
+                    # в листинге есть битые элементы — валидируем по одному, как обычно
+                    products = self._decode(raw, url)
+        else:
+            products = await self.fetch(url)
         if not products:
             logger.warning(
                 "Не удалось получить продукты для категории %s",
@@ -111,44 +244,118 @@ class PositiveParserAPI:
         return result
 
 
+    async def iter_products_by_category(
+            self,
+            public_id: str
+    ) -> AsyncGenerator[ProductCategorySchema]:
+        """
+        Товары листинга по одному. С ``stream_listings`` массив разбирается из потока байтов
+        ответа, и первые товары отдаются, пока листинг ещё загружается; иначе (и с HTTP-кэшем,
+        которому нужно тело целиком) — после fetch_products_by_category.
+        """
+        if not self.stream_listings or self.cache:
+            for product in await self.fetch_products_by_category(public_id):
+                if product is not None:
+                    yield product
+            return
+
+        logger.info("Потоковое получение продуктов из категории с public_id: %s", public_id)
+        url = f"{self.BASE_URL}/product/get-by-category/{public_id}"
+        yielded = 0
+        async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(5),
+                retry=retry_if_exception(is_retryable),
+                wait=wait_backoff(initial=0.5, maximum=30),
+                reraise=True,
+                before_sleep=lambda retry_state: metrics.inc("http_retries_total"),
+        ):
+            with attempt:
+                # при повторе ответ читается с начала: уже отданные элементы пропускаем
+                position = 0
+                async with aclosing(self.stream_json_array(url)) as items:
+                    async for raw in items:
+                        position += 1
+                        if position <= yielded:
+                            continue
+                        yielded += 1
+                        product = self._safe_validate(ProductCategorySchema, raw, context=public_id)
+                        if product is not None:
+                            yield product
+        if not yielded:
+            logger.warning("Не удалось получить продукты для категории %s", public_id)
+
+    async def stream_json_array(self, url: str) -> AsyncGenerator[Any]:
+        """
+        Элементы JSON-массива из ответа по мере загрузки, в общем лимите запросов.
+
+        Слот лимитера занят только до заголовков ответа и на чтение очередного куска тела:
+        пока потребитель обрабатывает элементы (и, например, ждёт места в очереди карточек),
+        слот свободен, иначе листинги могли бы занять все слоты и остановить обработчиков
+        карточек, которые эту очередь разбирают.
+        """
+        endpoint = self.endpoint_of(url)
+        with metrics.timer("limiter_wait_seconds"):
+            await self.limiter.acquire()
+        held = True
+        started = time.monotonic()
+        latency, outcome = None, "error"
+        try:
+            async with self.client.stream("GET", url, timeout=15) as r:
+                # задержка — до заголовков ответа, как у fetch_raw до первого байта тела
+                latency = time.monotonic() - started
+                metrics.observe("http_request_seconds", latency, endpoint=endpoint)
+                metrics.inc("http_requests_total", endpoint=endpoint, status=str(r.status_code))
+                if r.status_code in THROTTLE_STATUSES:
+                    outcome = "throttled"
+                    if (retry_after := retry_after_from(r)) is not None:
+                        self.limiter.pause(retry_after, reason=f"HTTP {r.status_code}")
+                r.raise_for_status()
+                # запрос учтён в подстройке лимита; куски тела читаются в отдельных слотах без учёта
+                self.limiter.release(latency, "ok")
+                held = False
+                stream = JsonArrayStream()
+                chunks = r.aiter_bytes()
+                while True:
+                    await self.limiter.acquire()
+                    held = True
+                    chunk = await anext(chunks, None)
+                    self.limiter.release(outcome=None)
+                    held = False
+                    if chunk is None:
+                        break
+                    for item in stream.feed(chunk):
+                        yield item
+                for item in stream.close():
+                    yield item
+                outcome = "ok"
+        except TimeoutException:
+            outcome = "timeout"
+            metrics.inc("http_errors_total", endpoint=endpoint, kind="timeout")
+            logger.error("Timeout при запросе %s", url)
+            raise
+        except HTTPError as e:
+            metrics.inc("http_errors_total", endpoint=endpoint, kind=type(e).__name__)
+            logger.error("Ошибка HTTP %s при запросе %s", e, url)
+            raise
+        except ValueError as e:
+            metrics.inc("http_errors_total", endpoint=endpoint, kind="json")
+            logger.error("Некорректный JSON в ответе %s: %s", url, e)
+            raise
+        finally:
+            if held:
+                self.limiter.release(latency, outcome)
+
     async def walk_categories(
             self,
             category: CategorySchema,
             depth: int = 0
     ) -> AsyncGenerator[tuple[int, str, list[ProductSchema]]]:
-        """Асинхронно обходит категорию и её подкатегории, собирает товары"""
-        logger.debug(
-            "Обрабатываю категорию '%s' на глубине %s",
-            category.name, depth
-        )
-        if category.children:
-            logger.info(
-                "Категория '%s' (глубина %s) содержит %s подкатегорий",
-                category.name, depth, len(category.children)
-            )
-            yield depth, category.name, []
-
-            for inner_category in category.children:
-                async for node in self.walk_categories(category=inner_category, depth=depth + 1):
-                    yield node
-
-        else:
-            products_short_info = await self.fetch_products_by_category(public_id=category.public_id)
-            tasks = self._create_tasks_for_products(products_short_info)
-            products = await gather(*tasks, return_exceptions=True)
-            filtered_products = []
-            for p in products:
-                if isinstance(p, Exception):
-                    logger.exception("Ошибка при обработке товара", exc_info=p)
-                elif p is not None:
-                    filtered_products.append(p)
-
-            logger.info(
-                "В категории '%s' (глубина %s) получено %s товаров (ошибок: %s)",
-                category.name, depth, len(filtered_products), len(products) - len(filtered_products)
-            )
-
-            yield depth, category.name, cast(list[ProductSchema],filtered_products)
+        """
+        Обходит категорию и её подкатегории в порядке дерева, собирает товары.
+        Запросы выполняет общий для всех обходов пул воркеров (CrawlPipeline).
+        """
+        async for node in self.pipeline.walk(category, depth):
+            yield node
 
     @staticmethod
     def make_categories_with_children(
@@ -178,20 +385,21 @@ class PositiveParserAPI:
             tasks.append(task)
         return tasks
 
-    def _create_tasks_for_products(self, products: list[ProductCategorySchema]) -> list[asyncio.Task]:
-        tasks = []
-        for product in products:
-            task = create_task(
-                self.fetch_product_full_info(product.public_id),
-                name=product.name
-            )
-            tasks.append(task)
-        return tasks
+    @staticmethod
+    def _safe_validate_json(schema, raw: bytes, context=""):
+        """Валидация сразу из байтов ответа, без промежуточных dict"""
+        try:
+            with metrics.timer("validation_seconds", schema=schema.__name__):
+                return schema.model_validate_json(raw)
+        except ValidationError as e:
+            logger.error("Ошибка валидации %s: %s", context, e)
+        return None
 
     @staticmethod
     def _safe_validate(schema, data, context=""):
         try:
-            return schema(**data)
+            with metrics.timer("validation_seconds", schema=schema.__name__):
+                return schema(**data)
         except ValidationError as e:
             logger.error("Ошибка валидации %s: %s", context, e)
         except TypeError as e:
@@ -0,0 +1,177 @@
+import logging
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from app.parsers.positiv.scheduler import CategoryStats
+from app.schemas.positiv.product import ProductCategorySchema, ProductSchema
+
+logger = logging.getLogger(__name__)
+
+
+class ProductStore:
+    """
+    Локальное хранилище товаров (SQLite) для инкрементального обхода.
+
+    Для каждого public_id хранит снимок полей листинга (price, count, isPublished, slug)
+    и полную карточку товара. Если поля листинга не изменились, карточка берётся из базы
+    и запрос /product/{id} не выполняется. Каждый запуск дополнительно обновляет
+    ``refresh_fraction`` товаров: корзины выбираются по кругу, так что за
+    ``1 / refresh_fraction`` запусков обновляется весь каталог.
+
+    По конечным категориям хранится итог последнего листинга: когда он получен, сколько
+    в нём товаров и у скольких изменились поля листинга. Из этого CrawlScheduler
+    считает давность и изменчивость категории.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS products (
+            public_id TEXT PRIMARY KEY,
+            price TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            is_published INTEGER NOT NULL,
+            slug TEXT NOT NULL,
+            payload BLOB NOT NULL,
+            fetched_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS categories (
+            public_id TEXT PRIMARY KEY,
+            crawled_at TEXT NOT NULL,
+            products INTEGER NOT NULL,
+            changed INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+    _BUCKETS = 1000
+
+    def __init__(self, path: str | Path, refresh_fraction: float = 0.05, commit_every: int = 500):
+        self.path = Path(path)
+        self.refresh_fraction = refresh_fraction
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.changed = 0  # товары, у которых поля листинга отличаются от сохранённых
+        self._pending_writes = 0
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(self._SCHEMA)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.run_number = self._next_run_number()
+
+    def _next_run_number(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'run_number'").fetchone()
+        run_number = int(row[0]) + 1 if row else 0
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('run_number', ?)", (str(run_number),)
+        )
+        self._conn.commit()
+        return run_number
+
+    def _due_for_refresh(self, public_id: str) -> bool:
+        """Входит ли товар в обновляемую в этом запуске долю каталога"""
+        if self.refresh_fraction <= 0:
+            return False
+        width = max(1, round(self._BUCKETS * self.refresh_fraction))
+        start = (self.run_number * width) % self._BUCKETS
+        bucket = zlib.crc32(public_id.encode()) % self._BUCKETS
+        return (bucket - start) % self._BUCKETS < width
+
+    def lookup(
+            self,
+            short_info: ProductCategorySchema,
+            schema: type[BaseModel] = ProductSchema
+    ) -> BaseModel | None:
+        """Вернуть сохранённую карточку, если товар не изменился и не попал в обновление"""
+        row = self._conn.execute(
+            "SELECT price, count, is_published, slug, payload FROM products WHERE public_id = ?",
+            (short_info.public_id,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        price, count, is_published, slug, payload = row
+        if (price, count, bool(is_published), slug) != (
+                short_info.price, short_info.count, short_info.isPublished, short_info.slug
+        ):
+            self.changed += 1
+            self.misses += 1
+            return None
+        if self._due_for_refresh(short_info.public_id):
+            self.misses += 1
+            return None
+        product = self._decode(short_info.public_id, payload, schema)
+        if product is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return product
+
+    def get(self, public_id: str, schema: type[BaseModel] = ProductSchema) -> BaseModel | None:
+        """Сохранённая карточка без сверки с листингом (может быть устаревшей)"""
+        row = self._conn.execute("SELECT payload FROM products WHERE public_id = ?", (public_id,)).fetchone()
+        return self._decode(public_id, row[0], schema) if row else None
+
+    def _decode(self, public_id: str, payload: bytes, schema: type[BaseModel]) -> BaseModel | None:
+        try:
+            return schema.model_validate_json(zlib.decompress(payload))
+        except (zlib.error, ValueError) as e:
+            logger.warning("Повреждённая запись товара %s в %s: %s", public_id, self.path, e)
+            return None
+
+    def save(self, short_info: ProductCategorySchema, product: BaseModel) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO products "
+            "(public_id, price, count, is_published, slug, payload, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                short_info.public_id,
+                short_info.price,
+                short_info.count,
+                int(short_info.isPublished),
+                short_info.slug,
+                zlib.compress(product.model_dump_json(by_alias=True).encode()),
+                datetime.now().isoformat(timespec="seconds"),
+            )
+        )
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every:
+            self.commit()
+
+    def save_category(self, public_id: str, products: int, changed: int) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO categories (public_id, crawled_at, products, changed) VALUES (?, ?, ?, ?)",
+            (public_id, datetime.now().isoformat(timespec="seconds"), products, changed)
+        )
+
+    def category_stats(self) -> dict[str, CategoryStats]:
+        """Итоги последних листингов конечных категорий для CrawlScheduler"""
+        return {
+            public_id: CategoryStats(datetime.fromisoformat(crawled_at), products, changed)
+            for public_id, crawled_at, products, changed in self._conn.execute(
+                "SELECT public_id, crawled_at, products, changed FROM categories"
+            )
+        }
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def __enter__(self) -> "ProductStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+        logger.info(
+            "Хранилище товаров %s: из базы %s, запрошено заново %s (запуск №%s)",
+            self.path, self.hits, self.misses, self.run_number
+        )
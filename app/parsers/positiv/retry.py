@@ -0,0 +1,63 @@
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from httpx import HTTPStatusError, Response
+from tenacity import RetryCallState
+
+# ответы, после которых есть смысл повторить запрос
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value: str | None, max_delay: float = 120) -> float | None:
+    """Retry-After в секундах: поддерживает и число секунд, и HTTP-дату"""
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        delay = (date - datetime.now(timezone.utc)).total_seconds()
+    return min(max(delay, 0), max_delay)
+
+
+def retry_after_from(response: Response | None) -> float | None:
+    if response is None or response.status_code not in THROTTLE_STATUSES:
+        return None
+    return parse_retry_after(response.headers.get("Retry-After"))
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Повторяем сетевые ошибки и таймауты, а из HTTP-ошибок — только временные"""
+    if not isinstance(exc, Exception):
+        # CancelledError и прочие BaseException не повторяем, иначе отмена задачи теряется
+        return False
+    if isinstance(exc, HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUSES
+    return True
+
+
+class wait_backoff:
+    """
+    Стратегия ожидания для tenacity: экспоненциальная задержка с полным джиттером,
+    но не меньше Retry-After, если сервер его прислал.
+    """
+
+    def __init__(self, initial: float = 0.5, maximum: float = 30):
+        self.initial = initial
+        self.maximum = maximum
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        delay = random.uniform(0, min(self.maximum, self.initial * 2 ** (retry_state.attempt_number - 1)))
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        if isinstance(exc, HTTPStatusError):
+            retry_after = retry_after_from(exc.response)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
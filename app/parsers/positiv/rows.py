@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import Any
+
+from app.prices import parse_price, parse_prices_minor, to_minor_units
+from app.schemas.positiv.product import ProductSchema
+from app.schemas.positiv.record import ProductRecord
+
+HEADERS = [
+    "Категория", "public_id", "Имя", "Ссылка на картинку", "Код",
+    "Описание", "Остатки", "Ед.Измерения",
+    "Доступность", "Цена", "Валюта",
+    "Ссылка 1С", "Дата публикации", "Дата снятия публикации", "Дата создания"
+]
+
+# поля машиночитаемых выгрузок (CSV, JSON Lines, Parquet)
+CATEGORY_PATH_SEPARATOR = " > "
+
+FIELDS = [
+    "main_category", "category", "category_path", "depth", "public_id", "name", "imageUrl", "vendorCode", "code",
+    "description", "count", "unitOfMeasurement", "isAvailable", "price", "price_minor", "currency", "links1c",
+    "publishedDate", "unpublishedDate", "createdAt", "updatedAt",
+]
+
+
+def product_to_row(category_name: str, product: ProductSchema | ProductRecord) -> list:
+    """Строка Excel для одного товара (модель pydantic или ProductRecord)"""
+    return [
+        category_name,
+        product.public_id,
+        product.name,
+        str(product.imageUrl) if product.imageUrl else "",
+        product.code,
+        product.description,
+        product.count,
+        product.unitOfMeasurement,
+        product.isAvailable,
+        product.price,
+        product.currency,
+        product.links1c,
+        product.publishedDate.strftime("%d-%m-%Y") if product.publishedDate else "",
+        product.unpublishedDate.strftime("%d-%m-%Y") if product.unpublishedDate else "",
+        product.createdAt.strftime("%d-%m-%Y") if product.createdAt else "",
+    ]
+
+
+def product_to_record(
+        main_category: str,
+        category_name: str,
+        depth: int,
+        product: ProductSchema | ProductRecord,
+        price_minor: int | None = None,
+        category_path: str | None = None,
+) -> dict[str, Any]:
+    """Плоская запись товара для машиночитаемых выгрузок; значения в порядке FIELDS"""
+    if price_minor is None:
+        price_minor = to_minor_units(parse_price(product.price))
+    return {
+        "main_category": main_category,
+        "category": category_name,
+        "category_path": category_path,
+        "depth": depth,
+        "public_id": product.public_id,
+        "name": product.name,
+        "imageUrl": str(product.imageUrl) if product.imageUrl else None,
+        "vendorCode": product.vendorCode,
+        "code": product.code,
+        "description": product.description,
+        "count": product.count,
+        "unitOfMeasurement": product.unitOfMeasurement,
+        "isAvailable": product.isAvailable,
+        "price": product.price,
+        "price_minor": price_minor,
+        "currency": product.currency,
+        "links1c": product.links1c,
+        "publishedDate": product.publishedDate,
+        "unpublishedDate": product.unpublishedDate,
+        "createdAt": product.createdAt,
+        "updatedAt": product.updatedAt,
+    }
+
+
+def products_to_records(
+        main_category: str,
+        category_name: str,
+        depth: int,
+        products: list[ProductSchema | ProductRecord],
+        category_path: str | None = None,
+) -> list[dict[str, Any]]:
+    """Записи блока категории; цены в копейки переводятся одним пакетом"""
+    prices = parse_prices_minor([product.price for product in products])
+    return [
+        product_to_record(main_category, category_name, depth, product, price_minor, category_path)
+        for product, price_minor in zip(products, prices)
+    ]
+
+
+class CategoryPaths:
+    """
+    Полный путь категории ("Инструмент > Электроинструмент > Дрели") по блокам обхода.
+
+    Блоки одной основной категории приходят в порядке дерева, включая пустые блоки
+    промежуточных категорий, поэтому путь — стек имён по глубине. Блоки разных
+    основных категорий могут чередоваться: стеки у них свои.
+    """
+
+    def __init__(self) -> None:
+        self._stacks: dict[str, list[str]] = {}
+
+    def update(self, main_category_id: str, depth: int, category_name: str) -> str:
+        stack = self._stacks.setdefault(main_category_id, [])
+        del stack[depth:]
+        stack.append(category_name)
+        return CATEGORY_PATH_SEPARATOR.join(stack)
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
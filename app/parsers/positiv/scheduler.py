@@ -0,0 +1,160 @@
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from app.metrics import metrics
+from app.schemas.positiv.category import CategorySchema
+
+logger = logging.getLogger(__name__)
+
+SIGNALS = ("priority", "staleness", "volatility")
+
+
+class CategoryStats(NamedTuple):
+    """Итог прошлого обхода конечной категории из ProductStore"""
+    crawled_at: datetime
+    products: int
+    changed: int
+
+
+def parse_deadline(value: str, now: datetime | None = None) -> datetime:
+    """
+    Срок окончания обхода: "06:30" — ближайшие 06:30 (сегодня или завтра),
+    иначе дата и время в ISO 8601 ("2025-01-31T06:30").
+    """
+    now = now or datetime.now()
+    try:
+        moment = datetime.strptime(value, "%H:%M")
+    except ValueError:
+        return datetime.fromisoformat(value)
+    deadline = now.replace(hour=moment.hour, minute=moment.minute, second=0, microsecond=0)
+    return deadline if deadline > now else deadline + timedelta(days=1)
+
+
+def parse_weights(values: list[str]) -> dict[str, float]:
+    """["priority=1", "staleness=2"] -> {"priority": 1.0, "staleness": 2.0}"""
+    weights = {}
+    for value in values:
+        name, _, weight = value.partition("=")
+        if name not in SIGNALS:
+            raise ValueError(f"Неизвестный сигнал приоритета {name!r}, доступны: {', '.join(SIGNALS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+@dataclass
+class CrawlScheduler:
+    """
+    Порядок и бюджет времени обхода.
+
+    Оценка конечной категории — взвешенная сумма сигналов, каждый приведён к 0..1:
+    ``priority`` (CategorySchema.priority, больше — важнее), ``staleness`` (время с прошлого
+    обхода, новая категория — 1) и ``volatility`` (доля товаров, у которых в прошлый раз
+    изменились цена или остаток). Последние два берутся из ProductStore. Листинги и
+    карточки товаров берутся воркерами CrawlPipeline в порядке убывания оценки.
+
+    После ``deadline - reserve`` (резерв — на запись выгрузки) новые запросы не начинаются:
+    категории пропускаются, вместо карточек берутся сохранённые в хранилище. Что осталось
+    без обновления, выводится в ``report``.
+    """
+    weights: dict[str, float] = field(default_factory=lambda: dict.fromkeys(SIGNALS, 1.0))
+    deadline: datetime | None = None
+    reserve: float = 120.0
+    stats: dict[str, CategoryStats] = field(default_factory=dict)
+
+    skipped_categories: list[tuple[float, CategorySchema]] = field(default_factory=list, init=False)
+    skipped_products: int = field(default=0, init=False)
+    stale_products: int = field(default=0, init=False)
+    _scores: dict[str, float] = field(default_factory=dict, init=False)
+    _max_priority: int = field(default=0, init=False)
+    _max_age: float = field(default=0.0, init=False)
+    _cutoff: float | None = field(default=None, init=False)
+    _expired_at: float | None = field(default=None, init=False)
+
+    def __post_init__(self) -> None:
+        if self.deadline is not None:
+            self._cutoff = self.deadline.timestamp() - self.reserve
+        if self.stats:
+            now = datetime.now()
+            self._max_age = max((now - s.crawled_at).total_seconds() for s in self.stats.values())
+
+    @property
+    def expired(self) -> bool:
+        if self._cutoff is None or time.time() < self._cutoff:
+            return False
+        if self._expired_at is None:
+            self._expired_at = time.time()
+            logger.warning("Подходит срок %s: новые запросы больше не начинаются", self.deadline)
+        return True
+
+    def prepare(self, categories: Iterable[CategorySchema]) -> None:
+        """Нормировка priority по всем категориям каталога до начала обхода"""
+        self._max_priority = max((category.priority for category in categories), default=0)
+        self._scores.clear()
+
+    def score(self, category: CategorySchema) -> float:
+        cached = self._scores.get(category.public_id)
+        if cached is not None:
+            return cached
+        signals = {"priority": category.priority / self._max_priority if self._max_priority > 0 else 0.0}
+        stats = self.stats.get(category.public_id)
+        if stats is None:
+            signals["staleness"] = 1.0
+            signals["volatility"] = 0.0
+        else:
+            age = (datetime.now() - stats.crawled_at).total_seconds()
+            signals["staleness"] = age / self._max_age if self._max_age > 0 else 0.0
+            signals["volatility"] = stats.changed / stats.products if stats.products else 0.0
+        score = sum(self.weights.get(name, 0.0) * value for name, value in signals.items())
+        self._scores[category.public_id] = score
+        return score
+
+    def skip_category(self, category: CategorySchema) -> None:
+        self.skipped_categories.append((self.score(category), category))
+        metrics.inc("scheduler_skipped_total", kind="category")
+
+    def skip_product(self, stale: bool) -> None:
+        if stale:
+            self.stale_products += 1
+        else:
+            self.skipped_products += 1
+        metrics.inc("scheduler_skipped_total", kind="stale_product" if stale else "product")
+
+    def report(self, limit: int = 20) -> dict:
+        """Итог: сколько и каких категорий и товаров осталось без обновления"""
+        skipped = sorted(self.skipped_categories, key=lambda item: item[0], reverse=True)
+        report = {
+            "deadline": self.deadline.isoformat() if self.deadline else None,
+            "expired_at": datetime.fromtimestamp(self._expired_at).isoformat() if self._expired_at else None,
+            "weights": self.weights,
+            "skipped_categories": [
+                {
+                    "public_id": category.public_id,
+                    "name": category.name,
+                    "score": round(score, 4),
+                    "last_products": stats.products if (stats := self.stats.get(category.public_id)) else None,
+                }
+                for score, category in skipped
+            ],
+            "skipped_products": self.skipped_products,
+            "stale_products": self.stale_products,
+        }
+        if self._expired_at is None:
+            logger.info("Обход уложился в срок %s, ничего не пропущено", self.deadline)
+        else:
+            logger.warning(
+                "К сроку %s пропущено категорий: %s, товаров без карточки: %s, из хранилища без обновления: %s",
+                self.deadline, len(skipped), self.skipped_products, self.stale_products
+            )
+            for score, category in skipped[:limit]:
+                logger.warning("Пропущена категория '%s' (оценка %.3f)", category.name, score)
+        return report
+
+    def write_report(self, path: str | Path) -> dict:
+        report = self.report()
+        Path(path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        return report
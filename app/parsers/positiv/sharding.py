@@ -0,0 +1,412 @@
+import asyncio
+import gzip
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+import re
+import socket
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+from app.parsers.positiv.http_client import DEFAULT_COMPRESSION, create_client
+from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.sinks import Sink
+from app.schemas.positiv.category import CategorySchema
+from app.schemas.positiv.product import ProductLiteSchema, ProductSchema
+
+logger = logging.getLogger(__name__)
+
+
+def count_leaves(category: CategorySchema) -> int:
+    if not category.children:
+        return 1
+    return sum(count_leaves(child) for child in category.children)
+
+
+def plan_shards(main_categories: list[CategorySchema], n_shards: int, by: str = "leaves") -> list[list[str]]:
+    """
+    Разбить основные категории на ``n_shards`` сбалансированных шардов.
+
+    ``by="leaves"`` — вес категории равен числу конечных подкатегорий (жадная
+    упаковка: самая тяжёлая категория в самый лёгкий шард), ``by="main"`` —
+    все основные категории считаются равными.
+    """
+    weights = [
+        (count_leaves(c) if by == "leaves" else 1, position, c.public_id)
+        for position, c in enumerate(main_categories)
+    ]
+    shards: list[list[str]] = [[] for _ in range(min(n_shards, len(main_categories)) or 1)]
+    heap = [(0, index) for index in range(len(shards))]
+    for weight, _, public_id in sorted(weights, reverse=True):
+        load, index = heapq.heappop(heap)
+        shards[index].append(public_id)
+        heapq.heappush(heap, (load + weight, index))
+    return [shard for shard in shards if shard]
+
+
+class ShardQueue:
+    """
+    Очередь шардов в SQLite-файле, общая для процессов и машин.
+
+    Воркер забирает шард (``claim``), периодически отмечается (``heartbeat``) и по
+    завершении помечает его выполненным. Шард упавшего воркера возвращается в
+    очередь через ``fail`` или, если воркер пропал молча, через
+    ``reclaim_stale`` по устаревшей отметке. Выгрузки шардов лежат в ``output_dir``,
+    по файлу на основную категорию.
+
+    Воркер пишет выгрузку во временные файлы со своим именем (``temp_path``), а
+    ``complete`` переименовывает их в итоговые, только если шард всё ещё за этим
+    воркером. Поэтому воркер, которого сочли пропавшим, но который продолжает работу,
+    не портит выгрузку того, кто забрал шард после него.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS mains (
+            public_id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            shard_id INTEGER NOT NULL,
+            payload TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS shards (
+            id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            worker TEXT,
+            heartbeat REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT
+        );
+    """
+
+    def __init__(self, path: str | Path, output_dir: str | Path | None = None, max_attempts: int = 3):
+        self.path = Path(path)
+        self.output_dir = Path(output_dir) if output_dir else self.path.with_suffix(".shards")
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.executescript(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # отдельное соединение на операцию: очередь используют несколько процессов
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    def create(self, main_categories: list[CategorySchema], shards: list[list[str]]) -> None:
+        """Записать план; существующий план и выгрузки шардов заменяются"""
+        shard_of = {public_id: i for i, shard in enumerate(shards) for public_id in shard}
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM mains")
+            conn.execute("DELETE FROM shards")
+            conn.executemany(
+                "INSERT INTO shards (id) VALUES (?)", [(i,) for i in range(len(shards))]
+            )
+            conn.executemany(
+                "INSERT INTO mains (public_id, position, shard_id, payload) VALUES (?, ?, ?, ?)",
+                [
+                    (c.public_id, position, shard_of[c.public_id], c.model_dump_json(exclude={"children"}))
+                    for position, c in enumerate(main_categories)
+                ]
+            )
+            conn.execute("COMMIT")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for pattern in ("*.jsonl.gz", "*.tmp"):
+            for old in self.output_dir.glob(pattern):
+                old.unlink()
+
+    def claim(self, worker: str) -> tuple[int, list[str]] | None:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM shards WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            shard_id = row[0]
+            conn.execute(
+                "UPDATE shards SET status = 'running', worker = ?, heartbeat = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker, time.time(), shard_id)
+            )
+            mains = [r[0] for r in conn.execute(
+                "SELECT public_id FROM mains WHERE shard_id = ? ORDER BY position", (shard_id,)
+            )]
+            conn.execute("COMMIT")
+        return shard_id, mains
+
+    def heartbeat(self, shard_id: int, worker: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE shards SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), shard_id, worker)
+            )
+
+    def complete(self, shard_id: int, worker: str) -> bool:
+        """
+        Перенести временные выгрузки шарда в итоговые и пометить шард выполненным.
+        Если шард уже отдан другому воркеру, выгрузки удаляются и возвращается False.
+        """
+        with closing(self._connect()) as conn:
+            # переименование внутри транзакции: второй воркер не пройдёт проверку, пока оно не закончено
+            conn.execute("BEGIN IMMEDIATE")
+            held = conn.execute(
+                "SELECT 1 FROM shards WHERE id = ? AND worker = ? AND status = 'running'", (shard_id, worker)
+            ).fetchone()
+            mains = [r[0] for r in conn.execute("SELECT public_id FROM mains WHERE shard_id = ?", (shard_id,))]
+            for public_id in mains:
+                temp = self.temp_path(public_id, worker)
+                if held:
+                    os.replace(temp, self.output_path(public_id))
+                else:
+                    temp.unlink(missing_ok=True)
+            if held:
+                conn.execute("UPDATE shards SET status = 'done', error = NULL WHERE id = ?", (shard_id,))
+            conn.execute("COMMIT")
+        if not held:
+            logger.warning("Шард %s уже передан другому воркеру, выгрузки %s отброшены", shard_id, worker)
+        return bool(held)
+
+    def fail(self, shard_id: int, worker: str | None = None, error: str = "") -> None:
+        """Вернуть шард в очередь или окончательно пометить ошибочным после max_attempts"""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, error = ? WHERE id = ? AND status = 'running' AND (? IS NULL OR worker = ?)",
+                (self.max_attempts, error, shard_id, worker, worker)
+            )
+            if worker is not None:
+                for (public_id,) in conn.execute("SELECT public_id FROM mains WHERE shard_id = ?", (shard_id,)):
+                    self.temp_path(public_id, worker).unlink(missing_ok=True)
+
+    def stale(self, timeout: float) -> list[tuple[int, str]]:
+        """Шарды и их воркеры, не отмечавшиеся дольше ``timeout`` секунд"""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT id, worker FROM shards WHERE status = 'running' AND heartbeat < ?",
+                (time.time() - timeout,)
+            ).fetchall()
+
+    def reclaim_stale(self, timeout: float) -> list[int]:
+        """Вернуть в очередь шарды, воркеры которых не отмечались дольше ``timeout`` секунд"""
+        stale = self.stale(timeout)
+        for shard_id, worker in stale:
+            logger.warning("Шард %s не отвечает дольше %s с, возвращаем в очередь", shard_id, timeout)
+            self.fail(shard_id, worker, error="heartbeat timeout")
+        return [shard_id for shard_id, _ in stale]
+
+    def claimed_by(self, worker: str) -> list[int]:
+        with closing(self._connect()) as conn:
+            return [r[0] for r in conn.execute(
+                "SELECT id FROM shards WHERE status = 'running' AND worker = ?", (worker,)
+            )]
+
+    def status(self) -> dict[str, int]:
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+
+    def is_finished(self) -> bool:
+        status = self.status()
+        return not status.get("pending") and not status.get("running")
+
+    def main_categories(self) -> list[CategorySchema]:
+        with closing(self._connect()) as conn:
+            return [
+                CategorySchema.model_validate_json(r[0])
+                for r in conn.execute("SELECT payload FROM mains ORDER BY position")
+            ]
+
+    def output_path(self, main_public_id: str) -> Path:
+        return self.output_dir / f"{main_public_id}.jsonl.gz"
+
+    def temp_path(self, main_public_id: str, worker: str) -> Path:
+        """Выгрузка основной категории, пока шард не завершён воркером ``worker``"""
+        return self.output_dir / f"{main_public_id}.jsonl.gz.{re.sub(r'[^\w.-]', '_', worker)}.tmp"
+
+
+async def crawl_shard(parser: PositiveParserAPI, queue: ShardQueue, main_ids: list[str], worker: str) -> None:
+    """
+    Обойти основные категории шарда и записать блоки ``(глубина, категория, товары)``
+    построчно во временные gzip-файлы воркера, по файлу на основную категорию.
+    """
+    categories = await parser.get_categories()
+    categories_with_children = parser.make_categories_with_children(categories)
+
+    async def process_category(main_category: CategorySchema) -> None:
+        path = queue.temp_path(main_category.public_id, worker)
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=3) as f:
+            async for depth, category_name, products in parser.walk_categories(main_category):
+                products_json = ",".join(p.model_dump_json(by_alias=True) for p in products)
+                f.write(
+                    f'{{"depth":{depth},"category":{json.dumps(category_name, ensure_ascii=False)},'
+                    f'"products":[{products_json}]}}\n'
+                )
+
+    missing = [public_id for public_id in main_ids if public_id not in categories_with_children]
+    if missing:
+        raise RuntimeError(f"Категории шарда не найдены в API: {missing}")
+    await asyncio.gather(*(process_category(categories_with_children[i]) for i in main_ids))
+
+
+async def run_worker(
+        queue: ShardQueue,
+        worker: str | None = None,
+        max_concurrent: int = 100,
+        adaptive: bool = False,
+        fast_validation: bool = False,
+        http2: bool = False,
+        compression: tuple[str, ...] = DEFAULT_COMPRESSION,
+        stream_listings: bool = False,
+        heartbeat_interval: float = 15,
+) -> int:
+    """Забирать шарды из очереди, пока они есть; возвращает число выполненных шардов"""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    done = 0
+    async with create_client(max_concurrent, http2=http2, compression=compression) as client:
+        while (claimed := queue.claim(worker)) is not None:
+            shard_id, main_ids = claimed
+            logger.info("Воркер %s взял шард %s (%s основных категорий)", worker, shard_id, len(main_ids))
+            parser = PositiveParserAPI(
+                client=client,
+                max_concurrent=max_concurrent,
+                adaptive=adaptive,
+                fast_validation=fast_validation,
+                stream_listings=stream_listings,
+            )
+
+            async def beat():
+                while True:
+                    await asyncio.sleep(heartbeat_interval)
+                    await asyncio.to_thread(queue.heartbeat, shard_id, worker)
+
+            heartbeat = asyncio.create_task(beat())
+            try:
+                await crawl_shard(parser, queue, main_ids, worker)
+            except Exception as e:
+                logger.exception("Воркер %s: ошибка в шарде %s", worker, shard_id)
+                queue.fail(shard_id, worker, error=repr(e))
+            else:
+                if queue.complete(shard_id, worker):
+                    done += 1
+            finally:
+                heartbeat.cancel()
+    return done
+
+
+def _worker_process(queue_path: str, output_dir: str, worker: str, kwargs: dict) -> None:
+    from app.logging_config import setup_logging
+
+    setup_logging()
+    queue = ShardQueue(queue_path, output_dir)
+    asyncio.run(run_worker(queue, worker=worker, **kwargs))
+
+
+def run_local_workers(
+        queue: ShardQueue,
+        n_workers: int,
+        stale_timeout: float = 120,
+        **worker_kwargs,
+) -> None:
+    """
+    Запустить ``n_workers`` процессов-воркеров и следить за ними.
+    Шарды упавшего процесса возвращаются в очередь, вместо него запускается новый.
+    Процесс, переставший отмечаться дольше ``stale_timeout``, сначала завершается,
+    чтобы он не продолжал писать шард, отданный другому воркеру.
+
+    Возврат управления — только когда в очереди не осталось ожидающих и выполняемых
+    шардов: шард, взятый воркером на другой машине, дожидается его или, если тот
+    перестал отмечаться, возвращается в очередь и отдаётся новому локальному процессу.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes: dict[str, multiprocessing.Process] = {}
+    spawned = 0
+
+    def spawn() -> None:
+        nonlocal spawned
+        name = f"{socket.gethostname()}:shard-worker-{spawned}"
+        spawned += 1
+        process = context.Process(
+            target=_worker_process,
+            args=(str(queue.path), str(queue.output_dir), name, worker_kwargs),
+            name=name,
+        )
+        process.start()
+        processes[name] = process
+
+    for _ in range(n_workers):
+        spawn()
+
+    while processes or not queue.is_finished():
+        time.sleep(1)
+        for shard_id, owner in queue.stale(stale_timeout):
+            if (process := processes.get(owner)) is not None and process.is_alive():
+                logger.error("Процесс %s не отмечается по шарду %s дольше %s с, завершаем",
+                             owner, shard_id, stale_timeout)
+                process.terminate()
+                process.join(10)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+        for name, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            del processes[name]
+            claimed = queue.claimed_by(name)
+            if process.exitcode != 0 or claimed:
+                logger.error("Процесс %s завершился с кодом %s, шарды %s возвращены в очередь",
+                             name, process.exitcode, claimed)
+                for shard_id in claimed:
+                    queue.fail(shard_id, name, error=f"exit code {process.exitcode}")
+        queue.reclaim_stale(stale_timeout)
+        # после возврата шардов в очередь держим нужное число воркеров
+        if not queue.is_finished():
+            while len(processes) < n_workers and queue.status().get("pending"):
+                spawn()
+
+    status = queue.status()
+    if status.get("failed"):
+        raise RuntimeError(f"Не удалось обработать шарды: {status}")
+
+
+def merge_shards(queue: ShardQueue, sinks: list[Sink], fast_validation: bool = False) -> None:
+    """Собрать выгрузки шардов в итоговые приёмники в исходном порядке основных категорий"""
+    if not queue.is_finished() or queue.status().get("failed"):
+        raise RuntimeError(f"Не все шарды выполнены: {queue.status()}")
+    schema = ProductLiteSchema if fast_validation else ProductSchema
+    main_categories = queue.main_categories()
+    for sink in sinks:
+        sink.open(main_categories)
+    completed = False
+    try:
+        for main_category in main_categories:
+            with gzip.open(queue.output_path(main_category.public_id), "rt", encoding="utf-8") as f:
+                for line in f:
+                    block = json.loads(line)
+                    products = [schema.model_validate(p) for p in block["products"]]
+                    for sink in sinks:
+                        sink.write(main_category, block["depth"], block["category"], products)
+            for sink in sinks:
+                sink.flush()
+            logger.info("Шард основной категории %s добавлен в выгрузку", main_category.name)
+        completed = True
+    finally:
+        for sink in sinks:
+            if completed:
+                sink.close()
+            else:
+                sink.abort()
+
+
+async def plan(parser: PositiveParserAPI, queue: ShardQueue, n_shards: int, by: str = "leaves") -> None:
+    categories = await parser.get_categories()
+    categories_with_children = parser.make_categories_with_children(categories)
+    main_categories = [c for c in categories_with_children.values() if c.parent_id is None]
+    shards = plan_shards(main_categories, n_shards, by=by)
+    queue.create(main_categories, shards)
+    logger.info(
+        "План: %s шардов, листьев по шардам: %s", len(shards),
+        [sum(count_leaves(categories_with_children[i]) for i in shard) for shard in shards]
+    )
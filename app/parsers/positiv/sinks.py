@@ -0,0 +1,348 @@
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from app.metrics import metrics
+from app.parsers.positiv.history import Observation, PriceHistory
+from app.parsers.positiv.rows import (
+    FIELDS, HEADERS, CategoryPaths, json_default, product_to_row, products_to_records
+)
+from app.prices import parse_prices_minor
+from app.schemas.positiv.category import CategorySchema
+
+if TYPE_CHECKING:
+    from app.parsers.positiv.positiv import PositiveParserAPI
+
+logger = logging.getLogger(__name__)
+
+
+class Sink(ABC):
+    """
+    Приёмник потока ``(глубина, категория, товары)`` из walk_categories.
+
+    Методы вызываются из потока записи SinkWriter по очереди, поэтому приёмникам
+    не нужна своя синхронизация. После каждого блока вызывается ``flush``, чтобы
+    прерванный запуск оставлял пригодные файлы. В конце успешного обхода вызывается
+    ``close``, после сбоя или отмены — ``abort``: файлы дописываются так же, а итоги,
+    которые имеют смысл только для полного каталога, не сохраняются.
+    """
+
+    def open(self, main_categories: list[CategorySchema]) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, main_category: CategorySchema, depth: int, category_name: str, products: list) -> None:
+        ...
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        self.close()
+
+
+class ExcelSink(Sink):
+    """Excel в write-only режиме: лист на основную категорию, заголовки категорий жирным"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._wb = Workbook(write_only=True)
+        self._sheets = {}
+        self._bold = Font(bold=True)
+
+    def open(self, main_categories: list[CategorySchema]) -> None:
+        # листы создаём заранее, чтобы их порядок не зависел от порядка прихода данных
+        for main_category in main_categories:
+            ws = self._wb.create_sheet(title=main_category.name[:31])  # имя листа не длиннее 31 символа
+            ws.append(HEADERS)
+            self._sheets[main_category.public_id] = ws
+
+    def write(self, main_category: CategorySchema, depth: int, category_name: str, products: list) -> None:
+        ws = self._sheets[main_category.public_id]
+        title = WriteOnlyCell(ws, value=f"{'    ' * depth}{category_name}")
+        title.font = self._bold
+        ws.append([title])
+        for product in products:
+            ws.append(product_to_row(category_name, product))
+
+    def close(self) -> None:
+        # формат xlsx не позволяет дописывать файл, поэтому он появляется только в конце
+        self._wb.save(self.path)
+        self._wb.close()
+
+
+class CsvSink(Sink):
+    """CSV с дописыванием строк; заголовок пишется один раз"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file = None
+        self._writer = None
+        self._paths = CategoryPaths()
+
+    def open(self, main_categories: list[CategorySchema]) -> None:
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        self._writer.writeheader()
+
+    def write(self, main_category: CategorySchema, depth: int, category_name: str, products: list) -> None:
+        path = self._paths.update(main_category.public_id, depth, category_name)
+        self._writer.writerows(products_to_records(main_category.name, category_name, depth, products, path))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonLinesSink(Sink):
+    """JSON Lines, по объекту на товар; ``compress`` (или суффикс .gz) включает gzip"""
+
+    def __init__(self, path: str | Path, compress: bool | None = None):
+        self.path = Path(path)
+        self.compress = self.path.suffix == ".gz" if compress is None else compress
+        self._file = None
+        self._paths = CategoryPaths()
+
+    def open(self, main_categories: list[CategorySchema]) -> None:
+        if self.compress:
+            self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, main_category: CategorySchema, depth: int, category_name: str, products: list) -> None:
+        path = self._paths.update(main_category.public_id, depth, category_name)
+        for record in products_to_records(main_category.name, category_name, depth, products, path):
+            self._file.write(json.dumps(record, ensure_ascii=False, default=json_default))
+            self._file.write("\n")
+
+    def flush(self) -> None:
+        # у gzip flush завершает блок сжатия: уже записанное можно распаковать
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(Sink):
+    """
+    Parquet-датасет: каталог с файлами ``part-NNNNN.parquet``, по группе строк в файле.
+
+    Часть записывается, как только набирается ``row_group_size`` товаров, а ``flush``
+    после блока записывает накопленное, если с прошлой части прошло ``flush_interval``
+    секунд. Файл части сразу закрывается, поэтому прерванный запуск оставляет читаемые
+    части и теряет не больше строк, чем пришло за ``flush_interval``.
+    Требует pyarrow (``pip install price-parser[parquet]``).
+    """
+
+    def __init__(self, path: str | Path, row_group_size: int = 50_000, flush_interval: float = 30.0):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Для ParquetSink нужен pyarrow: pip install pyarrow") from e
+        self._pa = pa
+        self._pq = pq
+        self.path = Path(path)
+        self.row_group_size = row_group_size
+        self.flush_interval = flush_interval
+        self._rows: list[dict[str, Any]] = []
+        self._parts = 0
+        self._last_part = time.monotonic()
+        self._paths = CategoryPaths()
+        timestamp = pa.timestamp("us", tz="UTC")
+        self._schema = pa.schema([
+            ("main_category", pa.string()), ("category", pa.string()), ("category_path", pa.string()),
+            ("depth", pa.int16()),
+            ("public_id", pa.string()), ("name", pa.string()), ("imageUrl", pa.string()),
+            ("vendorCode", pa.string()), ("code", pa.string()), ("description", pa.string()),
+            ("count", pa.int64()), ("unitOfMeasurement", pa.string()), ("isAvailable", pa.bool_()),
+            ("price", pa.string()), ("price_minor", pa.int64()), ("currency", pa.string()),
+            ("links1c", pa.string()),
+            ("publishedDate", timestamp), ("unpublishedDate", timestamp),
+            ("createdAt", timestamp), ("updatedAt", timestamp),
+        ])
+
+    def open(self, main_categories: list[CategorySchema]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        for old_part in self.path.glob("part-*.parquet"):
+            old_part.unlink()
+
+    def write(self, main_category: CategorySchema, depth: int, category_name: str, products: list) -> None:
+        path = self._paths.update(main_category.public_id, depth, category_name)
+        self._rows.extend(products_to_records(main_category.name, category_name, depth, products, path))
+        if len(self._rows) >= self.row_group_size:
+            self._write_part()
+
+    def flush(self) -> None:
+        # часть на каждый блок дала бы тысячи мелких файлов, поэтому сбрасываем по времени
+        if time.monotonic() - self._last_part >= self.flush_interval:
+            self._write_part()
+
+    def _write_part(self) -> None:
+        self._last_part = time.monotonic()
+        if not self._rows:
+            return
+        table = self._pa.Table.from_pylist(self._rows, schema=self._schema)
+        self._pq.write_table(table, self.path / f"part-{self._parts:05d}.parquet", compression="zstd")
+        self._parts += 1
+        self._rows = []
+
+    def close(self) -> None:
+        self._write_part()
+
+
+class HistorySink(Sink):
+    """
+    История цен и остатков (PriceHistory): значения товаров собираются за запуск,
+    при закрытии сравниваются с прошлым запуском и изменения дописываются сегментом.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.history = PriceHistory(directory)
+        self._observed: dict[str, Observation] = {}
+        self._paths = CategoryPaths()
+
+    def write(self, main_category: CategorySchema, depth: int, category_name: str, products: list) -> None:
+        path = self._paths.update(main_category.public_id, depth, category_name)
+        prices = parse_prices_minor([product.price for product in products])
+        for product, price_minor in zip(products, prices):
+            self._observed[product.public_id] = Observation(
+                name=product.name,
+                category=path,
+                price_minor=price_minor,
+                count=product.count,
+                available=product.isAvailable,
+                published=product.isPublished is not False,
+            )
+
+    def close(self) -> None:
+        if self._observed:
+            self.history.record_run(self._observed)
+
+    def abort(self) -> None:
+        # неполный обход: все товары, до которых он не дошёл, в следующий раз выглядели бы изменившимися
+        logger.warning("Обход не завершён, запуск в историю цен %s не записан", self.history.directory)
+
+
+class SinkWriter:
+    """
+    Поток записи для набора приёмников.
+
+    Корутины кладут блоки в ограниченную очередь, поток раздаёт их всем приёмникам,
+    поэтому память не растёт вместе с каталогом, а запись не блокирует event loop.
+    """
+
+    _STOP = object()
+
+    def __init__(self, sinks: list[Sink], queue_size: int = 4):
+        self.sinks = sinks
+        self.blocks_written = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._error: BaseException | None = None
+        self._completed = False
+        self._thread = threading.Thread(target=self._run, name="sink-writer", daemon=True)
+
+    def start(self, main_categories: list[CategorySchema]) -> None:
+        for sink in self.sinks:
+            sink.open(main_categories)
+        self._thread.start()
+
+    async def put(self, main_category: CategorySchema, depth: int, category_name: str, products: list) -> None:
+        """Положить блок в очередь; при заполненной очереди ждём, не блокируя event loop"""
+        item = (main_category, depth, category_name, products)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, item)
+
+    async def close(self, completed: bool = True) -> None:
+        """Дописать очередь и закрыть приёмники: ``close`` после полного обхода, иначе ``abort``"""
+        self._completed = completed
+        await asyncio.to_thread(self._queue.put, self._STOP)
+        await asyncio.to_thread(self._thread.join)
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        stopped = False
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._STOP:
+                    stopped = True
+                    break
+                products = item[3]
+                for sink in self.sinks:
+                    name = type(sink).__name__
+                    with metrics.timer("sink_write_seconds", sink=name):
+                        sink.write(*item)
+                        sink.flush()
+                    metrics.inc("sink_rows_total", len(products), sink=name)
+                self.blocks_written += 1
+        except BaseException as e:
+            self._error = e
+            # разгружаем очередь, чтобы продюсеры не зависли на put
+            while not stopped:
+                stopped = self._queue.get() is self._STOP
+        finally:
+            completed = self._completed and self._error is None
+            for sink in self.sinks:
+                try:
+                    if completed:
+                        sink.close()
+                    else:
+                        sink.abort()
+                except Exception as e:
+                    logger.exception("Ошибка при закрытии %s", type(sink).__name__)
+                    self._error = self._error or e
+
+
+async def export_products(
+        parser: "PositiveParserAPI",
+        sinks: list[Sink],
+        queue_size: int = 4
+) -> None:
+    """Один обход каталога с записью во все приёмники сразу"""
+    categories = await parser.get_categories()
+    categories_with_children = parser.make_categories_with_children(categories)
+    main_categories = [c for c in categories_with_children.values() if c.parent_id is None]
+
+    writer = SinkWriter(sinks, queue_size=queue_size)
+    writer.start(main_categories)
+    metrics.set("main_categories", len(main_categories))
+
+    async def process_category(main_category):
+        async for depth, category_name, products in parser.walk_categories(main_category):
+            await writer.put(main_category, depth, category_name, products)
+            if products:
+                logger.info(
+                    "Записаны %d товаров категории %s (%s)",
+                    len(products),
+                    category_name,
+                    main_category.name
+                )
+
+    completed = False
+    try:
+        await asyncio.gather(*(process_category(c) for c in main_categories))
+        completed = True
+    finally:
+        await writer.close(completed)
+    logger.info("Выгрузка завершена: %s", ", ".join(type(s).__name__ for s in sinks))
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Iterable
+
+from app.metrics import metrics
+from app.parsers.browser_pool import BrowserPool
+from app.parsers.etm import EtmParser
+from app.parsers.ozon import OzonParser
+from app.parsers.parser import Parser
+from app.parsers.vseinstrumenti import VseinstrumentiParser
+
+logger = logging.getLogger(__name__)
+
+SHOP_PARSERS: dict[str, type[Parser]] = {
+    "etm": EtmParser,
+    "ozon": OzonParser,
+    "vseinstrumenti": VseinstrumentiParser,
+}
+
+
+@dataclass
+class SearchResult:
+    keyword: str
+    shop_name: str
+    products: list[dict] = field(default_factory=list)
+    error: str | None = None
+    elapsed: float = 0.0
+
+
+class SearchOrchestrator:
+    """
+    Поиск пачки ключевых слов сразу во всех магазинах на общем пуле страниц.
+
+    Для каждого магазина своя очередь слов и ``per_shop_concurrency`` воркеров,
+    так что медленный магазин не занимает слоты остальных. Результаты отдаются
+    одним потоком по мере готовности, в конце в лог пишется скорость в поисках
+    в минуту. Размер пула должен быть не меньше ``len(parsers) * per_shop_concurrency``,
+    иначе воркеры будут ждать страниц.
+    """
+
+    def __init__(
+            self,
+            pool: BrowserPool,
+            parsers: Iterable[type[Parser]] = SHOP_PARSERS.values(),
+            per_shop_concurrency: int = 4,
+            timeout: float = 90,
+            delay: float = 0.5,
+            block_resources: bool = True,
+            capture_api: bool | None = None,
+    ) -> None:
+        self.pool = pool
+        self.parsers = list(parsers)
+        self.per_shop_concurrency = per_shop_concurrency
+        self.timeout = timeout
+        self.delay = delay
+        self.block_resources = block_resources
+        self.capture_api = capture_api
+        self.completed: Counter[str] = Counter()
+        self.failed: Counter[str] = Counter()
+        self._started: float | None = None
+
+    @property
+    def searches_per_minute(self) -> float:
+        if self._started is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started
+        return sum(self.completed.values()) / elapsed * 60 if elapsed else 0.0
+
+    async def run(self, keywords: Iterable[str]) -> AsyncGenerator[SearchResult]:
+        keywords = list(dict.fromkeys(keywords))
+        total = len(keywords) * len(self.parsers)
+        results: asyncio.Queue[SearchResult] = asyncio.Queue(maxsize=self.per_shop_concurrency * len(self.parsers))
+        workers = []
+        self._started = time.monotonic()
+        for parser_cls in self.parsers:
+            queue: asyncio.Queue[str] = asyncio.Queue()
+            for keyword in keywords:
+                queue.put_nowait(keyword)
+            workers.extend(
+                asyncio.create_task(self._worker(parser_cls, queue, results))
+                for _ in range(min(self.per_shop_concurrency, len(keywords)))
+            )
+        try:
+            for done in range(1, total + 1):
+                yield await results.get()
+                if done % 50 == 0:
+                    logger.info("Выполнено поисков %s из %s, %.1f в минуту", done, total, self.searches_per_minute)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        logger.info(
+            "Поиск завершён: %s поисков, ошибок %s, %.1f поисков в минуту",
+            sum(self.completed.values()), dict(self.failed), self.searches_per_minute
+        )
+
+    async def _worker(
+            self,
+            parser_cls: type[Parser],
+            queue: asyncio.Queue[str],
+            results: asyncio.Queue[SearchResult]
+    ) -> None:
+        while not queue.empty():
+            keyword = queue.get_nowait()
+            started = time.monotonic()
+            result = SearchResult(keyword=keyword, shop_name=parser_cls.SHOP_NAME)
+            try:
+                parser = parser_cls(
+                    browser=self.pool,
+                    word=keyword,
+                    delay=self.delay,
+                    block_resources=self.block_resources,
+                    capture_api=self.capture_api,
+                )
+                result.products = await asyncio.wait_for(parser.search_products(), self.timeout)
+                status = "ok"
+            except asyncio.TimeoutError:
+                result.error = f"timeout {self.timeout} с"
+                status = "timeout"
+            except Exception as e:
+                logger.warning("Ошибка поиска '%s' в %s: %s", keyword, parser_cls.SHOP_NAME, e)
+                result.error = repr(e)
+                status = "error"
+            result.elapsed = time.monotonic() - started
+            self.completed[parser_cls.SHOP_NAME] += 1
+            if result.error:
+                self.failed[parser_cls.SHOP_NAME] += 1
+            metrics.inc("shop_searches_total", shop=parser_cls.__name__, status=status)
+            metrics.observe("shop_search_seconds", result.elapsed, shop=parser_cls.__name__)
+            await results.put(result)
@@ -1,7 +1,8 @@
 import asyncio
+from decimal import Decimal
 from pprint import pprint
 
-from playwright.async_api import Page, expect, Locator, Browser
+from playwright.async_api import Page, expect
 
 from app.parsers.parser import Parser
 
@@ -9,10 +10,14 @@ from app.parsers.parser import Parser
 class VseinstrumentiParser(Parser):
     BASE_URL = r"https://www.vseinstrumenti.ru/"
     SHOP_NAME = "Все инструменты"
-
-    def __init__(self, browser: Browser, word: str, delay: float = 0.5):
-        super().__init__(word=word, delay=delay)
-        self._browser = browser
+    FIRST_PARTY_HOSTS = ("vseinstrumenti.ru",)
+    SEARCH_API_PATTERNS = (r"vseinstrumenti\.ru/api/.*(search|listing)",)
+    TILE_SELECTOR = '[data-qa="products-tile"]'
+    FIELD_SELECTORS = {
+        "name": ('[data-qa="product-name"]', "innerText"),
+        "price": ('[data-qa="product-price-current"]', "textContent"),
+        "href": ('[data-qa="product-name"]', "@href"),
+    }
 
     async def _perform_search(self, page: Page) -> None:
         # Заполняет данные в поисковой строке и нажимает на кнопку поиска
@@ -24,30 +29,23 @@ class VseinstrumentiParser(Parser):
         btn = page.locator('[data-qa="header-search-button"]')
         await btn.click()
 
-    async def _parse_product(self, product: Locator) -> dict[str, str | float | None]:
-        # Проходит по странице с продуктами и собирает информацию (название, цена, ссылка)
-        name = await product.locator('[data-qa="product-name"]').inner_text()
-        price_raw = await product.locator('[data-qa="product-price-current"]').text_content()
-        href = await product.locator('[data-qa="product-name"]').get_attribute("href")
-        price = self._clear_price(price_raw)
+    def _parse_product(self, raw: dict[str, str | None]) -> dict[str, str | Decimal | None]:
+        # Собирает информацию о товаре (название, цена, ссылка) из значений плитки
+        name = raw["name"]
+        price = self._clear_price(raw["price"])
+        href = raw["href"]
         return {
             "shop_name": self.SHOP_NAME,
             "name": name.strip() if name else None,
-            "price": int(price) if price else None,
+            "price": price,
             "url": href or None,
         }
 
-    async def search_products(self) -> list[dict[str, str | int | None]]:
-        page = await self.get_page(browser=self._browser, url=self.BASE_URL)
+    async def _search(self, page: Page) -> list[dict[str, str | Decimal | None]]:
+        # подсказки при вводе запроса тоже ходят в API поиска: их ответы не принимаем
+        self._capture_armed = False
         await self._perform_search(page)
+        self._capture_armed = True
 
         await expect(page.locator('[data-qa="listing"]')).to_be_visible()
-        products = page.locator('[data-qa="products-tile"]')
-        count = await products.count()
-
-        results = []
-        for i in range(count):
-            product = products.nth(i)
-            results.append(await self._parse_product(product))
-
-        return results
+        return await self._extract_products(page)
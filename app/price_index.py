@@ -0,0 +1,160 @@
+"""
+Индексы цен по снимку обхода (выгрузка ``--jsonl``) для справочного сервиса app.lookup.
+
+Снимок загружается целиком в память: словари по public_id, code и vendorCode,
+отсортированные пути категорий и нормализованные названия для поиска по префиксу
+(bisect). Ответ на товар сериализуется в JSON один раз при загрузке, запрос только
+склеивает готовые байты. Индекс после построения не меняется: новый снимок — новый
+объект PriceIndex.
+"""
+import gzip
+import json
+import logging
+import time
+import zlib
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.matching import normalize_code, normalize_name
+from app.parsers.positiv.http_client import json_loads
+from app.parsers.positiv.rows import CATEGORY_PATH_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+# поля товара в ответе сервиса
+RESPONSE_FIELDS = (
+    "public_id", "name", "vendorCode", "code", "price", "price_minor", "currency",
+    "count", "unitOfMeasurement", "isAvailable", "category_path",
+)
+# верхняя граница суффикса при поиске диапазона по префиксу
+_MAX_CHAR = "\U0010ffff"
+
+
+def prefix_range(keys: list[str], prefix: str) -> tuple[int, int]:
+    """Позиции [start, stop) ключей отсортированного списка, начинающихся с prefix"""
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + _MAX_CHAR)
+
+
+def name_key(name: str) -> str:
+    return " ".join(normalize_name(name))
+
+
+def iter_snapshot(path: str | Path) -> Iterator[dict[str, Any]]:
+    """
+    Записи выгрузки JSON Lines (в том числе .gz). Недописанный gzip (обход ещё идёт)
+    даёт EOFError при чтении конца файла — такой снимок не загружается.
+    """
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json_loads(line)
+
+
+@dataclass(frozen=True)
+class SnapshotInfo:
+    path: str
+    mtime: float
+    products: int
+    loaded_at: datetime
+    load_seconds: float
+
+
+class PriceIndex:
+    """Неизменяемые индексы одного снимка"""
+
+    def __init__(self, records: list[dict[str, Any]], info: SnapshotInfo | None = None):
+        self.info = info
+        self._bodies: list[bytes] = []
+        self._by_public_id: dict[str, int] = {}
+        codes = defaultdict(list)
+        vendor_codes = defaultdict(list)
+        categories = defaultdict(list)
+        names = []
+        for record in records:
+            position = len(self._bodies)
+            path = record.get("category_path") or CATEGORY_PATH_SEPARATOR.join(
+                dict.fromkeys(filter(None, (record.get("main_category"), record.get("category"))))
+            )
+            record["category_path"] = path
+            self._bodies.append(
+                json.dumps({key: record.get(key) for key in RESPONSE_FIELDS}, ensure_ascii=False).encode()
+            )
+            self._by_public_id[record["public_id"]] = position
+            if code := normalize_code(record.get("code")):
+                codes[code].append(position)
+            if vendor_code := normalize_code(record.get("vendorCode")):
+                vendor_codes[vendor_code].append(position)
+            categories[path].append(position)
+            names.append((name_key(record.get("name") or ""), position))
+        self._by_code = dict(codes)
+        self._by_vendor_code = dict(vendor_codes)
+        self._category_paths = sorted(categories)
+        self._by_category = [categories[path] for path in self._category_paths]
+        names.sort()
+        self._name_keys = [key for key, _ in names]
+        self._name_positions = [position for _, position in names]
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PriceIndex":
+        path = Path(path)
+        started = time.perf_counter()
+        mtime = path.stat().st_mtime
+        try:
+            records = list(iter_snapshot(path))
+        except (EOFError, zlib.error, gzip.BadGzipFile, ValueError) as e:
+            raise ValueError(f"Снимок {path} не дописан или повреждён: {e}") from e
+        if path.stat().st_mtime != mtime:
+            raise ValueError(f"Снимок {path} изменился во время загрузки")
+        index = cls(records)
+        index.info = SnapshotInfo(
+            path=str(path),
+            mtime=mtime,
+            products=len(records),
+            loaded_at=datetime.now(),
+            load_seconds=round(time.perf_counter() - started, 3),
+        )
+        logger.info("Загружен снимок %s: %s товаров за %.1f с", path, len(records), index.info.load_seconds)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def by_public_id(self, public_id: str) -> bytes | None:
+        position = self._by_public_id.get(public_id)
+        return None if position is None else self._bodies[position]
+
+    def by_code(self, code: str, limit: int | None = None) -> list[bytes]:
+        return [self._bodies[p] for p in self._by_code.get(normalize_code(code), [])[:limit]]
+
+    def by_vendor_code(self, vendor_code: str, limit: int | None = None) -> list[bytes]:
+        return [self._bodies[p] for p in self._by_vendor_code.get(normalize_code(vendor_code), [])[:limit]]
+
+    def by_category(self, path: str, limit: int = 100) -> list[bytes]:
+        """Товары категории и всех её подкатегорий; path — полный путь через " > " """
+        path = CATEGORY_PATH_SEPARATOR.join(part.strip() for part in path.split(CATEGORY_PATH_SEPARATOR.strip()))
+        result = []
+        start, stop = prefix_range(self._category_paths, path)
+        for i in range(start, stop):
+            category_path = self._category_paths[i]
+            # "Дрели" не должен захватывать соседнюю "Дрели-шуруповёрты"
+            if category_path != path and not category_path.startswith(path + CATEGORY_PATH_SEPARATOR):
+                continue
+            for position in self._by_category[i]:
+                result.append(self._bodies[position])
+                if len(result) >= limit:
+                    return result
+        return result
+
+    def search(self, prefix: str, limit: int = 20) -> list[bytes]:
+        """Товары, нормализованное название которых начинается с prefix"""
+        key = name_key(prefix)
+        if not key:
+            return []
+        start, stop = prefix_range(self._name_keys, key)
+        return [self._bodies[p] for p in self._name_positions[start:min(stop, start + limit)]]
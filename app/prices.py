@@ -0,0 +1,136 @@
+"""
+Разбор цен из строк магазинов и API: "1 234,56 ₽", "1.234,56", "797.26 ₽/шт", "12 990".
+
+Сумма возвращается как ``Decimal`` или целым числом в минимальных единицах (копейках).
+Пакетные функции разбирают каждое уникальное значение один раз — в колонке каталога
+и на странице выдачи цены сильно повторяются.
+"""
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+# цена без разделителей групп: "1234", "-1234.5", "1234.56", "150.000" (так отдаёт API positive.ooo)
+_PLAIN_RE = re.compile(r"-?\d+(?:\.\d{1,3})?")
+# минус учитывается, только если стоит перед числом, а не внутри слова или диапазона "100-200"
+_NUMBER_RE = re.compile(r"(?<!\w)[-−]?\d[\d\s'’.,]*")
+# \s в str-шаблонах покрывает и неразрывные/узкие пробелы (\u00a0, \u202f, \u2009)
+_GROUPING_RE = re.compile(r"[\s'’]")
+# единица начинается не с цифры, дальше цифры допустимы: "шт", "м2", "м³"
+_UNIT_RE = re.compile(r"/\s*([^\s/\d.,][^\s/.,]*)")
+
+CURRENCIES = {
+    "₽": "RUB", "руб": "RUB", "р.": "RUB", "rub": "RUB", "rur": "RUB",
+    "$": "USD", "usd": "USD",
+    "€": "EUR", "eur": "EUR",
+    "₸": "KZT", "kzt": "KZT",
+    "byn": "BYN",
+}
+_CURRENCY_RE = re.compile("|".join(re.escape(symbol) for symbol in sorted(CURRENCIES, key=len, reverse=True)))
+
+
+class Price(NamedTuple):
+    amount: Decimal
+    currency: str | None
+    unit: str | None
+
+
+def _normalize_number(raw: str) -> str | None:
+    """
+    Число в виде "-1234.56" из записи с разделителями групп.
+
+    Правило одно для любой записи, с валютой и без: если есть и точка, и запятая,
+    десятичный разделитель — последний из них; повторяющийся разделитель ("1.234.567")
+    разделяет группы; единственная точка или запятая всегда десятичная, поэтому
+    "1.234", "1.234 ₽" и "1,234" — это 1.234.
+    """
+    raw = raw.strip()
+    sign = "-" if raw[0] in "-−" else ""
+    digits = _GROUPING_RE.sub("", raw.lstrip("-−")).rstrip(".,")
+    last_dot, last_comma = digits.rfind("."), digits.rfind(",")
+    if last_dot < 0 and last_comma < 0:
+        return sign + digits if digits else None
+    if last_dot >= 0 and last_comma >= 0:
+        decimal_sep = "." if last_dot > last_comma else ","
+        group_sep = "," if decimal_sep == "." else "."
+        integer, _, fraction = digits.rpartition(decimal_sep)
+        integer = integer.replace(group_sep, "")
+        if decimal_sep in integer:
+            return None
+        return f"{sign}{integer}.{fraction}"
+
+    parts = digits.split("." if last_dot >= 0 else ",")
+    if len(parts) > 2:
+        if any(len(group) != 3 for group in parts[1:]):
+            return None
+        return sign + "".join(parts)
+    integer, fraction = parts
+    return f"{sign}{integer or '0'}.{fraction}"
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse_text(text: str) -> Decimal | None:
+    if _PLAIN_RE.fullmatch(text):
+        return Decimal(text)
+    match = _NUMBER_RE.search(text)
+    if match is None:
+        return None
+    number = _normalize_number(match.group())
+    if number is None:
+        return None
+    try:
+        return Decimal(number)
+    except InvalidOperation:
+        return None
+
+
+def parse_price(value: str | int | float | Decimal | None) -> Decimal | None:
+    """Сумма из строки с ценой; None, если числа в строке нет"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return _parse_text(value.strip())
+
+
+def parse_price_details(value: str | None) -> Price | None:
+    """Сумма, валюта (ISO-код) и единица после косой черты: "797.26 ₽/шт" -> (797.26, RUB, шт)"""
+    amount = parse_price(value)
+    if amount is None:
+        return None
+    lowered = value.lower()
+    currency = _CURRENCY_RE.search(lowered)
+    unit = _UNIT_RE.search(value)
+    return Price(
+        amount=amount,
+        currency=CURRENCIES[currency.group()] if currency else None,
+        unit=unit.group(1).rstrip(".") if unit else None,
+    )
+
+
+def to_minor_units(amount: Decimal | None, exponent: int = 2) -> int | None:
+    """Целое число минимальных единиц (копеек при exponent=2), с округлением половины вверх"""
+    if amount is None:
+        return None
+    return int(amount.scaleb(exponent).to_integral_value(ROUND_HALF_UP))
+
+
+def parse_prices(values: Iterable[str | int | float | Decimal | None]) -> list[Decimal | None]:
+    """Пакетный разбор: каждое уникальное значение разбирается один раз"""
+    values = values if isinstance(values, list) else list(values)
+    parsed = {value: parse_price(value) for value in dict.fromkeys(values)}
+    return [parsed[value] for value in values]
+
+
+def parse_prices_minor(
+        values: Iterable[str | int | float | Decimal | None],
+        exponent: int = 2
+) -> list[int | None]:
+    """Пакетный разбор сразу в минимальные единицы"""
+    values = values if isinstance(values, list) else list(values)
+    parsed = {value: to_minor_units(parse_price(value), exponent) for value in dict.fromkeys(values)}
+    return [parsed[value] for value in values]
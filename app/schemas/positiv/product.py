@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, TYPE_CHECKING
+from typing import Any, List, TYPE_CHECKING
 
-from pydantic import BaseModel, ConfigDict, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl, PrivateAttr, TypeAdapter
 from app.schemas.positiv.category import CategorySchema
 
 class BaseConfigModel(BaseModel):
@@ -95,6 +95,78 @@ class ProductSchema(BaseConfigModel):
 
 ProductSchema.model_rebuild()
 
+
+class ProductLiteSchema(BaseConfigModel):
+    """
+    Облегчённая проекция ProductSchema для быстрого пути валидации.
+
+    Сразу валидируются только поля, которые нужны выгрузкам. Тяжёлые вложенные части
+    (store, category, attributes, info_1c, images) хранятся как разобранный JSON и
+    валидируются в полные схемы при первом обращении; nameVector отбрасывается.
+    """
+    model_config = ConfigDict(from_attributes=True, extra='ignore', populate_by_name=True)
+
+    public_id: str
+    name: str
+    slug: str
+    imageUrl: str | None
+    vendorCode: str
+    code: str
+    description: str
+    count: int
+    unitOfMeasurement: str
+    isAvailable: bool
+    stockStatus: str
+    price: str
+    currency: str
+    links1c: str
+    isPublished: bool
+    publishedDate: datetime
+    unpublishedDate: datetime | None
+    createdAt: datetime
+    updatedAt: datetime
+
+    images_raw: Any = Field(default=None, alias="images")
+    info_1c_raw: Any = Field(default=None, alias="info_1c")
+    store_raw: Any = Field(default=None, alias="store")
+    category_raw: Any = Field(default=None, alias="category")
+    attributes_raw: Any = Field(default=None, alias="attributes")
+
+    _lazy: dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    def _validated(self, name: str, adapter: TypeAdapter) -> Any:
+        if name not in self._lazy:
+            raw = getattr(self, f"{name}_raw")
+            self._lazy[name] = None if raw is None else adapter.validate_python(raw)
+        return self._lazy[name]
+
+    @property
+    def images(self) -> list[HttpUrl] | None:
+        return self._validated("images", _IMAGES_ADAPTER)
+
+    @property
+    def info_1c(self) -> Info1CSchema | None:
+        return self._validated("info_1c", _INFO_1C_ADAPTER)
+
+    @property
+    def store(self) -> StoreSchema | None:
+        return self._validated("store", _STORE_ADAPTER)
+
+    @property
+    def category(self) -> CategorySchema | None:
+        return self._validated("category", _CATEGORY_ADAPTER)
+
+    @property
+    def attributes(self) -> list[AttributeSchema] | None:
+        return self._validated("attributes", _ATTRIBUTES_ADAPTER)
+
+
+_IMAGES_ADAPTER = TypeAdapter(List[HttpUrl])
+_INFO_1C_ADAPTER = TypeAdapter(Info1CSchema)
+_STORE_ADAPTER = TypeAdapter(StoreSchema)
+_CATEGORY_ADAPTER = TypeAdapter(CategorySchema)
+_ATTRIBUTES_ADAPTER = TypeAdapter(list[AttributeSchema])
+
 class ProductCategorySchema(BaseConfigModel):
     id: str
     public_id: str
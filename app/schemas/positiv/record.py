@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from typing import Any
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value is not None else None
+
+
+class ProductRecord:
+    """
+    Компактное представление товара для больших каталогов.
+
+    Хранит только поля, нужные выгрузкам и анализу, в ``__slots__`` без вложенных
+    моделей. Повторяющиеся строки (валюта, единица измерения, статус, склад,
+    категория) интернируются и делятся между всеми записями. Имена атрибутов совпадают
+    с ProductSchema, поэтому запись можно передавать в выгрузки вместо схемы.
+    """
+
+    __slots__ = (
+        "public_id", "name", "slug", "imageUrl", "vendorCode", "code", "description",
+        "count", "unitOfMeasurement", "isAvailable", "stockStatus", "price", "currency",
+        "links1c", "isPublished", "publishedDate", "unpublishedDate", "createdAt", "updatedAt",
+        "store_name", "category_id", "category_name",
+    )
+
+    def __init__(
+            self,
+            public_id: str,
+            name: str,
+            code: str,
+            price: str,
+            count: int,
+            slug: str | None = None,
+            imageUrl: str | None = None,
+            vendorCode: str | None = None,
+            description: str | None = None,
+            unitOfMeasurement: str | None = None,
+            isAvailable: bool | None = None,
+            stockStatus: str | None = None,
+            currency: str | None = None,
+            links1c: str | None = None,
+            isPublished: bool | None = None,
+            publishedDate: datetime | None = None,
+            unpublishedDate: datetime | None = None,
+            createdAt: datetime | None = None,
+            updatedAt: datetime | None = None,
+            store_name: str | None = None,
+            category_id: str | None = None,
+            category_name: str | None = None,
+    ) -> None:
+        self.public_id = public_id
+        self.name = name
+        self.slug = slug
+        self.imageUrl = imageUrl
+        self.vendorCode = vendorCode
+        self.code = code
+        self.description = description
+        self.count = count
+        self.unitOfMeasurement = _intern(unitOfMeasurement)
+        self.isAvailable = isAvailable
+        self.stockStatus = _intern(stockStatus)
+        self.price = price
+        self.currency = _intern(currency)
+        self.links1c = links1c
+        self.isPublished = isPublished
+        self.publishedDate = publishedDate
+        self.unpublishedDate = unpublishedDate
+        self.createdAt = createdAt
+        self.updatedAt = updatedAt
+        self.store_name = _intern(store_name)
+        self.category_id = _intern(category_id)
+        self.category_name = _intern(category_name)
+
+    @classmethod
+    def from_product(cls, product: Any) -> ProductRecord:
+        """Из ProductSchema или ProductLiteSchema (без валидации ленивых частей)"""
+        return cls(
+            public_id=product.public_id,
+            name=product.name,
+            slug=product.slug,
+            imageUrl=str(product.imageUrl) if product.imageUrl else None,
+            vendorCode=product.vendorCode,
+            code=product.code,
+            description=product.description,
+            count=product.count,
+            unitOfMeasurement=product.unitOfMeasurement,
+            isAvailable=product.isAvailable,
+            stockStatus=product.stockStatus,
+            price=product.price,
+            currency=product.currency,
+            links1c=product.links1c,
+            isPublished=product.isPublished,
+            publishedDate=product.publishedDate,
+            unpublishedDate=product.unpublishedDate,
+            createdAt=product.createdAt,
+            updatedAt=product.updatedAt,
+            store_name=_nested_field(product, "store", "name"),
+            category_id=_nested_field(product, "category", "public_id"),
+            category_name=_nested_field(product, "category", "name"),
+        )
+
+    @classmethod
+    def from_short_info(cls, product: Any) -> ProductRecord:
+        """Из элемента листинга ProductCategorySchema: поля карточки остаются пустыми"""
+        return cls(
+            public_id=product.public_id,
+            name=product.name,
+            slug=product.slug,
+            imageUrl=str(product.imageUrl) if product.imageUrl else None,
+            code=product.code,
+            description=product.description,
+            count=product.count,
+            price=product.price,
+            isPublished=product.isPublished,
+            category_id=product.categoryId,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"ProductRecord(public_id={self.public_id!r}, name={self.name!r}, price={self.price!r})"
+
+
+def _nested_field(product: Any, part: str, key: str) -> Any:
+    """Поле вложенной части товара; у облегчённой схемы читаем сырой JSON без валидации"""
+    raw = getattr(product, f"{part}_raw", None)
+    if isinstance(raw, dict):
+        return raw.get(key)
+    return getattr(getattr(product, part, None), key, None)
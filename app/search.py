@@ -0,0 +1,85 @@
+"""
+Поиск цен по списку ключевых слов сразу в ЭТМ, Озоне и Всех инструментах.
+
+    python -m app.search --keywords-file words.txt --per-shop 4 --output prices.jsonl
+    python -m app.search перфоратор шуруповёрт --shops ozon etm
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+from app.logging_config import setup_logging
+from app.parsers.browser_pool import BrowserPool
+from app.parsers.search import SHOP_PARSERS, SearchOrchestrator
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Поиск товаров в нескольких магазинах")
+    parser.add_argument("keywords", nargs="*", help="ключевые слова")
+    parser.add_argument("--keywords-file", metavar="PATH", help="файл с ключевыми словами, по одному в строке")
+    parser.add_argument("--shops", nargs="+", choices=list(SHOP_PARSERS), default=list(SHOP_PARSERS))
+    parser.add_argument("--per-shop", type=int, default=4, help="одновременных поисков в одном магазине")
+    parser.add_argument("--timeout", type=float, default=90, help="таймаут одного поиска, с")
+    parser.add_argument("--max-page-uses", type=int, default=50, help="после скольких поисков пересоздавать страницу")
+    parser.add_argument(
+        "--no-blocking", action="store_true",
+        help="загружать картинки, шрифты и сторонние скрипты (по умолчанию блокируются)"
+    )
+    api = parser.add_mutually_exclusive_group()
+    api.add_argument(
+        "--no-api", action="store_true",
+        help="не перехватывать JSON поисковых API магазинов, всегда разбирать страницу"
+    )
+    api.add_argument(
+        "--api", action="store_true",
+        help="перехватывать JSON поисковых API у всех магазинов с шаблонами, в том числе непроверенных"
+    )
+    parser.add_argument("--headed", action="store_true", help="показывать окно браузера")
+    parser.add_argument("--output", metavar="PATH", help="JSON Lines с найденными товарами (по умолчанию stdout)")
+    args = parser.parse_args()
+    if args.keywords_file:
+        lines = Path(args.keywords_file).read_text(encoding="utf-8").splitlines()
+        args.keywords += [line.strip() for line in lines if line.strip()]
+    if not args.keywords:
+        parser.error("укажите ключевые слова или --keywords-file")
+    return args
+
+
+async def main(args: argparse.Namespace) -> None:
+    parsers = [SHOP_PARSERS[shop] for shop in args.shops]
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        async with BrowserPool(
+                size=len(parsers) * args.per_shop,
+                contexts=len(parsers),
+                headless=not args.headed,
+                max_page_uses=args.max_page_uses,
+        ) as pool:
+            orchestrator = SearchOrchestrator(
+                pool,
+                parsers,
+                per_shop_concurrency=args.per_shop,
+                timeout=args.timeout,
+                block_resources=not args.no_blocking,
+                capture_api=False if args.no_api else (True if args.api else None),
+            )
+            async for result in orchestrator.run(args.keywords):
+                if result.error:
+                    logger.error("'%s' в %s: %s", result.keyword, result.shop_name, result.error)
+                # цена — Decimal, в JSON пишется строкой без потери точности
+                for product in result.products:
+                    output.write(json.dumps({"keyword": result.keyword, **product}, ensure_ascii=False, default=str) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,73 @@
+"""
+Шардированный обход на нескольких машинах через общую очередь (SQLite-файл на общем диске).
+
+    python -m app.shard plan  --queue /shared/positiv_shards.sqlite --shards 32
+    python -m app.shard work  --queue /shared/positiv_shards.sqlite      # на каждой машине
+    python -m app.shard merge --queue /shared/positiv_shards.sqlite --jsonl positiv_products.jsonl.gz
+"""
+import argparse
+import asyncio
+import logging
+
+from app.logging_config import setup_logging
+from app.main import add_http_arguments, add_output_arguments, build_sinks
+from app.parsers.positiv.http_client import create_client
+from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.sharding import ShardQueue, merge_shards, plan, run_local_workers
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Шардированный обход positive.ooo")
+    parser.add_argument("command", choices=["plan", "work", "merge"])
+    parser.add_argument("--queue", required=True, help="SQLite-файл очереди шардов")
+    parser.add_argument("--output-dir", help="каталог выгрузок шардов (по умолчанию рядом с очередью)")
+    parser.add_argument("--shards", type=int, default=16, help="число шардов для plan")
+    parser.add_argument(
+        "--by", choices=["leaves", "main"], default="leaves",
+        help="балансировать по числу конечных категорий или по основным категориям"
+    )
+    parser.add_argument("--processes", type=int, default=1, help="число процессов-воркеров для work")
+    parser.add_argument("--max-concurrent", type=int, default=100, help="лимит запросов на процесс")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--fast-validation", action="store_true")
+    parser.add_argument(
+        "--stale-timeout", type=float, default=120,
+        help="через сколько секунд без отметки шард чужого воркера возвращается в очередь"
+    )
+    add_http_arguments(parser)
+    add_output_arguments(parser)
+    return parser.parse_args()
+
+
+async def make_plan(args: argparse.Namespace, queue: ShardQueue) -> None:
+    async with create_client(args.max_concurrent, http2=args.http2, compression=args.compression) as client:
+        parser = PositiveParserAPI(client=client, max_concurrent=args.max_concurrent)
+        await plan(parser, queue, n_shards=args.shards, by=args.by)
+
+
+def main(args: argparse.Namespace) -> None:
+    queue = ShardQueue(args.queue, args.output_dir)
+    if args.command == "plan":
+        asyncio.run(make_plan(args, queue))
+    elif args.command == "work":
+        run_local_workers(
+            queue,
+            args.processes,
+            stale_timeout=args.stale_timeout,
+            max_concurrent=args.max_concurrent,
+            adaptive=args.adaptive,
+            fast_validation=args.fast_validation,
+            http2=args.http2,
+            compression=args.compression,
+            stream_listings=args.stream_listings,
+        )
+        logger.info("Очередь шардов: %s", queue.status())
+    else:
+        merge_shards(queue, build_sinks(args), fast_validation=args.fast_validation)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main(parse_args())
@@ -0,0 +1,180 @@
+"""
+Сквозной бенчмарк обхода каталога на локальной замене API (benchmarks.mock_api).
+
+Для каждого сценария — только обход walk_categories или обход с выгрузкой —
+измеряются пропускная способность, p50/p99 задержки запросов со стороны клиента,
+процессорное время (без времени самого мока) и пиковый RSS. Каждый сценарий
+запускается в отдельном процессе, чтобы пиковая память не смешивалась.
+
+    python -m benchmarks.crawl --main 5 --children 4 --depth 2 --products-per-leaf 100
+    python -m benchmarks.crawl --scenarios walk jsonl --error-rate 0.02 --throttle-rate 0.01 --json result.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import httpx
+
+from app.metrics import MetricsRegistry
+from benchmarks.mock_api import MockPositivAPI
+
+SCENARIOS = ("walk", "excel", "excel-stream", "csv", "jsonl", "parquet")
+
+
+async def _walk_only(parser) -> None:
+    categories = await parser.get_categories()
+    categories_with_children = parser.make_categories_with_children(categories)
+    main_categories = [c for c in categories_with_children.values() if c.parent_id is None]
+
+    async def process_category(main_category):
+        async for _ in parser.walk_categories(main_category):
+            pass
+
+    await asyncio.gather(*(process_category(c) for c in main_categories))
+
+
+async def _export(scenario: str, parser, directory: Path) -> None:
+    from app.parsers.positiv.excel_writer import save_products_to_excel, stream_products_to_excel
+    from app.parsers.positiv.sinks import CsvSink, JsonLinesSink, ParquetSink, export_products
+
+    if scenario == "walk":
+        await _walk_only(parser)
+    elif scenario == "excel":
+        await save_products_to_excel(parser, filename=str(directory / "products.xlsx"))
+    elif scenario == "excel-stream":
+        await stream_products_to_excel(parser, filename=str(directory / "products.xlsx"))
+    elif scenario == "csv":
+        await export_products(parser, [CsvSink(directory / "products.csv")])
+    elif scenario == "jsonl":
+        await export_products(parser, [JsonLinesSink(directory / "products.jsonl.gz")])
+    elif scenario == "parquet":
+        await export_products(parser, [ParquetSink(directory / "products.parquet")])
+    else:
+        raise ValueError(f"Неизвестный сценарий {scenario}")
+
+
+async def _run(scenario: str, api: MockPositivAPI, parser_options: dict) -> dict:
+    from app.parsers.positiv.positiv import PositiveParserAPI
+
+    latencies = []
+
+    async def on_request(request: httpx.Request) -> None:
+        request.extensions["bench_started"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response) -> None:
+        latencies.append(time.perf_counter() - response.request.extensions["bench_started"])
+
+    hooks = {"request": [on_request], "response": [on_response]}
+    with TemporaryDirectory() as directory:
+        async with httpx.AsyncClient(transport=api.transport(), event_hooks=hooks) as client:
+            parser = PositiveParserAPI(client, **parser_options)
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            await _export(scenario, parser, Path(directory))
+            elapsed = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started - api.cpu_seconds
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "scenario": scenario,
+        "products": api.n_products,
+        "requests": len(latencies),
+        "responses": dict(api.served),
+        "elapsed_s": round(elapsed, 3),
+        "products_per_s": round(api.n_products / elapsed, 1),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(quantiles[49] * 1000, 2),
+        "latency_p99_ms": round(quantiles[98] * 1000, 2),
+        "cpu_s": round(cpu, 3),
+        "cpu_us_per_product": round(cpu / max(api.n_products, 1) * 1e6, 1),
+        "peak_rss_mb": round((MetricsRegistry.peak_rss_bytes() or 0) / 2 ** 20, 1),
+    }
+
+
+def run_scenario(scenario: str, api_options: dict, parser_options: dict, log: bool = False) -> dict:
+    """Точка входа дочернего процесса"""
+    logging.basicConfig(level=logging.WARNING)
+    if not log:
+        logging.disable(logging.CRITICAL)
+    return asyncio.run(_run(scenario, MockPositivAPI(**api_options), parser_options))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    arg_parser.add_argument("--main", type=int, default=5)
+    arg_parser.add_argument("--children", type=int, default=4)
+    arg_parser.add_argument("--depth", type=int, default=2)
+    arg_parser.add_argument("--products-per-leaf", type=int, default=50)
+    arg_parser.add_argument("--latency-ms", type=float, default=20, help="медиана задержки ответа")
+    arg_parser.add_argument("--latency-sigma", type=float, default=0.5, help="разброс (логнормальный)")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--throttle-rate", type=float, default=0.0)
+    arg_parser.add_argument("--attributes", type=int, default=5)
+    arg_parser.add_argument("--images", type=int, default=3)
+    arg_parser.add_argument("--description-size", type=int)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--max-concurrent", type=int, default=100)
+    arg_parser.add_argument("--adaptive", action="store_true")
+    arg_parser.add_argument("--fast-validation", action="store_true")
+    arg_parser.add_argument("--compact", action="store_true")
+    arg_parser.add_argument("--log", action="store_true", help="не отключать логирование парсера")
+    arg_parser.add_argument("--json", metavar="PATH", help="сохранить результаты в JSON")
+    args = arg_parser.parse_args()
+
+    api_options = {
+        "n_main": args.main,
+        "children_per_node": args.children,
+        "depth": args.depth,
+        "products_per_leaf": args.products_per_leaf,
+        "latency_median": args.latency_ms / 1000,
+        "latency_sigma": args.latency_sigma,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "n_attributes": args.attributes,
+        "n_images": args.images,
+        "description_size": args.description_size,
+        "seed": args.seed,
+    }
+    parser_options = {
+        "max_concurrent": args.max_concurrent,
+        "adaptive": args.adaptive,
+        "fast_validation": args.fast_validation,
+        "compact_records": args.compact,
+    }
+    api = MockPositivAPI(**api_options)
+    print(f"Каталог: {len(api.categories)} категорий, {api.n_leaves} листьев, {api.n_products} товаров")
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for scenario in args.scenarios:
+        # новый процесс на сценарий: ru_maxrss — пик за всё время жизни процесса
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                result = pool.submit(run_scenario, scenario, api_options, parser_options, args.log).result()
+            except ImportError as e:
+                print(f"{scenario:>13}: пропущен ({e})")
+                continue
+        results.append(result)
+        print(
+            f"{scenario:>13}: {result['elapsed_s']:7.2f} с, {result['products_per_s']:8.1f} товаров/с, "
+            f"p50 {result['latency_p50_ms']:6.1f} мс, p99 {result['latency_p99_ms']:6.1f} мс, "
+            f"CPU {result['cpu_us_per_product']:7.1f} мкс/товар, пик RSS {result['peak_rss_mb']:6.1f} МБ"
+        )
+
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps({"catalog": api_options, "parser": parser_options, "results": results}, indent=2),
+            encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Обход к сроку на локальной замене API: какая доля «ценности» каталога обновлена,
+если времени хватает только на часть обхода.
+
+Сначала полный обход без срока задаёт время T, затем обходы со сроком ``--budget * T``:
+``tree`` — листья в порядке дерева (как без планировщика), ``priority`` — по убыванию
+CategorySchema.priority. Ценность — сумма ``priority`` по товарам, карточки которых
+получены до срока, в процентах от суммы по всему каталогу.
+
+    python -m benchmarks.deadline --main 4 --children 4 --depth 2 --products-per-leaf 50 --budget 0.5
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.scheduler import CrawlScheduler
+from benchmarks.mock_api import MockPositivAPI
+
+MODES = {"tree": {}, "priority": {"priority": 1.0}}
+
+
+async def crawl(api: MockPositivAPI, max_concurrent: int, scheduler: CrawlScheduler | None) -> tuple[float, dict]:
+    """Время обхода и число полученных товаров по именам конечных категорий"""
+    fetched = {}
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        parser = PositiveParserAPI(client, max_concurrent=max_concurrent, scheduler=scheduler)
+        started = time.perf_counter()
+        categories = parser.make_categories_with_children(await parser.get_categories())
+
+        async def process_category(main_category):
+            async for _, name, products in parser.walk_categories(main_category):
+                fetched[name] = len(products)
+
+        await asyncio.gather(*(process_category(c) for c in categories.values() if c.parent_id is None))
+    return time.perf_counter() - started, fetched
+
+
+def value(api: MockPositivAPI, fetched: dict) -> float:
+    priority = {c["name"]: c["priority"] for c in api.categories}
+    return sum(priority[name] * n for name, n in fetched.items())
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--main", type=int, default=4)
+    arg_parser.add_argument("--children", type=int, default=4)
+    arg_parser.add_argument("--depth", type=int, default=2)
+    arg_parser.add_argument("--products-per-leaf", type=int, default=50)
+    arg_parser.add_argument("--latency-ms", type=float, default=20)
+    arg_parser.add_argument("--max-concurrent", type=int, default=20)
+    arg_parser.add_argument("--budget", type=float, nargs="+", default=[0.25, 0.5, 0.75], help="доли времени T")
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    def make_api() -> MockPositivAPI:
+        return MockPositivAPI(
+            n_main=args.main,
+            children_per_node=args.children,
+            depth=args.depth,
+            products_per_leaf=args.products_per_leaf,
+            latency_median=args.latency_ms / 1000,
+        )
+
+    api = make_api()
+    full_elapsed, fetched = asyncio.run(crawl(api, args.max_concurrent, None))
+    total_value = value(api, fetched)
+    print(f"полный обход: {full_elapsed:.2f} с, {sum(fetched.values())} товаров, {api.n_leaves} листьев")
+    for budget in args.budget:
+        for mode, weights in MODES.items():
+            api = make_api()
+            scheduler = CrawlScheduler(
+                weights=weights, deadline=datetime.now() + timedelta(seconds=budget * full_elapsed), reserve=0
+            )
+            elapsed, fetched = asyncio.run(crawl(api, args.max_concurrent, scheduler))
+            print(
+                f"срок {budget:4.0%} T, {mode:>8}: {elapsed:5.2f} с, товаров {sum(fetched.values()):6d}, "
+                f"ценность {value(api, fetched) / total_value:6.1%}, "
+                f"пропущено листьев {len(scheduler.skipped_categories):4d}, "
+                f"карточек {scheduler.skipped_products:6d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
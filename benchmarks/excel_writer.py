@@ -0,0 +1,87 @@
+"""
+Сравнение save_products_to_excel и stream_products_to_excel по памяти и скорости.
+
+    python -m benchmarks.excel_writer --products 50000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from app.parsers.positiv import excel_writer
+from app.schemas.positiv.category import CategorySchema
+from app.schemas.positiv.product import ProductSchema
+from benchmarks.synthetic import make_catalog, make_product_payload
+
+
+class FakeParser:
+    """Подменяет PositiveParserAPI: отдаёт синтетические товары без сети"""
+
+    def __init__(self, n_main: int, leaves_per_main: int, products_per_leaf: int):
+        self._raw_categories = make_catalog(n_main, leaves_per_main, depth=1)
+        self._products_per_leaf = products_per_leaf
+        self._counter = 0
+
+    async def get_categories(self) -> dict[str, CategorySchema]:
+        categories = (CategorySchema(**raw) for raw in self._raw_categories)
+        return {c.public_id: c for c in categories}
+
+    make_categories_with_children = staticmethod(
+        excel_writer.PositiveParserAPI.make_categories_with_children
+    )
+
+    async def walk_categories(self, category: CategorySchema, depth: int = 0):
+        if category.children:
+            yield depth, category.name, []
+            for inner in category.children:
+                async for node in self.walk_categories(inner, depth + 1):
+                    yield node
+        else:
+            raw_category = category.model_dump(mode="json", exclude={"children"})
+            products = []
+            for _ in range(self._products_per_leaf):
+                self._counter += 1
+                products.append(ProductSchema(**make_product_payload(self._counter, raw_category)))
+            await asyncio.sleep(0)
+            yield depth, category.name, products
+
+
+async def run(writer, parser: FakeParser, filename: str) -> tuple[float, int]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    await writer(parser, filename=filename)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--products", type=int, default=20000)
+    arg_parser.add_argument("--main", type=int, default=4)
+    arg_parser.add_argument("--leaves", type=int, default=10)
+    args = arg_parser.parse_args()
+    per_leaf = max(1, args.products // (args.main * args.leaves))
+
+    with TemporaryDirectory() as tmp:
+        # writers пишут относительно BASE_DIR, поэтому передаём абсолютный путь
+        for name, writer in (
+            ("in-memory", excel_writer.save_products_to_excel),
+            ("streaming", excel_writer.stream_products_to_excel),
+        ):
+            parser = FakeParser(args.main, args.leaves, per_leaf)
+            path = Path(tmp) / f"{name}.xlsx"
+            elapsed, peak = asyncio.run(run(writer, parser, str(path)))
+            total = args.main * args.leaves * per_leaf
+            print(
+                f"{name:>10}: {total} товаров, {elapsed:6.2f} c, "
+                f"{total / elapsed:8.0f} товаров/с, пик памяти {peak / 2**20:7.1f} MiB, "
+                f"файл {path.stat().st_size / 2**20:.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
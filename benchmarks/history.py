@@ -0,0 +1,87 @@
+"""
+История цен на синтетическом каталоге: ``--runs`` ежедневных запусков, в каждом у части
+товаров меняются цена и остаток, часть появляется и снимается с публикации. Меряются
+запись запуска, размер истории на диске и время отчётов за последние 30 дней и за всё время.
+
+    python -m benchmarks.history --products 100000 --runs 365
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from app.parsers.positiv.history import PRICE, Observation, PriceHistory
+
+CATEGORIES = [
+    f"Категория {main} > Категория {main}.{sub} > Категория {main}.{sub}.{leaf}"
+    for main in range(5) for sub in range(4) for leaf in range(4)
+]
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--products", type=int, default=100_000)
+    arg_parser.add_argument("--runs", type=int, default=365)
+    arg_parser.add_argument("--price-changes", type=float, default=0.02, help="доля товаров с новой ценой за запуск")
+    arg_parser.add_argument("--stock-changes", type=float, default=0.05, help="доля товаров с новым остатком")
+    arg_parser.add_argument("--churn", type=float, default=0.002, help="доля новых и снятых товаров")
+    args = arg_parser.parse_args()
+    rnd = random.Random(0)
+
+    products = {
+        f"prod-pub-{i}": Observation(
+            name=f"Товар {i}", category=CATEGORIES[i % len(CATEGORIES)],
+            price_minor=rnd.randint(10_000, 1_000_000), count=rnd.randint(0, 500), available=True,
+        )
+        for i in range(args.products)
+    }
+    next_id = args.products
+    started_at = datetime(2025, 1, 1, 3, 0)
+    record_seconds = []
+    with TemporaryDirectory() as tmp:
+        history = PriceHistory(Path(tmp))
+        for run in range(args.runs):
+            ids = list(products)
+            for public_id in rnd.sample(ids, int(len(ids) * args.price_changes)):
+                product = products[public_id]
+                products[public_id] = product._replace(price_minor=int(product.price_minor * rnd.uniform(0.8, 1.25)))
+            for public_id in rnd.sample(ids, int(len(ids) * args.stock_changes)):
+                count = rnd.randint(0, 500)
+                products[public_id] = products[public_id]._replace(count=count, available=count > 0)
+            for public_id in rnd.sample(ids, int(len(ids) * args.churn)):
+                del products[public_id]
+            for _ in range(int(len(ids) * args.churn)):
+                products[f"prod-pub-{next_id}"] = Observation(
+                    name=f"Товар {next_id}", category=rnd.choice(CATEGORIES),
+                    price_minor=rnd.randint(10_000, 1_000_000), count=rnd.randint(1, 500), available=True,
+                )
+                next_id += 1
+            started = time.perf_counter()
+            history.record_run(dict(products), at=started_at + timedelta(days=run))
+            record_seconds.append(time.perf_counter() - started)
+
+        size = sum(path.stat().st_size for path in Path(tmp).glob("run-*.seg"))
+        state = (Path(tmp) / PriceHistory.STATE).stat().st_size
+        print(
+            f"{args.runs} запусков по {args.products} товаров: запись запуска {sum(record_seconds) / len(record_seconds):.2f} с, "
+            f"история {size / 2 ** 20:.1f} МБ ({size / args.runs / 1024:.0f} КБ на запуск), состояние {state / 2 ** 20:.1f} МБ"
+        )
+        end = started_at + timedelta(days=args.runs)
+        for label, since in (("30 дней", end - timedelta(days=30)), ("всё время", None)):
+            for category in (None, "Категория 1 > Категория 1.2"):
+                started = time.perf_counter()
+                n = sum(1 for _ in history.changes(since=since, category=category, kinds=PRICE))
+                changes_s = time.perf_counter() - started
+                started = time.perf_counter()
+                history.top_movers(since=since, category=category, limit=20)
+                movers_s = time.perf_counter() - started
+                print(
+                    f"{label:>9}, {category or 'весь каталог':>27}: изменений цены {n:8d} за {changes_s:5.2f} с, "
+                    f"top-20 за {movers_s:5.2f} с"
+                )
+
+
+if __name__ == "__main__":
+    main()
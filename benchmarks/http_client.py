@@ -0,0 +1,254 @@
+"""
+Настройки HTTP-клиента на обходе через настоящий сокет: локальный HTTP/1.1-сервер
+в отдельном процессе отдаёт ответы benchmarks.mock_api (MockTransport соединений
+не открывает, и пул на нём не проявляется).
+
+Для каждого варианта клиента — запросов в секунду, процессорное время клиента на запрос
+и число открытых TCP-соединений. С ``--tls`` сервер работает по HTTPS с самоподписанным
+сертификатом (нужна утилита openssl), как настоящий API: каждое новое соединение стоит
+рукопожатия TLS. HTTP/2 (нужен пакет h2) сервер согласует через ALPN, поэтому вариант
+http2 имеет смысл только с ``--tls``.
+
+    python -m benchmarks.http_client --main 4 --children 4 --depth 2 --products-per-leaf 100 --tls
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import multiprocessing
+import ssl
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from importlib.util import find_spec
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import httpx
+
+from benchmarks.mock_api import MockPositivAPI
+
+VARIANTS = {
+    # прежний клиент: AsyncClient() по умолчанию и стандартный json
+    "default": {"factory": False, "decoder": "json"},
+    "pool": {"factory": True, "compression": ("identity",), "decoder": "json"},
+    "pool+orjson": {"factory": True, "compression": ("identity",), "decoder": "orjson"},
+    "pool+gzip": {"factory": True, "compression": ("gzip",), "decoder": "json"},
+    "http2": {"factory": True, "compression": ("identity",), "decoder": "json", "http2": True},
+}
+
+
+async def _respond(api: MockPositivAPI, path: str, accept_encoding: str, gzip_level: int):
+    """Статус, заголовки и тело ответа мока на GET ``path``"""
+    response = await api.handler(httpx.Request("GET", f"http://mock{path}"))
+    body = response.content
+    headers = [(name, response.headers[name]) for name in ("retry-after", "content-type") if name in response.headers]
+    if body and "gzip" in accept_encoding:
+        body = gzip.compress(body, compresslevel=gzip_level)
+        headers.append(("content-encoding", "gzip"))
+    return response.status_code, headers, body
+
+
+async def _handle_http1(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, respond) -> None:
+    while True:
+        head = await reader.readuntil(b"\r\n\r\n")
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        headers = {
+            name.strip().lower(): value.strip()
+            for name, _, value in (line.partition(":") for line in header_lines if line)
+        }
+        status, extra, body = await respond(request_line.split(" ")[1], headers.get("accept-encoding", ""))
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Length: {len(body)}\r\n".encode()
+            + "".join(f"{name}: {value}\r\n" for name, value in extra).encode() + b"\r\n" + body
+        )
+        await writer.drain()
+        if headers.get("connection", "").lower() == "close":
+            break
+
+
+async def _handle_http2(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, respond) -> None:
+    from h2.config import H2Configuration
+    from h2.connection import H2Connection
+    from h2.events import ConnectionTerminated, RequestReceived, WindowUpdated
+    from h2.exceptions import StreamClosedError
+
+    connection = H2Connection(H2Configuration(client_side=False, header_encoding="utf-8"))
+    connection.initiate_connection()
+    writer.write(connection.data_to_send())
+    window_updated = asyncio.Event()
+    streams = set()
+
+    async def reply(stream_id: int, headers: dict[str, str]) -> None:
+        status, extra, body = await respond(headers[":path"], headers.get("accept-encoding", ""))
+        try:
+            connection.send_headers(
+                stream_id, [(":status", str(status)), ("content-length", str(len(body))), *extra], end_stream=not body
+            )
+            while body:
+                size = min(connection.local_flow_control_window(stream_id), connection.max_outbound_frame_size)
+                if size <= 0:
+                    window_updated.clear()
+                    writer.write(connection.data_to_send())
+                    await window_updated.wait()
+                    continue
+                connection.send_data(stream_id, body[:size], end_stream=size >= len(body))
+                body = body[size:]
+        except StreamClosedError:
+            pass
+        writer.write(connection.data_to_send())
+
+    while data := await reader.read(65536):
+        for event in connection.receive_data(data):
+            if isinstance(event, RequestReceived):
+                stream = asyncio.create_task(reply(event.stream_id, dict(event.headers)))
+                streams.add(stream)
+                stream.add_done_callback(streams.discard)
+            elif isinstance(event, WindowUpdated):
+                window_updated.set()
+            elif isinstance(event, ConnectionTerminated):
+                return
+        writer.write(connection.data_to_send())
+
+
+async def _serve(api: MockPositivAPI, connection, gzip_level: int, cert: str | None) -> None:
+    connections = 0
+
+    async def respond(path: str, accept_encoding: str):
+        if path == "/_connections":
+            return 200, [], str(connections).encode()
+        return await _respond(api, path, accept_encoding, gzip_level)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        nonlocal connections
+        connections += 1
+        ssl_object = writer.get_extra_info("ssl_object")
+        protocol = ssl_object.selected_alpn_protocol() if ssl_object else None
+        try:
+            if protocol == "h2":
+                await _handle_http2(reader, writer, respond)
+            else:
+                await _handle_http1(reader, writer, respond)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    context = None
+    if cert:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert)
+        context.set_alpn_protocols(["h2", "http/1.1"] if find_spec("h2") else ["http/1.1"])
+    server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=1024, ssl=context)
+    connection.send(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def run_server(api_options: dict, connection, gzip_level: int = 1, cert: str | None = None) -> None:
+    asyncio.run(_serve(MockPositivAPI(**api_options), connection, gzip_level, cert))
+
+
+def make_certificate(directory: Path) -> str:
+    """Самоподписанный сертификат и ключ в одном PEM-файле"""
+    path = directory / "server.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-keyout", str(path), "-out", str(path)],
+        check=True, capture_output=True,
+    )
+    return str(path)
+
+
+async def _crawl(base_url: str, variant: dict, max_concurrent: int) -> dict:
+    from app.metrics import metrics
+    from app.parsers.positiv import positiv
+    from app.parsers.positiv.http_client import create_client
+    from benchmarks.crawl import _walk_only
+
+    if variant["decoder"] == "json":
+        positiv.json_loads = json.loads
+    # сертификат самоподписанный: проверка отключена, само шифрование остаётся
+    if variant["factory"]:
+        client = create_client(
+            max_concurrent, http2=variant.get("http2", False), compression=variant["compression"], verify=False
+        )
+    else:
+        client = httpx.AsyncClient(verify=False)
+    async with client:
+        parser = positiv.PositiveParserAPI(client, max_concurrent=max_concurrent)
+        parser.BASE_URL = f"{base_url}/api/v1"
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        await _walk_only(parser)
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+    requests = sum(metrics.summary()["counters"].get("http_requests_total", {}).values())
+    return {"elapsed_s": elapsed, "cpu_s": cpu, "requests": requests}
+
+
+def run_variant(base_url: str, variant: dict, max_concurrent: int) -> dict:
+    """Точка входа дочернего процесса клиента"""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    return asyncio.run(_crawl(base_url, variant, max_concurrent))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    arg_parser.add_argument("--main", type=int, default=4)
+    arg_parser.add_argument("--children", type=int, default=4)
+    arg_parser.add_argument("--depth", type=int, default=2)
+    arg_parser.add_argument("--products-per-leaf", type=int, default=100)
+    arg_parser.add_argument("--latency-ms", type=float, default=2)
+    arg_parser.add_argument("--max-concurrent", type=int, default=100)
+    arg_parser.add_argument("--gzip-level", type=int, default=1)
+    arg_parser.add_argument("--tls", action="store_true", help="HTTPS с самоподписанным сертификатом")
+    args = arg_parser.parse_args()
+
+    api_options = {
+        "n_main": args.main,
+        "children_per_node": args.children,
+        "depth": args.depth,
+        "products_per_leaf": args.products_per_leaf,
+        "latency_median": args.latency_ms / 1000,
+    }
+    context = multiprocessing.get_context("spawn")
+    tmp = TemporaryDirectory()
+    cert = make_certificate(Path(tmp.name)) if args.tls else None
+    scheme = "https" if args.tls else "http"
+    for name in args.variants:
+        variant = VARIANTS[name]
+        if variant["decoder"] == "orjson" and find_spec("orjson") is None:
+            print(f"{name:>12}: пропущен (не установлен orjson)")
+            continue
+        if variant.get("http2") and (find_spec("h2") is None or not args.tls):
+            print(f"{name:>12}: пропущен (нужны пакет h2 и --tls)")
+            continue
+        # свой сервер на вариант: счётчик соединений и кэши начинаются с нуля
+        receiver, sender = context.Pipe(duplex=False)
+        server = context.Process(
+            target=run_server, args=(api_options, sender, args.gzip_level, cert), daemon=True
+        )
+        server.start()
+        base_url = f"{scheme}://127.0.0.1:{receiver.recv()}"
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_variant, base_url, variant, args.max_concurrent).result()
+            connections = httpx.get(f"{base_url}/_connections", verify=False).text
+        finally:
+            server.terminate()
+            server.join()
+        print(
+            f"{name:>12}: {result['requests'] / result['elapsed_s']:7.1f} запросов/с, "
+            f"CPU клиента {result['cpu_s'] / result['requests'] * 1e6:6.0f} мкс/запрос, "
+            f"TCP-соединений {int(connections) - 1:5d}, {result['elapsed_s']:6.2f} с"
+        )
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Загрузка изображений (ImageFetcher) вместе с обходом на локальной замене API.
+
+Сценарии на одном каталоге изображений:
+
+- ``без изображений`` — только обход, для сравнения времени;
+- ``первый запуск`` — пустой каталог: все изображения скачиваются, главное фото товара
+  совпадает с первым фото галереи и хранится один раз;
+- ``повторный`` — тот же каталог: условные запросы, 304 без тела;
+- ``прерван`` / ``продолжен`` — новый каталог, обход обрывается через половину времени
+  первого запуска, затем продолжается с ``resume=True``.
+
+    python -m benchmarks.images --main 5 --children 4 --depth 2 --products-per-leaf 20
+"""
+import argparse
+import asyncio
+import logging
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import httpx
+
+from app.parsers.positiv.images import ImageStore
+from app.parsers.positiv.positiv import PositiveParserAPI
+from benchmarks.mock_api import MockPositivAPI
+
+
+async def crawl(
+        api: MockPositivAPI,
+        max_concurrent: int,
+        images: ImageStore | None,
+        image_workers: int,
+        timeout: float | None = None,
+) -> tuple[float, dict | None]:
+    """Время обхода с дозагрузкой изображений и отчёт ImageFetcher; timeout обрывает запуск"""
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        parser = PositiveParserAPI(client, max_concurrent=max_concurrent, images=images, image_workers=image_workers)
+        started = time.perf_counter()
+
+        async def run() -> dict | None:
+            categories = parser.make_categories_with_children(await parser.get_categories())
+
+            async def process_category(main_category):
+                async for _ in parser.walk_categories(main_category):
+                    pass
+
+            await asyncio.gather(*(process_category(c) for c in categories.values() if c.parent_id is None))
+            return await parser.images.close() if parser.images else None
+
+        try:
+            report = await asyncio.wait_for(run(), timeout)
+        except TimeoutError:
+            report = await parser.images.close(drain=False)
+    return time.perf_counter() - started, report
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--main", type=int, default=5)
+    arg_parser.add_argument("--children", type=int, default=4)
+    arg_parser.add_argument("--depth", type=int, default=2)
+    arg_parser.add_argument("--products-per-leaf", type=int, default=20)
+    arg_parser.add_argument("--images", type=int, default=3, help="фото в галерее товара")
+    arg_parser.add_argument("--image-size", type=int, default=20_000)
+    arg_parser.add_argument("--latency-ms", type=float, default=20)
+    arg_parser.add_argument("--max-concurrent", type=int, default=50)
+    arg_parser.add_argument("--image-workers", type=int, default=8)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    def make_api() -> MockPositivAPI:
+        return MockPositivAPI(
+            n_main=args.main,
+            children_per_node=args.children,
+            depth=args.depth,
+            products_per_leaf=args.products_per_leaf,
+            n_images=args.images,
+            image_size=args.image_size,
+            latency_median=args.latency_ms / 1000,
+        )
+
+    def run(name: str, directory: Path | None, resume: bool = False, timeout: float | None = None) -> float:
+        store = ImageStore(directory, resume=resume) if directory else None
+        try:
+            elapsed, report = asyncio.run(crawl(make_api(), args.max_concurrent, store, args.image_workers, timeout))
+        finally:
+            if store:
+                store.close()
+        if report is None:
+            print(f"{name:>16}: {elapsed:6.2f} с")
+        else:
+            files = sum(1 for path in directory.glob("objects/*/*") if path.suffix != ".tmp")
+            print(
+                f"{name:>16}: {elapsed:6.2f} с, адресов {report['urls']:5d}, запросов {report['requests']:5d}, "
+                f"новых файлов {report['downloaded']:5d}, совпали {report['deduplicated']:5d}, "
+                f"304 {report['not_modified']:5d}, продолжено {report['resumed']:5d}, "
+                f"{report['bytes'] / 2 ** 20:6.1f} MiB, {report['urls_per_second']:7.1f} адр./с; файлов на диске {files}"
+            )
+        return elapsed
+
+    api = make_api()
+    urls = api.n_products * (args.images + 1)
+    print(
+        f"Каталог: {api.n_products} товаров, {urls} адресов изображений; без дедупликации и условных "
+        f"запросов каждый запуск скачивал бы {urls * args.image_size / 2 ** 20:.1f} MiB"
+    )
+    with TemporaryDirectory() as tmp:
+        run("без изображений", None)
+        cold = run("первый запуск", Path(tmp) / "warm")
+        run("повторный", Path(tmp) / "warm")
+        run("прерван", Path(tmp) / "resume", timeout=cold / 2)
+        run("продолжен", Path(tmp) / "resume", resume=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Потоковый разбор листинга (``stream_listings``) против разбора тела целиком на одной большой
+категории локальной замены API, которая отдаёт листинг со скоростью ``--bandwidth``.
+
+Для каждого режима:
+
+- только листинг: время до первого товара и до конца, пик памяти Python (tracemalloc,
+  отдельным прогоном) при переборе товаров без накопления;
+- обход с карточками: время до первого запроса карточки и общее время;
+- проверка на зависание: небольшой обход при ``max_concurrent=1`` и с адаптивным лимитом
+  под 30% ответов 429, где лимит опускается до числа обработчиков листингов. Обход должен
+  завершиться за ``--check-timeout`` секунд в обоих режимах.
+
+    python -m benchmarks.listing_stream --products 20000 --bandwidth 4
+"""
+import argparse
+import asyncio
+import logging
+import time
+import tracemalloc
+
+import httpx
+
+from app.parsers.positiv.positiv import PositiveParserAPI
+from benchmarks.mock_api import MockPositivAPI
+
+MODES = {"целиком": False, "потоком": True}
+
+
+async def listing(api: MockPositivAPI, stream: bool) -> tuple[float, float, int]:
+    """(время до первого товара, время листинга, товаров)"""
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        parser = PositiveParserAPI(client, stream_listings=stream)
+        leaf = api._leaves[0]
+        started = time.perf_counter()
+        first = None
+        count = 0
+        async for _ in parser.iter_products_by_category(leaf):
+            if first is None:
+                first = time.perf_counter() - started
+            count += 1
+        return first, time.perf_counter() - started, count
+
+
+async def crawl(api: MockPositivAPI, stream: bool, max_concurrent: int) -> tuple[float, float, int]:
+    """(время до первого запроса карточки, время обхода, товаров)"""
+    first_detail = None
+    started = time.perf_counter()
+
+    async def on_request(request: httpx.Request) -> None:
+        nonlocal first_detail
+        if first_detail is None and "/product/prod-pub-" in request.url.path:
+            first_detail = time.perf_counter() - started
+
+    async with httpx.AsyncClient(transport=api.transport(), event_hooks={"request": [on_request]}) as client:
+        parser = PositiveParserAPI(client, max_concurrent=max_concurrent, stream_listings=stream)
+        categories = parser.make_categories_with_children(await parser.get_categories())
+        count = 0
+        for main_category in (c for c in categories.values() if c.parent_id is None):
+            async for _, _, products in parser.walk_categories(main_category):
+                count += len(products)
+    return first_detail, time.perf_counter() - started, count
+
+
+async def check(api: MockPositivAPI, stream: bool, timeout: float, **options) -> tuple[float | None, int]:
+    """(время обхода или None, если обход не завершился за timeout; товаров)"""
+    count = 0
+
+    async def run() -> None:
+        nonlocal count
+        async with httpx.AsyncClient(transport=api.transport()) as client:
+            parser = PositiveParserAPI(client, stream_listings=stream, **options)
+            categories = parser.make_categories_with_children(await parser.get_categories())
+            for main_category in (c for c in categories.values() if c.parent_id is None):
+                async for _, _, products in parser.walk_categories(main_category):
+                    count += len(products)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(run(), timeout)
+    except TimeoutError:
+        return None, count
+    return time.perf_counter() - started, count
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--products", type=int, default=20_000, help="товаров в категории")
+    arg_parser.add_argument("--bandwidth", type=float, default=4, help="скорость отдачи листинга, МБ/с")
+    arg_parser.add_argument("--latency-ms", type=float, default=20)
+    arg_parser.add_argument("--max-concurrent", type=int, default=100)
+    arg_parser.add_argument("--check-timeout", type=float, default=60)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    def make_api() -> MockPositivAPI:
+        return MockPositivAPI(
+            n_main=1,
+            children_per_node=1,
+            depth=1,
+            products_per_leaf=args.products,
+            latency_median=args.latency_ms / 1000,
+            listing_bandwidth=args.bandwidth * 2 ** 20,
+        )
+
+    for mode, stream in MODES.items():
+        first, elapsed, count = asyncio.run(listing(make_api(), stream))
+        tracemalloc.start()
+        asyncio.run(listing(make_api(), stream))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"листинг {mode:>8}: {count} товаров, первый через {first:5.2f} с, весь за {elapsed:5.2f} с, "
+            f"пик памяти {peak / 2 ** 20:6.1f} MiB"
+        )
+    for mode, stream in MODES.items():
+        first_detail, elapsed, count = asyncio.run(crawl(make_api(), stream, args.max_concurrent))
+        print(f"обход   {mode:>8}: {count} товаров, первая карточка через {first_detail:5.2f} с, обход за {elapsed:5.2f} с")
+
+    checks = {
+        "max_concurrent=1": ({}, {"max_concurrent": 1}),
+        "429 и adaptive": ({"throttle_rate": 0.3, "retry_after": 0.05}, {"max_concurrent": 16, "adaptive": True}),
+    }
+    for name, (api_options, parser_options) in checks.items():
+        for mode, stream in MODES.items():
+            api = MockPositivAPI(
+                n_main=2,
+                children_per_node=2,
+                depth=2,
+                products_per_leaf=60,
+                latency_median=0.002,
+                listing_bandwidth=args.bandwidth * 2 ** 20,
+                listing_chunk_size=4096,
+                **api_options,
+            )
+            elapsed, count = asyncio.run(check(api, stream, args.check_timeout, **parser_options))
+            result = f"за {elapsed:5.2f} с" if elapsed is not None else f"НЕ ЗАВЕРШЁН за {args.check_timeout:.0f} с"
+            print(f"{name:>16} {mode:>8}: {count} из {api.n_products} товаров {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Доля времени обхода, которая уходит на логирование, на локальной замене API.
+
+Режимы: ``off`` — логирование отключено (база), ``sync`` — прежняя настройка
+(StreamHandler и FileHandler прямо на корневом логгере, строка INFO на каждый товар),
+``queue`` — setup_logging: очередь, поток записи, ограничение повторов. Вывод консоли
+в обоих случаях идёт в файл, чтобы не мерить скорость терминала.
+
+    python -m benchmarks.log_overhead --main 4 --children 4 --depth 2 --products-per-leaf 100
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from app.logging_config import FORMAT, DATE_FORMAT, setup_logging, stop_logging
+from app.metrics import metrics
+from benchmarks.crawl import _run
+from benchmarks.mock_api import MockPositivAPI
+
+MODES = ("off", "sync", "queue")
+MEDIAN_KEYS = ("elapsed_s", "cpu_s", "log_lines", "handler_s", "drain_s")
+
+
+def _setup_sync(directory: Path) -> None:
+    """Настройка логирования до перехода на очередь"""
+    formatter = logging.Formatter(FORMAT, datefmt=DATE_FORMAT)
+    console_handler = logging.StreamHandler(open(directory / "console.log", "w", encoding="utf-8"))
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    file_handler = logging.FileHandler(directory / "errors.log", encoding="utf-8")
+    file_handler.setLevel(logging.WARNING)
+    file_handler.setFormatter(formatter)
+    logging.basicConfig(level=logging.INFO, handlers=[console_handler, file_handler], force=True)
+    # раньше строка "Получение всех данных о товаре" писалась на INFO для каждого товара
+    logging.getLogger("app.parsers.positiv.positiv").setLevel(logging.DEBUG)
+
+
+def run_mode(mode: str, api_options: dict, parser_options: dict) -> dict:
+    """Точка входа дочернего процесса"""
+    with TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        if mode == "off":
+            logging.disable(logging.CRITICAL)
+        elif mode == "sync":
+            _setup_sync(directory)
+        else:
+            sys.stderr = open(directory / "console.log", "w", encoding="utf-8")
+            setup_logging(log_file=str(directory / "errors.log"))
+        result = asyncio.run(_run("walk", MockPositivAPI(**api_options), parser_options))
+        started = time.perf_counter()
+        stop_logging()
+        logging.shutdown()
+        result["drain_s"] = round(time.perf_counter() - started, 3)
+        result["log_lines"] = sum(
+            1 for path in directory.glob("*.log") for _ in open(path, encoding="utf-8")
+        )
+        result["handler_s"] = round(
+            metrics.summary()["counters"].get("log_handler_seconds_total", {}).get("total", 0), 3
+        )
+    return result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    arg_parser.add_argument("--main", type=int, default=4)
+    arg_parser.add_argument("--children", type=int, default=4)
+    arg_parser.add_argument("--depth", type=int, default=2)
+    arg_parser.add_argument("--products-per-leaf", type=int, default=100)
+    arg_parser.add_argument("--latency-ms", type=float, default=5)
+    arg_parser.add_argument("--error-rate", type=float, default=0.02)
+    arg_parser.add_argument("--max-concurrent", type=int, default=100)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="прогонов каждого режима, берётся медиана")
+    args = arg_parser.parse_args()
+
+    api_options = {
+        "n_main": args.main,
+        "children_per_node": args.children,
+        "depth": args.depth,
+        "products_per_leaf": args.products_per_leaf,
+        "latency_median": args.latency_ms / 1000,
+        "error_rate": args.error_rate,
+    }
+    parser_options = {"max_concurrent": args.max_concurrent}
+
+    runs = {mode: [] for mode in args.modes}
+    context = multiprocessing.get_context("spawn")
+    # режимы чередуются, чтобы фоновая нагрузка машины не досталась одному из них
+    for _ in range(args.repeat):
+        for mode in args.modes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs[mode].append(pool.submit(run_mode, mode, api_options, parser_options).result())
+    results = {
+        mode: {key: statistics.median(run[key] for run in mode_runs) for key in MEDIAN_KEYS}
+        for mode, mode_runs in runs.items()
+    }
+    base = results.get("off")
+    for mode, result in results.items():
+        share = (result["elapsed_s"] - base["elapsed_s"]) / result["elapsed_s"] if base else None
+        cpu_share = (result["cpu_s"] - base["cpu_s"]) / result["cpu_s"] if base else None
+        print(
+            f"{mode:>6}: {result['elapsed_s']:6.2f} с, CPU {result['cpu_s']:6.2f} с, "
+            f"строк лога {result['log_lines']:7.0f}, в обработчике {result['handler_s']:5.3f} с, "
+            f"дозапись {result['drain_s']:5.3f} с"
+            + (f", доля времени {share:6.1%}, доля CPU {cpu_share:6.1%}" if base and mode != "off" else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Справочный сервис цен (app.lookup) на синтетическом снимке.
+
+Сначала — задержка запросов к индексу в процессе (без HTTP), затем нагрузка по HTTP:
+``--clients`` процессов с keep-alive соединениями ``--duration`` секунд шлют смесь
+запросов. Пропускная способность одного ядра — запросов на секунду процессорного
+времени сервера (клиенты на той же машине делят с ним процессор, поэтому запросов/с
+по часам — оценка снизу). Второй прогон той же длины — с перезагрузкой снимка через
+POST /reload посередине: запросы во время подмены не должны падать.
+
+    python -m benchmarks.lookup --products 100000 --clients 4 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from urllib.parse import parse_qs, quote, urlsplit
+
+from app.lookup import LookupService
+from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.sinks import JsonLinesSink
+from app.price_index import PriceIndex
+from app.schemas.positiv.category import CategorySchema
+from app.schemas.positiv.record import ProductRecord
+from benchmarks.matching import make_catalog as make_items
+from benchmarks.synthetic import make_catalog as make_categories
+
+KINDS = ("public_id", "code", "vendorCode", "category", "prefix")
+
+
+def write_snapshot(path: Path, n_products: int) -> None:
+    """Выгрузка JSON Lines в формате JsonLinesSink: товары поровну по листьям дерева"""
+    categories = PositiveParserAPI.make_categories_with_children(
+        {c["public_id"]: CategorySchema(**c) for c in make_categories(5, 4, 2)}
+    )
+    main_categories = [c for c in categories.values() if c.parent_id is None]
+    n_leaves = sum(1 for c in categories.values() if not c.children)
+    items = iter(make_items(n_products, random.Random(0)))
+    per_leaf = -(-n_products // n_leaves)
+    sink = JsonLinesSink(path)
+    sink.open(main_categories)
+    for main_category in main_categories:
+        stack = [(0, main_category)]
+        while stack:
+            depth, node = stack.pop()
+            stack.extend((depth + 1, child) for child in reversed(node.children))
+            products = [] if node.children else [
+                ProductRecord(
+                    public_id=item.public_id, name=item.name, vendorCode=item.vendorCode, code=item.code,
+                    price=f"{item.price_minor / 100:.2f}", count=item.price_minor % 50, currency="RUB",
+                )
+                for item in (next(items, None) for _ in range(per_leaf)) if item is not None
+            ]
+            sink.write(main_category, depth, node.name, products)
+    sink.close()
+
+
+def make_queries(index: PriceIndex, n: int, rnd: random.Random) -> list[tuple[str, str]]:
+    """(вид, путь запроса) по случайным товарам снимка"""
+    queries = []
+    for i in rnd.sample(range(len(index)), n):
+        record = json.loads(index.by_public_id(f"prod-pub-{i}"))
+        kind = rnd.choice(KINDS)
+        if kind == "public_id":
+            path = f"/products/{record['public_id']}"
+        elif kind == "code":
+            path = f"/products?code={record['code']}"
+        elif kind == "vendorCode":
+            path = f"/products?vendorCode={record['vendorCode']}"
+        elif kind == "category":
+            path = f"/products?category={quote(record['category_path'])}&limit=20"
+        else:
+            path = f"/products?prefix={quote(' '.join(record['name'].split()[:2]))}&limit=20"
+        queries.append((kind, path))
+    return queries
+
+
+def run_server(snapshot: str, connection) -> None:
+    """Точка входа процесса сервера: на каждое сообщение отвечает своим процессорным временем"""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    service = LookupService(snapshot)
+    server = service.serve(0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection.send(server.server_address[1])
+    while connection.recv():
+        connection.send(time.process_time())
+
+
+def run_client(port: int, queries: list[tuple[str, str]], duration: float) -> dict:
+    """Точка входа процесса клиента"""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        _, path = queries[i % len(queries)]
+        i += 1
+        started = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        errors += response.status != 200
+    conn.close()
+    return {"latencies": latencies, "errors": errors}
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--products", type=int, default=100_000)
+    arg_parser.add_argument("--queries", type=int, default=20_000)
+    arg_parser.add_argument("--clients", type=int, default=4)
+    arg_parser.add_argument("--duration", type=float, default=10)
+    args = arg_parser.parse_args()
+    rnd = random.Random(1)
+
+    with TemporaryDirectory() as tmp:
+        snapshot = Path(tmp) / "positiv_products.jsonl.gz"
+        write_snapshot(snapshot, args.products)
+        service = LookupService(snapshot)
+        index = service.index
+        print(f"снимок: {len(index)} товаров, загрузка {index.info.load_seconds:.2f} с")
+
+        queries = make_queries(index, args.queries, rnd)
+        timings = {kind: [] for kind in KINDS}
+        for kind, path in queries:
+            url = urlsplit(path)
+            started = time.perf_counter_ns()
+            status, _ = service.query(url.path, parse_qs(url.query))
+            timings[kind].append(time.perf_counter_ns() - started)
+            assert status == 200, path
+        for kind, values in timings.items():
+            quantiles = statistics.quantiles(values, n=100)
+            print(f"{kind:>10}: медиана {quantiles[49] / 1000:6.1f} мкс, p99 {quantiles[98] / 1000:6.1f} мкс")
+
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe()
+        server = context.Process(target=run_server, args=(str(snapshot), sender), daemon=True)
+        server.start()
+        port = receiver.recv()
+
+        def server_cpu() -> float:
+            receiver.send(True)
+            return receiver.recv()
+
+        with ProcessPoolExecutor(max_workers=args.clients, mp_context=context) as pool:
+            for reload in (False, True):
+                cpu_started = server_cpu()
+                started = time.perf_counter()
+                futures = [
+                    pool.submit(run_client, port, rnd.sample(queries, len(queries)), args.duration)
+                    for _ in range(args.clients)
+                ]
+                reload_status = None
+                if reload:
+                    # подмена снимка под нагрузкой
+                    time.sleep(args.duration / 2)
+                    snapshot.touch()
+                    conn = http.client.HTTPConnection("127.0.0.1", port)
+                    conn.request("POST", "/reload")
+                    reload_status = conn.getresponse().status
+                    conn.close()
+                results = [future.result() for future in futures]
+                elapsed = time.perf_counter() - started
+                cpu = server_cpu() - cpu_started
+                report(args.clients, results, elapsed, cpu, reload_status)
+        receiver.send(False)
+        server.join()
+
+
+def report(clients: int, results: list[dict], elapsed: float, cpu: float, reload_status: int | None) -> None:
+    latencies = [value for result in results for value in result["latencies"]]
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"HTTP, {clients} клиентов{', с перезагрузкой' if reload_status else ''}: "
+        f"{len(latencies) / elapsed:6.0f} запросов/с, {len(latencies) / cpu:6.0f} на секунду CPU сервера, "
+        f"медиана {quantiles[49] * 1000:5.2f} мс, p99 {quantiles[98] * 1000:6.2f} мс, "
+        f"максимум {max(latencies) * 1000:7.1f} мс, ошибок {sum(result['errors'] for result in results)}"
+        + (f", POST /reload: HTTP {reload_status}" if reload_status else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
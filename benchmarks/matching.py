@@ -0,0 +1,106 @@
+"""
+Сопоставление товаров: построение индекса, загрузка с диска, задержка top-k запросов
+и точность на синтетическом каталоге; для сравнения — перебор всех пар на части запросов.
+
+    python -m benchmarks.matching --catalog 100000 --queries 5000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.matching import CatalogItem, ProductMatcher, name_features, normalize_name
+
+KINDS = [
+    "Перфоратор", "Дрель ударная", "Шуруповёрт аккумуляторный", "Болгарка", "Лобзик электрический",
+    "Кабель ВВГнг", "Автоматический выключатель", "Розетка двойная", "Светильник светодиодный", "Удлинитель",
+    "Сверло по металлу", "Бур SDS-plus", "Круг отрезной", "Саморез по дереву", "Дюбель распорный",
+]
+BRANDS = ["Bosch", "Makita", "DeWalt", "Metabo", "ЗУБР", "Интерскол", "IEK", "Schneider Electric", "ЭРА", "Gauss"]
+SPECS = ["800 Вт", "18 В", "3x2.5", "16А", "230 мм", "6x100", "IP44", "4000K", "2 м", "5 шт"]
+NOISE = ["новинка", "оригинал", "в кейсе", "с доставкой", "черный", "профессиональный"]
+
+
+def make_catalog(n: int, rnd: random.Random) -> list[CatalogItem]:
+    items = []
+    for i in range(n):
+        model = f"{rnd.choice('ABCDEFGHKLMPRSTX')}{rnd.choice('ABCDEFGHKLMPRSTX')}-{rnd.randint(10, 9999)}"
+        name = f"{rnd.choice(KINDS)} {rnd.choice(BRANDS)} {model} {rnd.choice(SPECS)} {rnd.choice(SPECS)}"
+        items.append(CatalogItem(f"prod-pub-{i}", name, f"VC-{i:07d}", f"{i:08d}", 10_000 + i % 900_000))
+    return items
+
+
+def shop_title(item: CatalogItem, rnd: random.Random) -> str:
+    """Название того же товара в магазине: другой порядок слов, лишние слова, опечатка"""
+    words = item.name.split()
+    rnd.shuffle(words)
+    words.insert(rnd.randrange(len(words) + 1), rnd.choice(NOISE))
+    if rnd.random() < 0.3:
+        i = rnd.randrange(len(words))
+        if len(words[i]) > 4:
+            j = rnd.randrange(1, len(words[i]) - 1)
+            words[i] = words[i][:j] + words[i][j + 1:]
+    return " ".join(words)
+
+
+def brute_force(items_features: list[set[str]], query: str) -> int:
+    features = name_features(normalize_name(query))
+    return max(
+        range(len(items_features)),
+        key=lambda i: len(features & items_features[i]) / (len(features | items_features[i]) or 1)
+    )
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--catalog", type=int, default=100_000)
+    arg_parser.add_argument("--queries", type=int, default=5_000)
+    arg_parser.add_argument("--brute-force", type=int, default=50, help="запросов для перебора всех пар")
+    arg_parser.add_argument("-k", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    rnd = random.Random(0)
+    items = make_catalog(args.catalog, rnd)
+    targets = [rnd.randrange(len(items)) for _ in range(args.queries)]
+    queries = [shop_title(items[i], rnd) for i in targets]
+
+    started = time.perf_counter()
+    matcher = ProductMatcher.build(items)
+    print(f"построение индекса: {time.perf_counter() - started:.1f} с на {len(items)} товаров")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "catalog.index"
+        matcher.save(path)
+        started = time.perf_counter()
+        matcher = ProductMatcher.load(path)
+        print(f"загрузка с диска: {time.perf_counter() - started:.2f} с, {path.stat().st_size / 2**20:.1f} МБ")
+
+    latencies = []
+    hits = 0
+    for target, query in zip(targets, queries):
+        started = time.perf_counter()
+        found = matcher.query(query, k=args.k)
+        latencies.append(time.perf_counter() - started)
+        hits += bool(found) and found[0].item.public_id == items[target].public_id
+    latencies.sort()
+    print(
+        f"top-{args.k} запрос: медиана {statistics.median(latencies) * 1e3:.3f} мс, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.3f} мс, точность@1 {hits / len(queries):.1%}"
+    )
+    code_queries = [f"{items[i].name.split()[0]} {items[i].vendorCode}" for i in targets[:1000]]
+    started = time.perf_counter()
+    for query in code_queries:
+        matcher.query(query, k=args.k)
+    print(f"запрос с артикулом: {(time.perf_counter() - started) / len(code_queries) * 1e3:.3f} мс")
+
+    items_features = [name_features(normalize_name(item.name)) for item in items]
+    started = time.perf_counter()
+    for query in queries[:args.brute_force]:
+        brute_force(items_features, query)
+    per_query = (time.perf_counter() - started) / args.brute_force
+    print(f"перебор всех пар: {per_query * 1e3:.1f} мс на запрос")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Локальная замена API positive.ooo для бенчмарков: обработчик для httpx.MockTransport.
+
+Каталог строится из синтетических данных в формате CategorySchema/ProductSchema,
+ответы генерируются по запросу (в памяти держатся только категории, товары
+нумеруются по листьям подряд). Задержка ответа — логнормальная, часть ответов можно сделать
+ошибками 500 или троттлингом 429 с Retry-After.
+
+    api = MockPositivAPI(n_main=5, children_per_node=4, depth=2, products_per_leaf=50)
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        parser = PositiveParserAPI(client)
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+
+from benchmarks.synthetic import make_catalog, make_product_payload, make_short_product_payload
+
+_LISTING_RE = re.compile(r"/product/get-by-category/([^/]+)$")
+_PRODUCT_RE = re.compile(r"/product/prod-pub-(\d+)$")
+_IMAGE_RE = re.compile(r"/img/(\d+)(?:_(\d+))?\.jpg$")
+
+
+@dataclass
+class MockPositivAPI:
+    n_main: int = 5
+    children_per_node: int = 4
+    depth: int = 2
+    products_per_leaf: int = 50
+    # медиана и разброс (sigma логнормального распределения) задержки ответа, секунды
+    latency_median: float = 0.02
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 0.2
+    n_attributes: int = 5
+    n_images: int = 3
+    # длина описания товара в символах; None — как в synthetic
+    description_size: int | None = None
+    # размер изображения с cdn.positive.ooo/img/, байт; главное фото (imageUrl) повторяет первое фото галереи
+    image_size: int = 20_000
+    # номер версии изображений: смена делает все ETag и содержимое новыми
+    image_version: int = 0
+    # скорость отдачи листинга, байт/с: тело генерируется и отдаётся кусками по мере «передачи»;
+    # None — листинг целиком одним ответом
+    listing_bandwidth: float | None = None
+    listing_chunk_size: int = 64 * 1024
+    seed: int = 0
+
+    served: Counter = field(default_factory=Counter, init=False)
+    # процессорное время самого мока: вычитается из замеров парсера
+    cpu_seconds: float = field(default=0.0, init=False)
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+        self.categories = make_catalog(self.n_main, self.children_per_node, self.depth)
+        self._by_id = {c["public_id"]: c for c in self.categories}
+        parents = {c["parent_id"] for c in self.categories}
+        # товары i-го листа — номера [i * products_per_leaf, (i + 1) * products_per_leaf)
+        self._leaves = [c["public_id"] for c in self.categories if c["public_id"] not in parents]
+        self._leaf_index = {public_id: n for n, public_id in enumerate(self._leaves)}
+        self.n_leaves = len(self._leaves)
+        self.n_products = self.n_leaves * self.products_per_leaf
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handler)
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self._random.lognormvariate(0, self.latency_sigma) * self.latency_median)
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            self.served["429"] += 1
+            return httpx.Response(429, headers={"Retry-After": str(self.retry_after)})
+        if roll < self.throttle_rate + self.error_rate:
+            self.served["500"] += 1
+            return httpx.Response(500)
+
+        if match := _IMAGE_RE.search(request.url.path):
+            return self._image(request, int(match.group(1)), int(match.group(2) or 0))
+
+        if self.listing_bandwidth and (match := _LISTING_RE.search(request.url.path)):
+            self.served["200"] += 1
+            return httpx.Response(
+                200, content=self._stream_listing(match.group(1)), headers={"Content-Type": "application/json"}
+            )
+
+        started = time.process_time()
+        try:
+            body = self._body(request.url.path)
+        finally:
+            self.cpu_seconds += time.process_time() - started
+        if body is None:
+            self.served["404"] += 1
+            return httpx.Response(404)
+        self.served["200"] += 1
+        return httpx.Response(200, content=body, headers={"Content-Type": "application/json"})
+
+    def _image(self, request: httpx.Request, i: int, n: int) -> httpx.Response:
+        """Изображение с ETag; на If-None-Match с тем же ETag — 304 без тела"""
+        etag = f'"{i}-{n}-{self.image_version}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.served["304"] += 1
+            return httpx.Response(304, headers={"ETag": etag})
+        seed = f"{i}-{n}-{self.image_version}".encode()
+        body = (seed * (self.image_size // len(seed) + 1))[:self.image_size]
+        self.served["image"] += 1
+        return httpx.Response(200, content=body, headers={"Content-Type": "image/jpeg", "ETag": etag})
+
+    async def _stream_listing(self, public_id: str):
+        """Листинг кусками по listing_chunk_size байт с задержкой по listing_bandwidth"""
+        n = self._leaf_index.get(public_id)
+        ids = () if n is None else range(n * self.products_per_leaf, (n + 1) * self.products_per_leaf)
+        chunk = bytearray(b"[")
+        for position, i in enumerate(ids):
+            started = time.process_time()
+            if position:
+                chunk += b","
+            chunk += json.dumps(make_short_product_payload(i, public_id)).encode()
+            self.cpu_seconds += time.process_time() - started
+            if len(chunk) >= self.listing_chunk_size:
+                await asyncio.sleep(len(chunk) / self.listing_bandwidth)
+                yield bytes(chunk)
+                chunk.clear()
+        chunk += b"]"
+        await asyncio.sleep(len(chunk) / self.listing_bandwidth)
+        yield bytes(chunk)
+
+    def _body(self, path: str) -> bytes | None:
+        if path.endswith("/category"):
+            return json.dumps(self.categories).encode()
+        if match := _LISTING_RE.search(path):
+            n = self._leaf_index.get(match.group(1))
+            ids = () if n is None else range(n * self.products_per_leaf, (n + 1) * self.products_per_leaf)
+            return json.dumps([make_short_product_payload(i, match.group(1)) for i in ids]).encode()
+        if match := _PRODUCT_RE.search(path):
+            i = int(match.group(1))
+            if i >= self.n_products:
+                return None
+            category = self._by_id[self._leaves[i // self.products_per_leaf]]
+            payload = make_product_payload(i, category, n_attributes=self.n_attributes, n_images=self.n_images)
+            if self.description_size is not None:
+                text = payload["description"] + " "
+                payload["description"] = (text * (self.description_size // len(text) + 1))[:self.description_size]
+            return json.dumps(payload).encode()
+        return None
@@ -0,0 +1,61 @@
+"""
+Скорость разбора цен: прежний _clear_price, parse_price по одной строке и пакетные функции.
+
+    python -m benchmarks.prices --values 2000000 --distinct 50000
+"""
+import argparse
+import random
+import re
+import time
+
+from app.prices import _parse_text, parse_price, parse_prices, parse_prices_minor
+
+FORMATS = (
+    lambda rub, kop: f"{rub}.{kop:02d}",                        # API positive.ooo
+    lambda rub, kop: f"{rub:,}".replace(",", " ") + f",{kop:02d} ₽",
+    lambda rub, kop: f"{rub:,}".replace(",", ".") + f",{kop:02d}",
+    lambda rub, kop: f"{rub}.{kop:02d} ₽/шт",
+    lambda rub, kop: f"{rub:,}".replace(",", " ") + " ₽",
+)
+
+
+def old_clear_price(price: str) -> float | None:
+    if not price:
+        return None
+    cleaned = re.sub(r"[^\d.,]", "", price)
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def measure(name: str, func, values: list[str]) -> None:
+    _parse_text.cache_clear()
+    started = time.perf_counter()
+    func(values)
+    elapsed = time.perf_counter() - started
+    print(f"{name:>36}: {len(values) / elapsed / 1e6:6.2f} млн строк/с")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--values", type=int, default=2_000_000)
+    arg_parser.add_argument("--distinct", type=int, default=50_000, help="число разных цен в колонке")
+    args = arg_parser.parse_args()
+
+    rnd = random.Random(0)
+    distinct = [
+        rnd.choice(FORMATS)(rnd.randint(1, 500_000), rnd.randint(0, 99)) for _ in range(args.distinct)
+    ]
+    values = [rnd.choice(distinct) for _ in range(args.values)]
+    print(f"{len(values)} строк, {len(set(values))} разных")
+
+    measure("прежний _clear_price (float)", lambda vs: [old_clear_price(v) for v in vs], values)
+    measure("parse_price по одной, без кэша", lambda vs: [_parse_text.__wrapped__(v) for v in vs], distinct)
+    measure("parse_price по одной", lambda vs: [parse_price(v) for v in vs], values)
+    measure("parse_prices (Decimal)", parse_prices, values)
+    measure("parse_prices_minor (копейки)", parse_prices_minor, values)
+
+
+if __name__ == "__main__":
+    main()
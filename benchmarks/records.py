@@ -0,0 +1,86 @@
+"""
+Память на один товар: ProductSchema, ProductLiteSchema и ProductRecord.
+
+    python -m benchmarks.records --sizes 100000 1000000 --schema-sample 10000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from app.schemas.positiv.product import ProductLiteSchema, ProductSchema
+from app.schemas.positiv.record import ProductRecord
+from benchmarks.synthetic import make_category_payload, make_product_payload
+
+
+def bytes_per_item(factory, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    items = [factory(i) for i in range(n)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current / n
+
+
+def schema_bytes_per_item(schema, payloads: list[bytes]) -> float:
+    return bytes_per_item(lambda i: schema.model_validate_json(payloads[i]), len(payloads))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    arg_parser.add_argument("--schema-sample", type=int, default=10_000)
+    args = arg_parser.parse_args()
+
+    categories = [make_category_payload(i) for i in range(50)]
+    template = make_product_payload(0, categories[0])
+    body = json.dumps(template).encode()
+    schema_template = ProductSchema.model_validate_json(body)
+
+    def make_payload(i: int) -> bytes:
+        return json.dumps(make_product_payload(i, categories[i % len(categories)])).encode()
+
+    # модели pydantic на миллионе товаров не помещаются в разумное время — меряем на выборке
+    n = args.schema_sample
+    payloads = [make_payload(i) for i in range(n)]
+    full = schema_bytes_per_item(ProductSchema, payloads)
+    lite = schema_bytes_per_item(ProductLiteSchema, payloads)
+    print(f"{'ProductSchema':>18} ({n:>9}): {full:8.0f} байт/товар")
+    print(f"{'ProductLiteSchema':>18} ({n:>9}): {lite:8.0f} байт/товар")
+    del payloads
+
+    def make_record(i: int) -> ProductRecord:
+        category = categories[i % len(categories)]
+        return ProductRecord(
+            public_id=f"prod-pub-{i}",
+            name=f"Товар {i}",
+            slug=f"product-{i}",
+            imageUrl=f"https://cdn.positive.ooo/img/{i}.jpg",
+            vendorCode=f"VC-{i:07d}",
+            code=f"{i:08d}",
+            description=f"Описание товара {i}",
+            count=i % 500,
+            unitOfMeasurement=schema_template.unitOfMeasurement,
+            isAvailable=i % 500 > 0,
+            stockStatus=schema_template.stockStatus,
+            price=f"{100 + i % 9000}.{i % 100:02d}",
+            currency=schema_template.currency,
+            links1c=f"e1cib/data/Справочник.Номенклатура?ref={i:032x}",
+            isPublished=True,
+            publishedDate=schema_template.publishedDate,
+            createdAt=schema_template.createdAt,
+            updatedAt=schema_template.updatedAt,
+            store_name=schema_template.store.name,
+            category_id=category["public_id"],
+            category_name=category["name"],
+        )
+
+    for size in args.sizes:
+        per_item = bytes_per_item(make_record, size)
+        print(f"{'ProductRecord':>18} ({size:>9}): {per_item:8.0f} байт/товар, "
+              f"всего {per_item * size / 2 ** 20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Синтетические данные в формате API positive.ooo для бенчмарков"""
+import random
+from datetime import datetime, timedelta
+
+_DATE = datetime(2024, 1, 1)
+_UNITS = ["шт", "м", "кг", "упак"]
+
+
+def _iso(offset_days: int = 0) -> str:
+    return (_DATE + timedelta(days=offset_days)).isoformat()
+
+
+def make_category_payload(i: int, parent_id: str | None = None) -> dict:
+    return {
+        "id": f"cat-{i}",
+        "public_id": f"cat-pub-{i}",
+        "name": f"Категория {i}",
+        "slug": f"category-{i}",
+        "imageUrl": None,
+        "iconUrl": None,
+        "parent_id": parent_id,
+        "isPublished": True,
+        "priority": i % 10,
+        "publishedDate": _iso(),
+        "unpublishedDate": None,
+        "createdAt": _iso(),
+        "updatedAt": _iso(1),
+    }
+
+
+def make_short_product_payload(i: int, category_id: str) -> dict:
+    """Элемент ответа /product/get-by-category/{id}"""
+    return {
+        "id": f"prod-{i}",
+        "public_id": f"prod-pub-{i}",
+        "categoryId": category_id,
+        "code": f"{i:08d}",
+        "slug": f"product-{i}",
+        "name": f"Товар {i}",
+        "description": f"Описание товара {i}",
+        "snippet": None,
+        "imageUrl": f"https://cdn.positive.ooo/img/{i}.jpg",
+        "price": f"{100 + i % 9000}.{i % 100:02d}",
+        "count": i % 500,
+        "isNew": i % 7 == 0,
+        "isPopular": i % 11 == 0,
+        "isPublished": True,
+    }
+
+
+def make_product_payload(i: int, category: dict, n_attributes: int = 5, n_images: int = 3) -> dict:
+    """Ответ /product/{id}"""
+    short = make_short_product_payload(i, category["public_id"])
+    unit = _UNITS[i % len(_UNITS)]
+    return {
+        "public_id": short["public_id"],
+        "name": short["name"],
+        "slug": short["slug"],
+        "imageUrl": short["imageUrl"],
+        "vendorCode": f"VC-{i:07d}",
+        "code": short["code"],
+        "description": short["description"] * 3,
+        "snippet": f"Кратко о товаре {i}",
+        "monthWarranty": "12",
+        "count": short["count"],
+        "unitOfMeasurement": unit,
+        "isAvailable": short["count"] > 0,
+        "stockStatus": "in_stock" if short["count"] else "out_of_stock",
+        "images": [f"https://cdn.positive.ooo/img/{i}_{n}.jpg" for n in range(n_images)],
+        "price": short["price"],
+        "currency": "RUB",
+        "isNew": short["isNew"],
+        "isPopular": short["isPopular"],
+        "isSeasonal": False,
+        "isGift": False,
+        "links1c": f"e1cib/data/Справочник.Номенклатура?ref={i:032x}",
+        "isPublished": True,
+        "publishedDate": _iso(i % 300),
+        "info_1c": {
+            "product_id": f"1c-{i}",
+            "row_id": f"row-{i}",
+            "store_id": "store-1",
+            "name": short["name"],
+            "balance": {"count": str(short["count"]), "unit": unit, "residual": None},
+            "amount": {"value": short["price"], "currency": "RUB"},
+            "vendorCode": f"VC-{i:07d}",
+            "code": short["code"],
+            "links": "",
+        },
+        "unpublishedDate": None,
+        "createdAt": _iso(),
+        "nameVector": " ".join(f"'{w}':{n}" for n, w in enumerate(short["name"].lower().split(), 1)),
+        "updatedAt": _iso(i % 300 + 1),
+        "store": {
+            "id": "store-1",
+            "public_id": "store-pub-1",
+            "storeId": "1",
+            "name": "Основной склад",
+            "info_1c": {"name": "Основной склад", "storeId": "1"},
+            "createdAt": _iso(),
+            "updatedAt": _iso(),
+        },
+        "category": category,
+        "attributes": [
+            {
+                "filterId": f"f-{n}",
+                "valueId": f"v-{n}-{i % 13}",
+                "value": str(random.randint(1, 1000)),
+                "name": f"Характеристика {n}",
+                "priority": n,
+                "description": "",
+                "isSearchFilter": n % 2 == 0,
+                "isRange": False,
+                "step": 1,
+            }
+            for n in range(n_attributes)
+        ],
+    }
+
+
+def make_catalog(n_main: int, children_per_node: int, depth: int) -> list[dict]:
+    """Плоский список категорий, как его отдаёт /category"""
+    categories = []
+
+    def add(parent_id: str | None, level: int) -> None:
+        count = n_main if parent_id is None else children_per_node
+        for _ in range(count):
+            payload = make_category_payload(len(categories), parent_id)
+            categories.append(payload)
+            if level < depth:
+                add(payload["public_id"], level + 1)
+
+    add(None, 0)
+    return categories
@@ -0,0 +1,47 @@
+"""
+Процессорное время валидации одного товара в разных режимах.
+
+    python -m benchmarks.validation --products 2000
+"""
+import argparse
+import json
+import time
+
+from app.schemas.positiv.product import ProductLiteSchema, ProductSchema
+from benchmarks.synthetic import make_category_payload, make_product_payload
+
+
+def measure(name: str, func, bodies: list[bytes]) -> float:
+    started = time.process_time()
+    for body in bodies:
+        func(body)
+    per_item = (time.process_time() - started) / len(bodies)
+    print(f"{name:>40}: {per_item * 1e6:8.1f} мкс/товар")
+    return per_item
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--products", type=int, default=2000)
+    arg_parser.add_argument("--attributes", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    category = make_category_payload(1)
+    bodies = [
+        json.dumps(make_product_payload(i, category, n_attributes=args.attributes)).encode()
+        for i in range(args.products)
+    ]
+
+    baseline = measure("r.json() + ProductSchema(**data)", lambda b: ProductSchema(**json.loads(b)), bodies)
+    measure("ProductSchema.model_validate_json", ProductSchema.model_validate_json, bodies)
+    lite = measure("ProductLiteSchema.model_validate_json", ProductLiteSchema.model_validate_json, bodies)
+    measure(
+        "ProductLiteSchema + доступ к attributes",
+        lambda b: ProductLiteSchema.model_validate_json(b).attributes,
+        bodies
+    )
+    print(f"ускорение быстрого пути: x{baseline / lite:.1f}")
+
+
+if __name__ == "__main__":
+    main()
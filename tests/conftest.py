@@ -0,0 +1,33 @@
+import httpx
+import pytest
+
+from app.parsers.positiv.positiv import PositiveParserAPI
+from benchmarks.mock_api import MockPositivAPI
+
+
+@pytest.fixture
+def api() -> MockPositivAPI:
+    """Небольшой каталог: 2 основные категории, 8 листьев по 5 товаров, задержка около миллисекунды"""
+    return MockPositivAPI(n_main=2, children_per_node=2, depth=2, products_per_leaf=5, latency_median=0.001)
+
+
+@pytest.fixture
+async def client(api):
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        yield client
+
+
+async def _crawl(parser: PositiveParserAPI, limit_mains: int | None = None) -> list[str]:
+    """public_id товаров полного обхода в порядке выдачи по основным категориям"""
+    categories = parser.make_categories_with_children(await parser.get_categories())
+    main_categories = [c for c in categories.values() if c.parent_id is None][:limit_mains]
+    public_ids = []
+    for main_category in main_categories:
+        async for _, _, products in parser.walk_categories(main_category):
+            public_ids.extend(product.public_id for product in products)
+    return public_ids
+
+
+@pytest.fixture
+def crawl():
+    return _crawl
@@ -0,0 +1,69 @@
+import sqlite3
+
+import httpx
+
+from app.parsers.positiv.checkpoint import CrawlJournal
+from app.parsers.positiv.positiv import PositiveParserAPI
+from app.schemas.positiv.product import ProductSchema
+
+
+def counting_transport(api, requests: list[str]) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return await api.handler(request)
+    return httpx.MockTransport(handler)
+
+
+def product_requests(requests: list[str]) -> int:
+    return sum("/product/prod-pub-" in path for path in requests)
+
+
+async def test_resume_skips_completed_leaves(api, crawl, tmp_path):
+    path = tmp_path / "crawl.journal"
+    first: list[str] = []
+    journal = CrawlJournal(path)
+    async with httpx.AsyncClient(transport=counting_transport(api, first)) as client:
+        # прерванный обход: дошёл только до первой основной категории
+        partial = await crawl(PositiveParserAPI(client, journal=journal), limit_mains=1)
+    journal.close()
+    assert product_requests(first) == len(partial) > 0
+
+    second: list[str] = []
+    journal = CrawlJournal(path, resume=True)
+    async with httpx.AsyncClient(transport=counting_transport(api, second)) as client:
+        public_ids = await crawl(PositiveParserAPI(client, journal=journal))
+    assert journal.resumed_leaves > 0
+    journal.close(finished=True)
+
+    assert public_ids[:len(partial)] == partial
+    assert len(public_ids) == api.n_products
+    assert product_requests(second) == api.n_products - len(partial)
+    assert not path.exists()
+
+
+async def test_unreadable_product_is_fetched_again(api, crawl, tmp_path):
+    path = tmp_path / "crawl.journal"
+    journal = CrawlJournal(path)
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        public_ids = await crawl(PositiveParserAPI(client, journal=journal))
+    journal.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE products SET payload = ? WHERE public_id = ?", (b"garbage", public_ids[0]))
+
+    requests: list[str] = []
+    journal = CrawlJournal(path, resume=True)
+    async with httpx.AsyncClient(transport=counting_transport(api, requests)) as client:
+        assert await crawl(PositiveParserAPI(client, journal=journal)) == public_ids
+    journal.close()
+    assert journal.invalid_products == 1
+    assert product_requests(requests) == 1
+
+
+def test_new_journal_discards_previous_run(tmp_path):
+    path = tmp_path / "crawl.journal"
+    journal = CrawlJournal(path)
+    journal.complete_leaf("leaf-1", [])
+    journal.close()
+    journal = CrawlJournal(path)
+    assert journal.load_leaf("leaf-1", ProductSchema) is None
+    journal.close()
@@ -0,0 +1,70 @@
+import json
+
+import httpx
+import pytest
+
+from app.parsers.positiv.json_stream import JsonArrayStream
+from app.parsers.positiv.positiv import PositiveParserAPI
+
+ITEMS = [
+    {"name": "Дрель «Ураган»", "price": "1 234,56"},
+    [1, 2, [3]],
+    "строка с ] и , внутри",
+    0.5,
+    -12,
+    True,
+    None,
+    {},
+]
+
+
+def feed_in_chunks(body: bytes, size: int) -> list:
+    stream = JsonArrayStream()
+    items = []
+    for start in range(0, len(body), size):
+        items.extend(stream.feed(body[start:start + size]))
+    items.extend(stream.close())
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_items_split_across_chunks(size):
+    # куски по одному байту режут и многобайтовые символы UTF-8, и числа ("0." + "5")
+    body = json.dumps(ITEMS, ensure_ascii=False, indent=1).encode()
+    assert feed_in_chunks(body, size) == ITEMS
+
+
+def test_items_are_yielded_before_array_ends():
+    stream = JsonArrayStream()
+    assert stream.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    assert stream.feed(b': 2}, 1') == [{"b": 2}]
+    assert stream.feed(b'0]') == [10]
+    assert stream.close() == []
+    assert stream.items == 3
+
+
+def test_empty_array():
+    assert feed_in_chunks(b" [ ] ", 1) == []
+
+
+@pytest.mark.parametrize("body", [b'{"a": 1}', b"[1 2]", b"[1, 2", b"[1] 2"])
+def test_malformed(body):
+    with pytest.raises(ValueError):
+        feed_in_chunks(body, 1)
+
+
+def test_item_size_limit():
+    stream = JsonArrayStream(max_item_chars=10)
+    with pytest.raises(ValueError):
+        stream.feed(b'["' + b"x" * 20)
+
+
+async def test_streamed_listings_match_full_listings(api, crawl):
+    # листинг приходит кусками по 100 байт, товары разбираются по мере загрузки
+    api.listing_bandwidth = 10_000_000
+    api.listing_chunk_size = 100
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        streamed = await crawl(PositiveParserAPI(client, max_concurrent=4, stream_listings=True))
+        full = await crawl(PositiveParserAPI(client, max_concurrent=4))
+    assert streamed == full
+    assert len(streamed) == api.n_products
@@ -0,0 +1,103 @@
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.parsers.positiv.limiter import AdaptiveLimiter
+from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.retry import parse_retry_after, retry_after_from
+
+
+async def test_fixed_limit_behaves_like_semaphore():
+    limiter = AdaptiveLimiter(initial=2)
+    await limiter.acquire()
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done() and limiter.stats()["waiting"] == 1
+    limiter.release(0.01)
+    await waiter
+    assert limiter.in_flight == 2
+
+
+async def test_cancelled_waiter_does_not_leak_slot():
+    limiter = AdaptiveLimiter(initial=1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    limiter.release(0.01)
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.in_flight == 0
+
+
+async def test_throttling_halves_limit_and_success_grows_it():
+    limiter = AdaptiveLimiter(initial=8, min_limit=2, max_limit=16, cooldown=0)
+    await limiter.acquire()
+    limiter.release(0.01, "throttled")
+    assert limiter.limit == 4
+    for _ in range(200):
+        await limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit > 4
+    assert limiter.changes["throttled"] == 1 and limiter.changes["healthy"] > 0
+
+
+async def test_limit_stays_within_bounds():
+    limiter = AdaptiveLimiter(initial=4, min_limit=2, max_limit=4, cooldown=0)
+    for _ in range(5):
+        await limiter.acquire()
+        limiter.release(None, "timeout")
+    assert limiter.limit == 2
+    for _ in range(100):
+        await limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 4
+
+
+async def test_release_without_outcome_does_not_adapt():
+    limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=8, cooldown=0)
+    await limiter.acquire()
+    limiter.release(outcome=None)
+    assert limiter.limit == 4 and not limiter.changes
+
+
+async def test_pause_holds_new_slots():
+    limiter = AdaptiveLimiter(initial=4)
+    limiter.pause(0.1)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await limiter.acquire()
+    assert loop.time() - started >= 0.09
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-3") == 0
+    assert parse_retry_after("100000", max_delay=60) == 60
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(date) <= 30
+
+
+def test_retry_after_only_for_throttling():
+    assert retry_after_from(httpx.Response(429, headers={"Retry-After": "1"})) == 1
+    assert retry_after_from(httpx.Response(503, headers={"Retry-After": "2"})) == 2
+    assert retry_after_from(httpx.Response(500, headers={"Retry-After": "1"})) is None
+    assert retry_after_from(None) is None
+
+
+async def test_crawl_survives_throttling_and_respects_retry_after(api, crawl):
+    api.throttle_rate = 0.2
+    api.retry_after = 0.05
+    async with httpx.AsyncClient(transport=api.transport()) as client:
+        parser = PositiveParserAPI(client, max_concurrent=8, adaptive=True, min_concurrent=2)
+        public_ids = await crawl(parser)
+    assert len(public_ids) == api.n_products
+    assert api.served["429"] > 0
+    assert parser.limiter.changes["throttled"] > 0
+    assert parser.limiter.in_flight == 0
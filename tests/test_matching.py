@@ -0,0 +1,65 @@
+import pytest
+
+from app.matching import CatalogItem, ProductMatcher, code_candidates, normalize_name
+
+CATALOG = [
+    CatalogItem("p1", "Дрель ударная Bosch GSB 13 RE 600 Вт", "GSB-13-RE", "00012345", 450000),
+    CatalogItem("p2", "Перфоратор Makita HR2470 780 Вт", "HR2470", "00012346", 900000),
+    CatalogItem("p3", "Кабель ВВГнг 3х2,5 220 В", "220", "00012347", 8000),
+    CatalogItem("p4", "Удлинитель силовой 220 В 5 м", None, "00012348", 120000),
+    CatalogItem("p5", "Шуруповёрт аккумуляторный 18 В", "DF-18", "00012349", 600000),
+]
+
+
+@pytest.fixture(scope="module")
+def matcher() -> ProductMatcher:
+    # max_df=1: на пяти товарах любой признак встречается в заметной доле каталога
+    return ProductMatcher.build(CATALOG, max_df=1.0)
+
+
+def test_normalize_name():
+    assert normalize_name("Кабель ВВГнг 3×2.5, ёмкость") == ["кабель", "ввгнг", "3x2", "5", "емкость"]
+
+
+def test_code_candidates_join_adjacent_tokens():
+    candidates = code_candidates(["bosch", "gsb", "13", "re", "дрель"])
+    assert "GSB13RE" in candidates
+    assert "13" in candidates
+    assert "BOSCHGSB" not in candidates  # ни одного слова с цифрой
+
+
+def test_split_vendor_code_matches_by_code(matcher):
+    match = matcher.best("Bosch GSB-13 RE дрель")
+    assert match.item.public_id == "p1"
+    assert (match.score, match.by) == (1.0, "code")
+
+
+def test_numeric_code_only_boosts_name_score(matcher):
+    plain = matcher.query("Перфоратор 780 Вт", k=1, min_score=0)[0]
+    boosted = matcher.query("Перфоратор 780 Вт 00012346", k=1, min_score=0)[0]
+    assert plain.item.public_id == boosted.item.public_id == "p2"
+    assert boosted.by == "name" and plain.score < boosted.score < 1.0
+
+
+def test_number_is_not_a_code(matcher):
+    # "220" совпадает с vendorCode кабеля, но это напряжение, а не артикул
+    matches = matcher.query("Удлинитель 220 В 5 м", k=2)
+    assert matches[0].item.public_id == "p4"
+    assert all(match.by == "name" and match.score < 1.0 for match in matches)
+
+
+def test_name_similarity(matcher):
+    match = matcher.best("Аккумуляторный шуруповерт 18В")
+    assert match.item.public_id == "p5" and match.by == "name"
+    assert 0.5 <= match.score < 1.0
+
+
+def test_unrelated_name(matcher):
+    assert matcher.best("Садовый шланг") is None
+
+
+def test_save_and_load(matcher, tmp_path):
+    path = tmp_path / "matcher.pkl"
+    matcher.save(path)
+    loaded = ProductMatcher.load(path)
+    assert loaded.best("Makita HR2470").item.public_id == "p2"
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+
+from app.prices import Price, parse_price, parse_price_details, parse_prices_minor, to_minor_units
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 234,56 ₽", "1234.56"),
+    ("1\u00a0234,56\u00a0₽", "1234.56"),
+    ("1.234,56", "1234.56"),
+    ("1,234.56", "1234.56"),
+    ("1'234.56", "1234.56"),
+    ("12 990", "12990"),
+    ("1.234.567", "1234567"),
+    ("1 234.500", "1234.500"),
+    ("от 1 234 ₽", "1234"),
+])
+def test_grouping_and_decimal_separators(text, expected):
+    assert parse_price(text) == Decimal(expected)
+
+
+@pytest.mark.parametrize("text", ["1.234", "1.234 ₽", "1,234", "1,234 руб."])
+def test_single_separator_is_decimal_with_or_without_currency(text):
+    assert parse_price(text) == Decimal("1.234")
+
+
+def test_api_number_with_three_decimals():
+    assert parse_price("150.000") == Decimal("150")
+
+
+@pytest.mark.parametrize("text, expected", [("-5", "-5"), ("-5 ₽", "-5"), ("−1 234,50", "-1234.50")])
+def test_minus_sign_is_kept(text, expected):
+    assert parse_price(text) == Decimal(expected)
+
+
+def test_hyphen_in_range_is_not_a_sign():
+    assert parse_price("100-200 ₽") == Decimal("100")
+
+
+@pytest.mark.parametrize("value", [None, "", "цена по запросу", True])
+def test_no_number(value):
+    assert parse_price(value) is None
+
+
+def test_numbers_pass_through():
+    assert parse_price(12) == Decimal(12)
+    assert parse_price(0.1) == Decimal("0.1")
+    assert parse_price(Decimal("7.50")) == Decimal("7.50")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("797.26 ₽/шт", Price(Decimal("797.26"), "RUB", "шт")),
+    ("12.5 руб./м2", Price(Decimal("12.5"), "RUB", "м2")),
+    ("5 $ / уп.", Price(Decimal("5"), "USD", "уп")),
+    ("99,90", Price(Decimal("99.90"), None, None)),
+])
+def test_details(text, expected):
+    assert parse_price_details(text) == expected
+
+
+def test_minor_units_round_half_up():
+    assert to_minor_units(Decimal("0.005")) == 1
+    assert to_minor_units(Decimal("-0.005")) == -1
+    assert to_minor_units(None) is None
+
+
+def test_batch_keeps_order_and_duplicates():
+    assert parse_prices_minor(["1 234,56 ₽", None, "1 234,56 ₽", "7"]) == [123456, None, 123456, 700]
@@ -0,0 +1,93 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from app.parsers.positiv.positiv import PositiveParserAPI
+from app.parsers.positiv.sinks import (
+    CsvSink, HistorySink, JsonLinesSink, ParquetSink, Sink, SinkWriter, export_products
+)
+from app.schemas.positiv.category import CategorySchema
+from app.schemas.positiv.product import ProductSchema
+from benchmarks.synthetic import make_product_payload
+
+
+class RecordingSink(Sink):
+    def __init__(self, fail_on_write: bool = False):
+        self.fail_on_write = fail_on_write
+        self.blocks = []
+        self.closed = self.aborted = False
+
+    def write(self, main_category, depth, category_name, products):
+        if self.fail_on_write:
+            raise OSError("диск заполнен")
+        self.blocks.append((main_category.public_id, depth, category_name, len(products)))
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        self.aborted = True
+
+
+@pytest.fixture
+def block(api):
+    category = api.categories[0]
+    products = [ProductSchema.model_validate(make_product_payload(i, category)) for i in range(3)]
+    return CategorySchema.model_validate(category), 0, category["name"], products
+
+
+async def test_export_writes_every_product_to_every_sink(api, client, tmp_path):
+    csv_path, jsonl_path = tmp_path / "products.csv", tmp_path / "products.jsonl.gz"
+    history = HistorySink(tmp_path / "history")
+    sinks = [CsvSink(csv_path), JsonLinesSink(jsonl_path), history]
+    await export_products(PositiveParserAPI(client, max_concurrent=4), sinks)
+
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    with gzip.open(jsonl_path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(rows) == len(records) == api.n_products
+    assert [row["public_id"] for row in rows] == [record["public_id"] for record in records]
+    assert len({record["public_id"] for record in records}) == api.n_products
+    for row, record in zip(rows, records):
+        assert record["category_path"].startswith(record["main_category"])
+        assert record["category_path"].endswith(record["category"])
+        assert isinstance(record["price_minor"], int)
+        assert int(row["price_minor"]) == record["price_minor"]
+    assert len(history.history.segments()) == 1
+
+
+async def test_parquet_sink(api, client, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "products.parquet"
+    await export_products(PositiveParserAPI(client, max_concurrent=4), [ParquetSink(path, row_group_size=16)])
+    table = pq.read_table(path)
+    assert table.num_rows == api.n_products
+    # часть пишется, как только набрано row_group_size строк, остаток — при закрытии
+    assert len(list(path.glob("part-*.parquet"))) > 1
+
+
+async def test_incomplete_run_aborts_sinks(block, tmp_path):
+    sink = RecordingSink()
+    history = HistorySink(tmp_path / "history")
+    writer = SinkWriter([sink, history])
+    writer.start([block[0]])
+    await writer.put(*block)
+    await writer.close(completed=False)
+    assert sink.blocks == [(block[0].public_id, 0, block[2], 3)]
+    assert sink.aborted and not sink.closed
+    assert history.history.segments() == []
+
+
+async def test_failing_sink_aborts_others_and_raises(block):
+    healthy, broken = RecordingSink(), RecordingSink(fail_on_write=True)
+    writer = SinkWriter([healthy, broken], queue_size=1)
+    writer.start([block[0]])
+    for _ in range(3):
+        await writer.put(*block)
+    with pytest.raises(OSError):
+        await writer.close()
+    assert healthy.aborted and broken.aborted
+    assert not healthy.closed